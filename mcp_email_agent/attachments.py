@@ -0,0 +1,204 @@
+"""
+Attachment handling for the MCP Email Agent.
+
+``setEmail`` no longer decodes every MIME part. Instead each email carries a
+manifest of its parts (content type, filename, approximate size and index),
+and an agent asks for a specific part with the ``getAttachment`` tool.
+
+A requested part is decoded once into a spill file on local disk, keyed by
+the mailbox, message UIDL and part index, and then served in chunks. The
+part's content type, filename and charset are saved next to the spill file,
+so later chunks need neither the message nor its parse. Large spill files
+are read through ``mmap`` so a chunk can be sliced out without reading the
+whole file into memory.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+
+# Characters of base64 text decoded per step when spilling a part (multiple of 4)
+DECODE_CHUNK_CHARS = 4 * 16384
+
+
+def leafParts(msg):
+    """Returns the non-container parts of a message, in walk order."""
+    return [part for part in msg.walk() if not part.is_multipart()]
+
+
+def estimateSize(part):
+    """Estimates the decoded size of a part without decoding it."""
+    payload = part.get_payload()
+    if not isinstance(payload, str):
+        return 0
+    if part.get('Content-Transfer-Encoding', '').lower() == 'base64':
+        return len(payload.replace('\n', '').replace('\r', '')) * 3 // 4
+    return len(payload)
+
+
+def partManifest(msg):
+    """Describes every leaf part of a message without decoding any payloads.
+
+    Args:
+        msg (email.message.Message): Parsed message.
+
+    Returns:
+        list: One dictionary per part with ``index``, ``contentType``,
+              ``filename`` (or None) and approximate decoded ``size``.
+    """
+    return [{
+        'index': index,
+        'contentType': part.get_content_type(),
+        'filename': part.get_filename(),
+        'size': estimateSize(part),
+    } for index, part in enumerate(leafParts(msg))]
+
+
+def partInfo(part):
+    """Returns the details of a part needed to serve its chunks."""
+    return {
+        'contentType': part.get_content_type(),
+        'filename': part.get_filename(),
+        'charset': part.get_content_charset(),
+    }
+
+
+class AttachmentStore:
+    """Decodes message parts to spill files and serves them in chunks.
+
+    Args:
+        directory (str): Where spill files are kept. Defaults to a new
+            temporary directory.
+        mmapThreshold (int): Files at least this large are read with mmap.
+        mailbox (str): Namespace for UIDLs, since they are only unique per mailbox.
+    """
+
+    def __init__(self, directory: str = None, mmapThreshold: int = 1024 * 1024, mailbox: str = ""):
+        self._directory = directory
+        self._temporary = directory is None
+        self.mmapThreshold = mmapThreshold
+        self.mailbox = mailbox
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        """The spill directory, created on first use."""
+        with self._lock:
+            if self._directory is None:
+                self._directory = tempfile.mkdtemp(prefix="email_attachments_")
+            os.makedirs(self._directory, exist_ok=True)
+            return self._directory
+
+    def _digest(self, key: str):
+        """Returns the file name prefix of message ``key`` in this mailbox."""
+        return hashlib.sha1(f"{self.mailbox}\0{key}".encode('utf-8')).hexdigest()
+
+    def path(self, key: str, index: int):
+        """Returns the spill file path for part ``index`` of message ``key``."""
+        return os.path.join(self.directory, f"{self._digest(key)}.{index}")
+
+    def find(self, key: str, index: int):
+        """Returns the details of an already spilled part, or None.
+
+        Returns:
+            dict: ``contentType``, ``filename``, ``charset``, decoded ``size``
+                  and the ``path`` of the spill file.
+        """
+        path = self.path(key, index)
+        try:
+            with open(path + ".json", encoding='utf-8') as f:
+                info = json.load(f)
+            return dict(info, path=path, size=os.path.getsize(path))
+        except (OSError, ValueError):
+            return None
+
+    def spill(self, key: str, index: int, part):
+        """Decodes one part into its spill file, unless already present.
+
+        Base64 payloads are decoded in fixed-size steps, so the decoded bytes
+        are never held in memory all at once. The part's details are saved
+        next to the file once it is complete.
+
+        Returns:
+            dict: The part's details, as returned by ``find``.
+        """
+        spilled = self.find(key, index)
+        if spilled is not None:
+            return spilled
+        path = self.path(key, index)
+        partial = path + ".part"
+        with open(partial, 'wb') as out:
+            payload = part.get_payload()
+            encoding = part.get('Content-Transfer-Encoding', '').lower()
+            if encoding == 'base64' and isinstance(payload, str):
+                pending = ""
+                for start in range(0, len(payload), DECODE_CHUNK_CHARS):
+                    pending += "".join(payload[start:start + DECODE_CHUNK_CHARS].split())
+                    usable = len(pending) - len(pending) % 4
+                    out.write(binascii.a2b_base64(pending[:usable]))
+                    pending = pending[usable:]
+                if pending:
+                    out.write(binascii.a2b_base64(pending + "=" * (-len(pending) % 4)))
+            else:
+                out.write(part.get_payload(decode=True) or b"")
+        os.replace(partial, path)
+        with open(partial, 'w', encoding='utf-8') as out:
+            json.dump(partInfo(part), out)
+        os.replace(partial, path + ".json")
+        return self.find(key, index)
+
+    def read(self, path: str, offset: int, length: int):
+        """Reads a chunk of a spill file.
+
+        Returns:
+            tuple: ``(data, totalSize)``.
+        """
+        size = os.path.getsize(path)
+        if offset >= size:
+            return b"", size
+        with open(path, 'rb') as f:
+            if size >= self.mmapThreshold:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[offset:offset + length], size
+            f.seek(offset)
+            return f.read(length), size
+
+    def invalidate(self, keys):
+        """Removes the spill files of the given messages."""
+        if self._directory is None or not os.path.isdir(self._directory):
+            return
+        prefixes = {self._digest(key) + "." for key in keys}
+        for name in os.listdir(self._directory):
+            if any(name.startswith(prefix) for prefix in prefixes):
+                os.remove(os.path.join(self._directory, name))
+
+    def close(self):
+        """Deletes the spill directory if it was created as a temporary one."""
+        with self._lock:
+            if not self._temporary or self._directory is None:
+                return
+            directory, self._directory = self._directory, None
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def encodeChunk(data: bytes, contentType: str, charset: str = None):
+    """Encodes a chunk for a JSON tool response.
+
+    Text parts are returned as text when the chunk decodes cleanly in the
+    part's charset; everything else is base64.
+
+    Returns:
+        tuple: ``(encoding, text)`` where encoding is "text" or "base64".
+    """
+    if contentType.startswith('text/'):
+        try:
+            return "text", data.decode(charset or 'utf-8')
+        except (UnicodeDecodeError, LookupError):
+            pass
+    return "base64", base64.b64encode(data).decode('ascii')
@@ -0,0 +1,148 @@
+"""
+Benchmark for body cleaning (``clean`` on the read tools).
+
+Builds a sample corpus the way a busy inbox looks: replies carrying the whole
+thread as quoted history, Outlook replies with the original message below a
+From/Sent/To/Subject block, HTML newsletters, and short notes ending in a
+signature or mobile footer. Every message is parsed with ``setEmail`` and its
+body cleaned with ``cleanBody``. Body bytes before and after cleaning, the
+share saved per kind of message, the time to clean a message, and the time to
+serve the same bodies again from ``BodyCache`` are reported.
+
+A real corpus can be used instead with ``--mbox``.
+
+Run from the mcp_email_agent directory:
+    python -m benchmarks.bench_clean_body
+    python -m benchmarks.bench_clean_body --messages 400 --depth 8
+    python -m benchmarks.bench_clean_body --mbox ~/Mail/archive.mbox
+"""
+
+import argparse
+import mailbox
+import os
+import sys
+import time
+from email.message import EmailMessage
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from body_cleaner import BodyCache, cleanBody
+from email_agent_utils import FORMAT_COMBINED, setEmail
+
+PARAGRAPH = ("Thanks for the update on the rollout. I looked at the numbers again this "
+             "morning and I think we can move the date up by a week if the vendor confirms.")
+
+SIGNATURE = "-- \nAnn Lee\nSenior Engineer, ACME Corp\n+1 555 0100\nhttps://acme.example.com\n"
+
+
+def threadReply(index: int, depth: int):
+    """A Gmail-style reply with ``depth`` levels of quoted history."""
+    body = f"{PARAGRAPH}\n\nReply {index}\n"
+    for level in range(depth):
+        header = f"On Wed, May {level + 1}, 2024 at 9:00 AM Person {level} <p{level}@example.com> wrote:\n"
+        quoted = "\n".join("> " + line if line else ">" for line in body.split("\n"))
+        body = f"{PARAGRAPH}\n\n{SIGNATURE}\n{header}{quoted}\n"
+    return body
+
+
+def outlookReply(index: int, depth: int):
+    """An Outlook-style reply with the original messages below header blocks."""
+    body = f"{PARAGRAPH}\n"
+    for level in range(depth):
+        body = (f"{PARAGRAPH}\n\nRegards,\nAnn\n\n________________________________\n"
+                f"From: Person {level} <p{level}@example.com>\nSent: Wednesday, May 1, 2024 9:00 AM\n"
+                f"To: Ann Lee <ann@example.com>\nSubject: RE: Rollout {index}\n\n{body}")
+    return body
+
+
+def newsletter(index: int, depth: int):
+    """An HTML newsletter with styles, layout tables and tracking markup."""
+    items = "".join(
+        f'<tr><td class="item" style="padding:12px;font-family:Arial"><h2>Story {n}</h2>'
+        f'<p>{PARAGRAPH}</p><a href="https://news.example.com/{index}/{n}?utm_source=mail">Read more</a>'
+        f'</td></tr>' for n in range(depth)
+    )
+    return (
+        '<!DOCTYPE html><html><head><style>.item {color: #333} td {font-size: 14px}</style>'
+        '<title>Weekly digest</title></head><body><table width="600" cellpadding="0">'
+        f'{items}</table><img src="https://news.example.com/open.gif" width="1" height="1">'
+        '<script>track()</script></body></html>'
+    )
+
+
+def shortNote(index: int, depth: int):
+    """A short note with a signature and a mobile footer."""
+    return f"Can you send me the slides for {index}?\n\nSent from my iPhone\n{SIGNATURE}"
+
+
+KINDS = [("thread", threadReply), ("outlook", outlookReply), ("html", newsletter), ("note", shortNote)]
+
+
+def buildEmail(index: int, body: str, html: bool):
+    """Builds and parses one email with the given body."""
+    msg = EmailMessage()
+    msg['From'] = f'sender{index}@example.com'
+    msg['To'] = 'recipient@example.com'
+    msg['Subject'] = f'Message {index}'
+    msg.set_content(body, subtype='html' if html else 'plain')
+    lines = msg.as_bytes().split(b'\n')
+    return setEmail((b'+OK', lines, 0), index, FORMAT_COMBINED)
+
+
+def sampleCorpus(messages: int, depth: int):
+    """Returns (kind, parsed email) pairs cycling through the sample kinds."""
+    corpus = []
+    for index in range(messages):
+        kind, build = KINDS[index % len(KINDS)]
+        corpus.append((kind, buildEmail(index, build(index, depth), kind == "html")))
+    return corpus
+
+
+def mboxCorpus(path: str):
+    """Returns (kind, parsed email) pairs for every message in an mbox file."""
+    corpus = []
+    for index, msg in enumerate(mailbox.mbox(os.path.expanduser(path))):
+        lines = msg.as_bytes().split(b'\n')
+        corpus.append(("mbox", setEmail((b'+OK', lines, 0), index, FORMAT_COMBINED)))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--depth', type=int, default=5, help="quoted replies per thread, stories per newsletter")
+    parser.add_argument('--mbox', help="use the messages of an mbox file instead of the sample corpus")
+    args = parser.parse_args()
+
+    corpus = mboxCorpus(args.mbox) if args.mbox else sampleCorpus(args.messages, args.depth)
+    bodies = [(kind, email['body'] or b"") for kind, email in corpus]
+    print(f"Corpus: {len(bodies)} messages" + ("" if args.mbox else f", depth {args.depth}"))
+
+    totals = {}
+    start = time.perf_counter()
+    for kind, body in bodies:
+        cleaned = cleanBody(body).encode('utf-8')
+        before, after = totals.get(kind, (0, 0))
+        totals[kind] = (before + len(body), after + len(cleaned))
+    cleanTime = time.perf_counter() - start
+
+    for kind, (before, after) in totals.items():
+        print(f"{kind:>8}: {before / 1024:9.1f} KB -> {after / 1024:8.1f} KB  ({1 - after / before:6.1%} saved)")
+    before = sum(b for b, _ in totals.values())
+    after = sum(a for _, a in totals.values())
+    print(f"{'total':>8}: {before / 1024:9.1f} KB -> {after / 1024:8.1f} KB  ({1 - after / before:6.1%} saved)")
+
+    cache = BodyCache(maxEntries=len(bodies))
+    for index, (_, body) in enumerate(bodies):
+        cache.get(str(index), body)
+    start = time.perf_counter()
+    for index, (_, body) in enumerate(bodies):
+        cache.get(str(index), body)
+    cachedTime = time.perf_counter() - start
+    print(f"Cleaning: {cleanTime * 1000 / len(bodies):.3f} ms/message, "
+          f"cached: {cachedTime * 1000 / len(bodies):.4f} ms/message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Benchmark for streaming model output in the client (``CLIENT_STREAM``).
+
+Starts a local fake model endpoint that speaks the Anthropic Messages API and
+produces output at a fixed token rate. Its first response says a sentence,
+then asks for two tools; the second, after the tool results, answers in text.
+One ``run_turn`` is timed with and without streaming, using a fake MCP
+session whose tools take a fixed time. Reported for each mode:
+
+- time to first token: until the first model text is printed
+- time to first tool call: until the first tool call reaches the MCP session
+- turn time: until the final answer is complete
+
+Run from the mcp_email_agent directory:
+    python -m benchmarks.bench_client_stream
+    python -m benchmarks.bench_client_stream --token-ms 30 --tool-ms 400
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from anthropic import AsyncAnthropic
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sse_client import run_turn
+
+INTRO = "Let me look at the two newest emails and the search results for you. " * 2
+ANSWER = "The newest email is the rollout plan; the search found three related threads. " * 2
+
+
+def tokens(text: str):
+    """Splits text into word-sized tokens, keeping the spaces."""
+    return [word + " " for word in text.split(" ") if word]
+
+
+def script(toolTurn: bool):
+    """Returns the content blocks of a response as lists of streamed deltas."""
+    if not toolTurn:
+        return [{"type": "text", "deltas": tokens(ANSWER)}]
+    return [
+        {"type": "text", "deltas": tokens(INTRO)},
+        {"type": "tool_use", "id": "toolu_1", "name": "getEmailsById",
+         "deltas": ['{"ids": ', '[1, ', '2]}']},
+        {"type": "tool_use", "id": "toolu_2", "name": "searchEmails",
+         "deltas": ['{"query": ', '"rollout ', 'plan ', 'vendor ', 'schedule ', 'update", ', '"limit": ', '10}']},
+    ]
+
+
+class FakeModel(BaseHTTPRequestHandler):
+    """Messages API endpoint emitting one delta every ``tokenDelay`` seconds."""
+
+    tokenDelay = 0.02
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        last = request["messages"][-1]["content"]
+        toolTurn = not (isinstance(last, list) and last and last[0].get("type") == "tool_result")
+        blocks = script(toolTurn)
+        stopReason = "tool_use" if toolTurn else "end_turn"
+        if request.get("stream"):
+            self.stream(blocks, stopReason)
+        else:
+            self.complete(blocks, stopReason)
+
+    def send(self, status: int, contentType: str):
+        self.send_response(status)
+        self.send_header("Content-Type", contentType)
+        self.end_headers()
+
+    def message(self, content, stopReason):
+        return {"id": "msg_bench", "type": "message", "role": "assistant", "model": "bench", "content": content,
+                "stop_reason": stopReason, "stop_sequence": None, "usage": {"input_tokens": 100, "output_tokens": 50}}
+
+    def complete(self, blocks, stopReason):
+        content = []
+        for block in blocks:
+            time.sleep(self.tokenDelay * len(block["deltas"]))
+            text = "".join(block["deltas"])
+            if block["type"] == "text":
+                content.append({"type": "text", "text": text})
+            else:
+                content.append({"type": "tool_use", "id": block["id"], "name": block["name"], "input": json.loads(text)})
+        self.send(200, "application/json")
+        self.wfile.write(json.dumps(self.message(content, stopReason)).encode())
+
+    def event(self, data: dict):
+        self.wfile.write(f"event: {data['type']}\ndata: {json.dumps(data)}\n\n".encode())
+        self.wfile.flush()
+
+    def stream(self, blocks, stopReason):
+        self.send(200, "text/event-stream")
+        self.event({"type": "message_start", "message": self.message([], None)})
+        for index, block in enumerate(blocks):
+            if block["type"] == "text":
+                start, delta = {"type": "text", "text": ""}, lambda d: {"type": "text_delta", "text": d}
+            else:
+                start = {"type": "tool_use", "id": block["id"], "name": block["name"], "input": {}}
+                delta = lambda d: {"type": "input_json_delta", "partial_json": d}
+            self.event({"type": "content_block_start", "index": index, "content_block": start})
+            for piece in block["deltas"]:
+                time.sleep(self.tokenDelay)
+                self.event({"type": "content_block_delta", "index": index, "delta": delta(piece)})
+            self.event({"type": "content_block_stop", "index": index})
+        self.event({"type": "message_delta", "delta": {"stop_reason": stopReason, "stop_sequence": None},
+                    "usage": {"output_tokens": 50}})
+        self.event({"type": "message_stop"})
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeSession:
+    """MCP session recording when the first tool call arrives."""
+
+    def __init__(self, toolDelay: float):
+        self.toolDelay = toolDelay
+        self.firstCall = None
+
+    async def call_tool(self, name, arguments):
+        self.firstCall = self.firstCall or time.perf_counter()
+        await asyncio.sleep(self.toolDelay)
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=f"{name} result")], isError=False)
+
+
+class Output:
+    """Discards printed output, recording when the first model text arrives."""
+
+    def __init__(self):
+        self.firstText = None
+
+    def write(self, text):
+        if self.firstText is None and text.strip() and text.strip() != "LLM:":
+            self.firstText = time.perf_counter()
+
+    def flush(self):
+        pass
+
+
+async def measure(chat, stream: bool, toolDelay: float):
+    """Returns (time to first token, time to first tool call, turn time) in seconds."""
+    session = FakeSession(toolDelay)
+    output = Output()
+    messages = [{"role": "user", "content": "Summarize my newest emails and anything about the rollout."}]
+    start = time.perf_counter()
+    await run_turn(chat, "bench", session, messages, [], stream, output)
+    return output.firstText - start, session.firstCall - start, time.perf_counter() - start
+
+
+async def run(args):
+    FakeModel.tokenDelay = args.token_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeModel)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    chat = AsyncAnthropic(api_key="bench", base_url=f"http://127.0.0.1:{server.server_port}")
+    print(f"Fake model: {args.token_ms} ms/token, tools take {args.tool_ms} ms")
+    try:
+        for stream in (False, True):
+            results = [await measure(chat, stream, args.tool_ms / 1000) for _ in range(args.repeat)]
+            first, tool, turn = (min(r[i] for r in results) * 1000 for i in range(3))
+            print(f"{'streaming' if stream else 'blocking':>10}: first token {first:7.1f} ms  "
+                  f"first tool call {tool:7.1f} ms  turn {turn:7.1f} ms")
+    finally:
+        await chat.close()
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--token-ms', type=float, default=20)
+    parser.add_argument('--tool-ms', type=float, default=300)
+    parser.add_argument('--repeat', type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
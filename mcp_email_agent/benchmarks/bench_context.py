@@ -0,0 +1,80 @@
+"""
+Benchmark for conversation context compaction in the client.
+
+Simulates a long session in which every turn reads a page of emails with
+``pollEmails`` and the model answers briefly, the pattern that makes requests
+grow without bound. For selected turns, the estimated size of the next request
+is reported without context management and with ``ConversationContext``, along
+with the time spent compacting. With compaction, older email pages shrink to
+one line per email and, once the budget is reached, request size stays flat
+instead of growing with every turn.
+
+Run from the mcp_email_agent directory:
+    python -m benchmarks.bench_context
+    python -m benchmarks.bench_context --turns 100 --emails 20 --budget 30000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conversation_context import ConversationContext
+
+
+def emailPage(turn: int, emails: int, bodyChars: int):
+    """A pollEmails result as the server returns it."""
+    page = [{"id": turn * emails + i, "From": f"sender{i}@example.com", "To": "me@example.com",
+             "Subject": f"Status update {turn}.{i}", "Date": "Wed, 01 May 2024 09:00:00 +0000",
+             "Cc": None, "Message-ID": f"<{turn}.{i}@example.com>", "body": "Status is green. " * (bodyChars // 17)}
+            for i in range(emails)]
+    return json.dumps({"emails": page, "total": emails, "nextOffset": None})
+
+
+def addTurn(messages: list, turn: int, emails: int, bodyChars: int):
+    """Appends one request, tool call, tool result and answer."""
+    messages.append({"role": "user", "content": f"Anything new about project {turn}?"})
+    messages.append({"role": "assistant", "content": [
+        {"type": "tool_use", "id": f"toolu_{turn}", "name": "pollEmails", "input": {"limit": emails}}]})
+    messages.append({"role": "user", "content": [
+        {"type": "tool_result", "tool_use_id": f"toolu_{turn}", "content": emailPage(turn, emails, bodyChars)}]})
+    messages.append({"role": "assistant", "content": [{"type": "text", "text": f"Project {turn} is on track."}]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=100)
+    parser.add_argument('--emails', type=int, default=10)
+    parser.add_argument('--body-chars', type=int, default=1500)
+    parser.add_argument('--budget', type=int, default=20000)
+    parser.add_argument('--keep-turns', type=int, default=4)
+    args = parser.parse_args()
+
+    full = [{"role": "user", "content": "You are a helpful assistant, you have the ability to call tools."}]
+    compacted = list(full)
+    context = ConversationContext(budget=args.budget, keepTurns=args.keep_turns)
+    measure = ConversationContext()
+    report = {1, 5, 10, 25, 50, 100, args.turns}
+
+    print(f"Session: {args.turns} turns, {args.emails} emails of {args.body_chars} characters per turn, "
+          f"budget {args.budget} tokens")
+    for turn in range(1, args.turns + 1):
+        addTurn(full, turn, args.emails, args.body_chars)
+        addTurn(compacted, turn, args.emails, args.body_chars)
+        compacted.append({"role": "user", "content": "Next request"})
+        start = time.perf_counter()
+        tokens = context.compact(compacted)
+        seconds = time.perf_counter() - start
+        compacted.pop()
+        if turn in report:
+            print(f"turn {turn:>4}: {measure.tokens(full):9d} tokens without compaction, "
+                  f"{tokens:7d} with  ({seconds * 1000:6.2f} ms to compact)")
+    print(f"Summarized {context.stats['summarized']} tool results, dropped {context.stats['dropped']} turns")
+
+
+if __name__ == "__main__":
+    main()
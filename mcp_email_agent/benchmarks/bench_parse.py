@@ -0,0 +1,100 @@
+"""
+Benchmark for email parsing in setEmail.
+
+Compares the original string-based path (join the POP3 lines, decode the
+whole message as UTF-8, ``Parser().parsestr``) with the bytes-native path now
+used by ``setEmail`` (``BytesFeedParser`` fed line by line). Each path is run
+on generated multipart messages with base64 attachments, and the wall time
+and peak traced memory per message are reported.
+
+Run from the mcp_email_agent directory:
+    python -m benchmarks.bench_parse
+    python -m benchmarks.bench_parse --attachments 4 --attachment-kb 2048 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from email.message import EmailMessage
+from email.parser import Parser
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from email_agent_utils import FORMAT_COMBINED, setEmail
+
+
+def buildMessage(attachments: int, attachmentKb: int):
+    """Builds a multipart message and returns it as POP3-style lines."""
+    msg = EmailMessage()
+    msg['From'] = 'sender@example.com'
+    msg['To'] = 'recipient@example.com'
+    msg['Subject'] = 'Benchmark message'
+    msg.set_content("Body text line.\n" * 200)
+    for i in range(attachments):
+        msg.add_attachment(os.urandom(attachmentKb * 1024), maintype='application',
+                           subtype='octet-stream', filename=f'attachment{i}.bin')
+    return msg.as_bytes().split(b'\n')
+
+
+def legacySetEmail(mail: list, id: int):
+    """The original setEmail parsing path, kept here for comparison."""
+    obj = {'id': id}
+    msg = Parser().parsestr(b'\r\n'.join(mail[1]).decode('utf-8'))
+    for name in ('From', 'Content-Type', 'MIME-Version', 'User-Agent', 'Subject',
+                 'Encoding', 'To', 'Cc', 'Content-Language'):
+        obj[name] = msg.get(name)
+    body = ""
+    if msg.is_multipart():
+        for part in msg.walk():
+            if part.get_content_type():
+                body = part.get_payload(decode=True)
+    else:
+        body = msg.get_payload(decode=True)
+    obj['body'] = body
+    return obj
+
+
+def measure(parse, mail, repeat: int):
+    """Returns (best seconds, peak traced bytes) for ``parse(mail)``."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(mail)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    parse(mail)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--attachments', type=int, default=3)
+    parser.add_argument('--attachment-kb', type=int, default=1024)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    lines = buildMessage(args.attachments, args.attachment_kb)
+    mail = (b'+OK', lines, sum(len(line) + 2 for line in lines))
+    print(f"Message: {args.attachments} x {args.attachment_kb} KB attachments, {mail[2] / 1e6:.1f} MB on the wire")
+
+    paths = [
+        ("legacy parsestr", lambda m: legacySetEmail(m, 1)),
+        ("BytesFeedParser", lambda m: setEmail(m, 1, FORMAT_COMBINED)),
+    ]
+    results = {}
+    for name, parse in paths:
+        seconds, peak = measure(parse, mail, args.repeat)
+        results[name] = (seconds, peak)
+        print(f"{name:>16}: {seconds * 1000:8.1f} ms   peak {peak / 1e6:8.1f} MB")
+
+    (oldTime, oldPeak), (newTime, newPeak) = results.values()
+    print(f"{'speedup':>16}: {oldTime / newTime:8.2f} x   memory {oldPeak / newPeak:8.2f} x less")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark for pipelined POP3 retrieval.
+
+Starts a small local POP3 server that waits ``--rtt`` milliseconds before
+answering each batch of commands it receives, as a slow link would, and then
+retrieves the same messages one command at a time and with RETR pipelining
+(``pop3_pipeline.retrieveMany``). Sequential retrieval costs about one round
+trip per message; pipelined retrieval about one per window of messages.
+
+Run from the mcp_email_agent directory:
+    python -m benchmarks.bench_pop3_pipeline
+    python -m benchmarks.bench_pop3_pipeline --messages 200 --rtt 80 --window 32
+"""
+
+import argparse
+import os
+import poplib
+import socketserver
+import sys
+import threading
+import time
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pop3_pipeline
+from pop3_pipeline import retrieveMany
+
+
+class SlowPOP3Handler(socketserver.BaseRequestHandler):
+    """Answers USER, PASS, CAPA, RETR and QUIT after a fixed delay per read."""
+
+    def handle(self):
+        server = self.server
+        self.request.sendall(b"+OK ready\r\n")
+        buffered = b""
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                return
+            time.sleep(server.rtt)
+            buffered += data
+            *lines, buffered = buffered.split(b"\r\n")
+            replies = []
+            for line in lines:
+                command = line.split()[0].upper() if line else b""
+                if command == b"CAPA":
+                    replies.append(b"+OK\r\n" + (b"PIPELINING\r\n" if server.pipelining else b"") + b".\r\n")
+                elif command == b"RETR":
+                    replies.append(b"+OK %d octets\r\n" % len(server.message) + server.message + b".\r\n")
+                elif command == b"QUIT":
+                    self.request.sendall(b"".join(replies) + b"+OK bye\r\n")
+                    return
+                else:
+                    replies.append(b"+OK\r\n")
+            self.request.sendall(b"".join(replies))
+
+
+def startServer(rtt: float, message: bytes, pipelining: bool):
+    """Starts the slow server on a free local port and returns it."""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SlowPOP3Handler)
+    server.daemon_threads = True
+    server.rtt = rtt
+    server.message = message
+    server.pipelining = pipelining
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def timeRetrieval(server, count: int, window: int):
+    """Logs in, retrieves ``count`` messages and returns the elapsed seconds."""
+    mb = poplib.POP3(*server.server_address)
+    mb.user("user")
+    mb.pass_("pass")
+    start = time.perf_counter()
+    retrieved = sum(1 for _ in retrieveMany(mb, range(1, count + 1), window))
+    elapsed = time.perf_counter() - start
+    mb.quit()
+    assert retrieved == count
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--rtt', type=float, default=50, help="simulated round trip in milliseconds")
+    parser.add_argument('--message-kb', type=int, default=8)
+    parser.add_argument('--window', type=int, default=pop3_pipeline.DEFAULT_WINDOW)
+    args = parser.parse_args()
+
+    message = b"Subject: Benchmark\r\n\r\n" + b"x" * 74 + b"\r\n"
+    message *= max(1, args.message_kb * 1024 // len(message))
+    print(f"{args.messages} messages of {len(message) / 1024:.0f} KB, {args.rtt:.0f} ms round trip")
+
+    results = {}
+    for name, pipelining in (("one at a time", False), ("pipelined", True)):
+        server = startServer(args.rtt / 1000, message, pipelining)
+        results[name] = timeRetrieval(server, args.messages, args.window)
+        server.shutdown()
+        print(f"{name:>14}: {results[name] * 1000:8.0f} ms")
+
+    print(f"{'speedup':>14}: {results['one at a time'] / results['pipelined']:8.1f} x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark for field projection and compact output on the read tools.
+
+Builds a page of parsed emails with ``setEmail``, then serializes it the way
+FastMCP serializes a tool result (``pydantic_core.to_jsonable_python``
+followed by ``json.dumps``). The full page is compared with the triage
+projection an agent would ask for: sender, subject and date, with a compact
+body cut to a few hundred characters. Response size, time to project and
+serialize, and the share of the full page are reported.
+
+Run from the mcp_email_agent directory:
+    python -m benchmarks.bench_projection
+    python -m benchmarks.bench_projection --emails 50 --body-kb 64 --max-body-chars 300
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from email.message import EmailMessage
+
+import pydantic_core
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from email_agent_utils import FORMAT_COMBINED, projectEmails, setEmail
+
+
+def buildEmail(index: int, bodyKb: int):
+    """Builds and parses one email with a long plain-text body."""
+    msg = EmailMessage()
+    msg['From'] = f'sender{index}@example.com'
+    msg['To'] = 'recipient@example.com'
+    msg['Subject'] = f'Quarterly report {index}'
+    msg['Date'] = 'Wed, 01 May 2024 09:00:00 +0000'
+    paragraph = "The numbers for this quarter are in the attached sheet.   \n\n\n"
+    msg.set_content(paragraph * (bodyKb * 1024 // len(paragraph)))
+    lines = msg.as_bytes().split(b'\n')
+    return setEmail((b'+OK', lines, 0), index, FORMAT_COMBINED)
+
+
+def serialize(result):
+    """Serializes a tool result as FastMCP does."""
+    return json.dumps(pydantic_core.to_jsonable_python(result))
+
+
+def measure(produce, repeat: int):
+    """Returns (best seconds, serialized bytes) for ``serialize(produce())``."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = serialize(produce())
+        best = min(best, time.perf_counter() - start)
+    return best, len(text.encode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--emails', type=int, default=20)
+    parser.add_argument('--body-kb', type=int, default=32)
+    parser.add_argument('--max-body-chars', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    emails = [buildEmail(i, args.body_kb) for i in range(1, args.emails + 1)]
+    print(f"Page: {args.emails} emails with {args.body_kb} KB bodies")
+
+    modes = [
+        ("full", lambda: emails),
+        ("compact", lambda: projectEmails(emails, compact=True)),
+        ("triage", lambda: projectEmails(emails, ['From', 'Subject', 'Date', 'body'], args.max_body_chars, True)),
+    ]
+    fullTime, fullSize = measure(modes[0][1], args.repeat)
+    for name, produce in modes:
+        seconds, size = measure(produce, args.repeat)
+        print(f"{name:>8}: {size / 1024:9.1f} KB  {seconds * 1000:8.2f} ms  "
+              f"({size / fullSize:6.1%} of the bytes, {seconds / fullTime:6.1%} of the time)")
+
+
+if __name__ == "__main__":
+    main()
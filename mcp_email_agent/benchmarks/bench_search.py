@@ -0,0 +1,63 @@
+"""
+Benchmark for full-text search queries.
+
+Indexes a generated mailbox and times phrase queries and word queries that
+mix a selective term with terms found in most emails. Common terms only add
+to the scores of emails a rarer term already matched, so query time should
+stay in the millisecond range as the mailbox grows.
+
+Run from the mcp_email_agent directory:
+    python -m benchmarks.bench_search
+    python -m benchmarks.bench_search --emails 500000 --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from search_index import SearchIndex
+
+
+def buildIndex(emails: int):
+    """Indexes ``emails`` generated invoices from 500 senders."""
+    index = SearchIndex()
+    for i in range(emails):
+        index.add(str(i), [f"Invoice {i}", f"user{i % 500}@example.com", "", "", f"Payment {i % 97} due soon"])
+    return index
+
+
+def measure(index: SearchIndex, query: str, repeat: int):
+    """Returns the best seconds for one search."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        index.search(query, limit=5)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--emails', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = buildIndex(args.emails)
+    print(f"Indexed {args.emails} emails in {time.perf_counter() - start:.1f} s")
+
+    queries = [
+        ("phrase", '"invoice 4242"'),
+        ("selective + common", 'user7 payment due'),
+        ("common only", 'payment due soon'),
+    ]
+    for name, query in queries:
+        print(f"{name:>20}: {measure(index, query, args.repeat) * 1000:8.2f} ms   {query}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Email body normalization for the MCP Email Agent.
+
+Reply bodies usually carry the whole thread below the new text, HTML bodies
+carry markup and styles, and most bodies end with a signature. None of that
+helps an agent read the message, and all of it costs tokens. ``cleanBody``
+reduces a body to the text its author wrote:
+
+- HTML is converted to plain text; quoted ``<blockquote>`` sections are
+  marked with ``>`` like plain-text quotes.
+- Quoted history is removed: ``>`` lines and the reply header that
+  introduces them, such as "On <date>, <name> wrote:", keeping text written
+  between the quotes. Everything after an Outlook-style header such as
+  "-----Original Message-----" is removed, since that history is unmarked.
+- The signature after an RFC 3676 "-- " delimiter and mobile footers such as
+  "Sent from my iPhone" are removed.
+- Trailing spaces and runs of blank lines are collapsed.
+
+Cleaning a body is much cheaper than downloading it, but it is still repeated
+work, so ``BodyCache`` keeps the cleaned text by UIDL.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+
+# Tags whose content is never shown
+_HIDDEN_TAGS = {'head', 'script', 'style', 'title', 'template'}
+
+# Tags that start a new line of text
+_BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'div', 'dl', 'dt', 'dd', 'fieldset', 'figure',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav',
+    'ol', 'p', 'pre', 'section', 'table', 'tr', 'ul',
+}
+
+# Block tags separated from their neighbours by a blank line
+_PARAGRAPH_TAGS = {'blockquote', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'ol', 'p', 'pre', 'table', 'ul'}
+
+_HTML_START = re.compile(r'\s*<(?:!doctype|html|head|body|div|p|table|span|br|meta)\b', re.I)
+
+# Lines that introduce ">" quoted history; text written between the quotes is kept
+_REPLY_HEADERS = [
+    re.compile(r'^On .{1,300}\bwrote:$', re.S),
+    re.compile(r'^Le .{1,300}\ba écrit\s?:$', re.S),
+    re.compile(r'^Am .{1,300}\bschrieb .{0,100}:$', re.S),
+]
+
+# Outlook-style headers, followed by unmarked history; everything after them is dropped
+_ORIGINAL_MESSAGE = re.compile(r'^-{2,}\s*Original Message\s*-{2,}$', re.I)
+_OUTLOOK_HEADER = re.compile(r'^\*?From:\*? .+')
+_OUTLOOK_FIELDS = re.compile(r'^\*?(Sent|Date|To|Subject):\*? ')
+
+_SIGNATURE_DELIMITER = '-- '
+_MOBILE_FOOTER = re.compile(r'^(Sent from my .{1,40}|Get Outlook for .{1,20}|Sent from Mail for Windows.*)$', re.I)
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the visible text of an HTML document, one list entry per line."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = []
+        self.line = []
+        self.hidden = 0
+        self.quoteDepth = 0
+        self.pre = 0
+
+    def newline(self, paragraph: bool = False):
+        text = "".join(self.line)
+        if not self.pre:
+            text = " ".join(text.split())
+        self.line = []
+        if text:
+            self.lines.append("> " * self.quoteDepth + text)
+        if paragraph and self.lines and self.lines[-1]:
+            self.lines.append("")
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _HIDDEN_TAGS:
+            self.hidden += 1
+        elif tag == 'br':
+            self.newline()
+        elif tag in _BLOCK_TAGS:
+            self.newline(tag in _PARAGRAPH_TAGS)
+            if tag == 'blockquote':
+                self.quoteDepth += 1
+            elif tag == 'pre':
+                self.pre += 1
+            elif tag == 'li':
+                self.line.append("- ")
+        elif tag == 'img':
+            alt = dict(attrs).get('alt')
+            if alt:
+                self.line.append(alt)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in _HIDDEN_TAGS:
+            self.hidden = max(self.hidden - 1, 0)
+        elif tag in _BLOCK_TAGS:
+            self.newline(tag in _PARAGRAPH_TAGS)
+            if tag == 'blockquote':
+                self.quoteDepth = max(self.quoteDepth - 1, 0)
+            elif tag == 'pre':
+                self.pre = max(self.pre - 1, 0)
+        elif tag in ('td', 'th'):
+            self.line.append(" ")
+
+    def handle_data(self, data):
+        if not self.hidden:
+            self.line.append(data)
+
+    def text(self):
+        self.close()
+        if self.line:
+            self.newline()
+        return "\n".join(self.lines)
+
+
+def looksLikeHtml(text: str):
+    """Tells whether a body is an HTML document rather than plain text."""
+    return bool(_HTML_START.match(text[:512]))
+
+
+def htmlToText(html: str):
+    """Converts HTML to plain text, one block element per line.
+
+    Args:
+        html (str): HTML document or fragment.
+
+    Returns:
+        str: The visible text, with ``<blockquote>`` content prefixed by ``> ``.
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    return parser.text()
+
+
+def _isQuoted(line: str):
+    return line.lstrip().startswith(">")
+
+
+def _replyHeader(lines, index: int):
+    """Checks whether ``lines[index]`` starts a reply header.
+
+    Returns:
+        tuple: ``(lineCount, outlook)`` where ``outlook`` is True for headers
+               followed by unmarked history, or None if there is no header.
+    """
+    line = lines[index].strip()
+    if not line:
+        return None
+    if _ORIGINAL_MESSAGE.match(line):
+        return 1, True
+    if _OUTLOOK_HEADER.match(line):
+        following = [l.strip() for l in lines[index + 1:index + 5]]
+        if sum(1 for l in following if _OUTLOOK_FIELDS.match(l)) >= 2:
+            return 1, True
+    if any(header.match(line) for header in _REPLY_HEADERS):
+        return 1, False
+    # Mail clients often wrap the "On ... wrote:" line in two
+    if index + 1 < len(lines):
+        wrapped = line + " " + lines[index + 1].strip()
+        if any(header.match(wrapped) for header in _REPLY_HEADERS):
+            return 2, False
+    return None
+
+
+def stripQuotes(text: str):
+    """Removes quoted history from a reply.
+
+    Args:
+        text (str): Plain-text body.
+
+    Returns:
+        str: The text without ``>`` lines and their reply headers, cut at an
+             Outlook-style header or at a header followed only by quotes.
+    """
+    lines = text.split("\n")
+    kept = []
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        header = _replyHeader(lines, index) if not _isQuoted(line) else None
+        if header:
+            count, outlook = header
+            rest = lines[index + count:]
+            if outlook or all(_isQuoted(l) or not l.strip() for l in rest):
+                break
+            index += count
+            continue
+        if not _isQuoted(line):
+            kept.append(line)
+        index += 1
+    return "\n".join(kept)
+
+
+def stripSignature(text: str):
+    """Removes the signature block and mobile footers at the end of a body.
+
+    Args:
+        text (str): Plain-text body.
+
+    Returns:
+        str: The text before the "-- " delimiter, without trailing footers.
+    """
+    lines = text.split("\n")
+    for index in range(len(lines) - 1, -1, -1):
+        if lines[index] in (_SIGNATURE_DELIMITER, "--"):
+            lines = lines[:index]
+            break
+    while lines and (not lines[-1].strip() or _MOBILE_FOOTER.match(lines[-1].strip())):
+        lines.pop()
+    return "\n".join(lines)
+
+
+def compactText(text: str):
+    """Normalizes body text for compact output.
+
+    Line endings become ``\\n``, trailing spaces are removed and runs of blank
+    lines are collapsed into one.
+
+    Args:
+        text (str): Body text.
+
+    Returns:
+        str: The normalized text.
+    """
+    lines = []
+    blank = True
+    for line in text.splitlines():
+        line = line.rstrip()
+        if line:
+            lines.append(line)
+            blank = False
+        elif not blank:
+            lines.append("")
+            blank = True
+    return "\n".join(lines).rstrip()
+
+
+def decodeBody(body, charset: str = None):
+    """Decodes a raw body in the charset its part declares.
+
+    Args:
+        body (bytes | str): Body from ``setEmail``; text is returned unchanged.
+        charset (str): Declared charset of the body part; UTF-8 is assumed
+                       when there is none or Python does not know it.
+
+    Returns:
+        str: The body text; undecodable bytes are replaced.
+    """
+    if not isinstance(body, bytes):
+        return body
+    try:
+        return body.decode(charset or 'utf-8', 'replace')
+    except LookupError:
+        return body.decode('utf-8', 'replace')
+
+
+def cleanBody(body, charset: str = None):
+    """Reduces an email body to the text its author wrote.
+
+    Args:
+        body (bytes | str): Body from ``setEmail``.
+        charset (str): Declared charset of the body, used to decode bytes.
+
+    Returns:
+        str: Plain text without markup, quoted history or signature. If
+             nothing would be left, e.g. for an inline-forwarded message, the
+             whole text is kept with only the signature removed.
+    """
+    if body is None:
+        return ""
+    text = "\n".join(decodeBody(body, charset).splitlines())
+    if looksLikeHtml(text):
+        text = htmlToText(text)
+    text = stripSignature(text)
+    cleaned = compactText(stripSignature(stripQuotes(text)))
+    return cleaned or compactText(text)
+
+
+class BodyCache:
+    """Cleaned body text by UIDL, least recently used entries evicted first.
+
+    Args:
+        maxEntries (int): Maximum number of bodies kept.
+    """
+
+    def __init__(self, maxEntries: int = 1024):
+        self.maxEntries = maxEntries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, uidl: str, body, charset: str = None):
+        """Returns the cleaned text of ``body``, cleaning it only on the first call per UIDL.
+
+        Args:
+            uidl (str): Unique ID of the message, or None to skip the cache.
+            body (bytes | str): Raw body, used on a cache miss.
+            charset (str): Declared charset of the body.
+
+        Returns:
+            str: The cleaned body.
+        """
+        if uidl is None:
+            return cleanBody(body, charset)
+        with self._lock:
+            if uidl in self._entries:
+                self._entries.move_to_end(uidl)
+                self.stats["hits"] += 1
+                return self._entries[uidl]
+        text = cleanBody(body, charset)
+        with self._lock:
+            self.stats["misses"] += 1
+            self._entries[uidl] = text
+            while len(self._entries) > self.maxEntries:
+                self._entries.popitem(last=False)
+        return text
+
+    def invalidate(self, uidls):
+        """Drops the cleaned bodies of deleted messages."""
+        with self._lock:
+            for uidl in uidls:
+                self._entries.pop(uidl, None)
@@ -0,0 +1,195 @@
+"""
+Bulk sending (mail merge) for the MCP Email Agent.
+
+A template subject and body are rendered once per recipient with
+``string.Template`` placeholders (``$name`` or ``${name}``), and the
+resulting messages are spread over a few pooled SMTP connections.
+
+When the server advertises ESMTP PIPELINING (RFC 2920), the envelope of each
+message (MAIL FROM, every RCPT TO and DATA) is written in one go and the
+replies are read afterwards, so a message costs two round trips instead of
+three plus one per recipient. Servers without PIPELINING fall back to
+``smtplib.SMTP.sendmail``.
+
+Sends are paced by a ``send_scheduler.ProviderLimiter`` when one is given, so
+a large batch slows down instead of getting the account throttled.
+"""
+
+import re
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from string import Template
+
+from send_scheduler import throttleDelay
+
+_LINE_ENDINGS = re.compile(r'\r\n|\r|\n')
+_LEADING_DOT = re.compile(rb'^\.', re.MULTILINE)
+
+
+def renderMessages(recipients: list, subject: str, body: str):
+    """Renders the template for each recipient.
+
+    Args:
+        recipients (list): Recipient addresses (str), or dicts with ``to``
+            and an optional ``variables`` dict.
+        subject (str): Subject template.
+        body (str): Body template.
+
+    Returns:
+        list: ``(to, subject, body)`` tuples in recipient order. ``$email``
+              is always available and holds the recipient address.
+    """
+    subjectTemplate = Template(subject)
+    bodyTemplate = Template(body)
+    rendered = []
+    for recipient in recipients:
+        if isinstance(recipient, str):
+            recipient = {'to': recipient}
+        variables = dict(recipient.get('variables') or {}, email=recipient['to'])
+        rendered.append((
+            recipient['to'],
+            subjectTemplate.safe_substitute(variables),
+            bodyTemplate.safe_substitute(variables),
+        ))
+    return rendered
+
+
+def prepareData(message):
+    """Converts a message to CRLF line endings, dot-stuffed and terminated for DATA."""
+    if isinstance(message, str):
+        message = _LINE_ENDINGS.sub('\r\n', message).encode('ascii')
+    data = _LEADING_DOT.sub(b'..', message)
+    if not data.endswith(b'\r\n'):
+        data += b'\r\n'
+    return data + b'.\r\n'
+
+
+def _rset(smtp):
+    """Resets the transaction, ignoring a connection the server already closed."""
+    try:
+        smtp.rset()
+    except smtplib.SMTPServerDisconnected:
+        pass
+
+
+def pipelinedSendmail(smtp, fromAddress: str, toAddresses: list, message):
+    """Sends one message, pipelining the envelope when the server allows it.
+
+    Args:
+        smtp (smtplib.SMTP): Connected, authenticated connection.
+        fromAddress (str): Envelope sender.
+        toAddresses (list): Envelope recipients.
+        message (str | bytes): The complete message.
+
+    Returns:
+        dict: Refused recipients, as for ``smtplib.SMTP.sendmail``.
+    """
+    if not smtp.has_extn('pipelining'):
+        return smtp.sendmail(fromAddress, toAddresses, message)
+
+    commands = [f"MAIL FROM:{smtplib.quoteaddr(fromAddress)}"]
+    commands += [f"RCPT TO:{smtplib.quoteaddr(address)}" for address in toAddresses]
+    commands.append("DATA")
+    smtp.send("".join(command + "\r\n" for command in commands))
+
+    # Every pipelined command gets a reply; all of them must be read
+    mailCode, mailReply = smtp.getreply()
+    refused = {}
+    for address in toAddresses:
+        code, reply = smtp.getreply()
+        if code not in (250, 251):
+            refused[address] = (code, reply)
+    dataCode, dataReply = smtp.getreply()
+
+    if dataCode == 354 and (mailCode != 250 or len(refused) == len(toAddresses)):
+        # The server wants content although nothing can be delivered; end it empty
+        smtp.send(b".\r\n")
+        smtp.getreply()
+        dataCode = 0
+    if mailCode != 250:
+        _rset(smtp)
+        raise smtplib.SMTPSenderRefused(mailCode, mailReply, fromAddress)
+    if len(refused) == len(toAddresses):
+        _rset(smtp)
+        raise smtplib.SMTPRecipientsRefused(refused)
+    if dataCode != 354:
+        _rset(smtp)
+        raise smtplib.SMTPDataError(dataCode, dataReply)
+
+    smtp.send(prepareData(message))
+    code, reply = smtp.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, reply)
+    return refused
+
+
+def sendBulk(pool, fromAddress: str, messages: list, connections: int, limiter=None, throttleRetries: int = 3):
+    """Sends many single-recipient messages over a few pooled connections.
+
+    Each worker holds one connection and keeps sending until the queue is
+    empty or the connection reaches the pool's message limit. A failure only
+    affects its own message; a dropped connection is replaced. A message the
+    provider refuses for throttling goes back in the queue and is tried again
+    once the limiter lets sending resume.
+
+    Args:
+        pool (SMTPConnectionPool): Pool to take connections from.
+        fromAddress (str): Envelope sender.
+        messages (list): ``(to, message)`` tuples.
+        connections (int): Maximum number of connections to use at once.
+        limiter (ProviderLimiter): Paces the sends, if given.
+        throttleRetries (int): Times a throttled message is put back in the queue.
+
+    Returns:
+        list: One result dict per message, in input order, with ``to``,
+              ``status`` ("sent" or "failed") and ``error`` for failures.
+    """
+    results = [None] * len(messages)
+    retries = [0] * len(messages)
+    pending = list(range(len(messages)))
+    lock = threading.Lock()
+    send = limiter.send if limiter is not None else lambda func, *args: func(*args)
+
+    def nextIndex():
+        with lock:
+            return pending.pop(0) if pending else None
+
+    def requeue(index):
+        with lock:
+            retries[index] += 1
+            pending.append(index)
+
+    def worker():
+        index = nextIndex()
+        while index is not None:
+            try:
+                with pool.connection() as pooled:
+                    while index is not None:
+                        to, message = messages[index]
+                        try:
+                            refused = send(pipelinedSendmail, pooled.smtp, fromAddress, [to], message)
+                            pooled.messages += 1
+                            results[index] = {'to': to, 'status': 'failed', 'error': str(refused[to])} \
+                                if to in refused else {'to': to, 'status': 'sent'}
+                        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                            if throttleDelay(e) is not None and retries[index] < throttleRetries:
+                                # Give up this connection; the limiter holds back the next send
+                                requeue(index)
+                                index = nextIndex()
+                                break
+                            results[index] = {'to': to, 'status': 'failed', 'error': str(e)}
+                        index = nextIndex()
+                        if pooled.messages >= pool.maxMessages:
+                            break
+            except Exception as e:
+                # The connection failed; record this message and carry on with a new one
+                if index is not None and results[index] is None:
+                    results[index] = {'to': messages[index][0], 'status': 'failed', 'error': str(e)}
+                    index = nextIndex()
+
+    workers = max(1, min(connections, len(messages)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-send") as executor:
+        for future in [executor.submit(worker) for _ in range(workers)]:
+            future.result()
+    return results
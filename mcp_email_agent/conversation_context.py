@@ -0,0 +1,180 @@
+"""
+Conversation context management for the MCP client.
+
+Every model request carries the whole conversation, so a long session grows
+more expensive and slower with every turn, mostly because of tool results:
+a single ``pollEmails`` page can be tens of thousands of tokens. Before each
+request, ``ConversationContext.compact`` keeps the conversation within a
+token budget:
+
+1. Tool results that are no longer among the recent turns and are larger
+   than ``summaryTokens`` are replaced with a summary. Email lists are reduced
+   to one line per email (ID, sender, subject, date); other results keep their
+   first characters. The model can call the tool again if it needs the rest.
+2. If the conversation is still over the budget, the oldest turns are dropped
+   whole, so the conversation still starts with a user request and every tool
+   result still follows its call. The current turn is always kept. The
+   instructions are in the system prompt, so no message needs to be kept for
+   them.
+
+Token counts are estimated from the length of each message and corrected with
+the ``input_tokens`` the model reports for each request.
+"""
+
+import json
+
+import pydantic_core
+
+# Characters per token used before the first response calibrates the estimate
+CHARS_PER_TOKEN = 4
+
+# Marks a tool result that was replaced with a summary
+SUMMARY_PREFIX = "[Summary of an earlier "
+
+# Email fields shown in the summary of an email list
+_SUMMARY_FIELDS = ('From', 'Subject', 'Date')
+
+
+def _text(content):
+    """Returns content blocks or a string as JSON text."""
+    if isinstance(content, str):
+        return content
+    return json.dumps(pydantic_core.to_jsonable_python(content))
+
+
+def _block(block, key: str):
+    """Reads a field of a content block, whether it is a dict or an SDK object."""
+    return block.get(key) if isinstance(block, dict) else getattr(block, key, None)
+
+
+def _isToolResults(message: dict):
+    """Tells whether a message carries tool results rather than user text."""
+    content = message['content']
+    return (message['role'] == 'user' and isinstance(content, list) and bool(content)
+            and all(_block(block, 'type') == 'tool_result' for block in content))
+
+
+def summarizeToolResult(name: str, text: str, maxChars: int = 400):
+    """Reduces a tool result to a short summary.
+
+    Args:
+        name (str): Name of the tool that produced the result.
+        text (str): Text of the result.
+        maxChars (int): Characters kept from results that are not email lists.
+
+    Returns:
+        str: One line per email for email lists, otherwise the start of the text.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    emails = data.get('emails') if isinstance(data, dict) else data
+    if isinstance(emails, list) and all(isinstance(email, dict) and 'id' in email for email in emails):
+        lines = [f"{SUMMARY_PREFIX}{name} result: {len(emails)} emails; call {name} again for details]"]
+        for email in emails:
+            keys = {key.lower(): key for key in email}
+            fields = [f"{field}: {email[keys[field.lower()]]}" for field in _SUMMARY_FIELDS
+                      if email.get(keys.get(field.lower()))]
+            lines.append(f"#{email['id']} " + " | ".join(fields))
+        return "\n".join(lines)
+    return (f"{SUMMARY_PREFIX}{name} result, {len(text)} characters; call {name} again for the rest]\n"
+            f"{text[:maxChars]}")
+
+
+class ConversationContext:
+    """Keeps a conversation within a token budget.
+
+    Args:
+        budget (int): Maximum estimated tokens per request, including tools.
+        keepTurns (int): Number of recent turns whose tool results are kept whole.
+        summaryTokens (int): Older tool results above this size are summarized.
+        tools (list): Tool definitions sent with every request.
+        system (str): System prompt sent with every request.
+    """
+
+    def __init__(self, budget: int = 50000, keepTurns: int = 4, summaryTokens: int = 500, tools: list = None,
+                 system: str = None):
+        self.budget = budget
+        self.keepTurns = keepTurns
+        self.summaryTokens = summaryTokens
+        self.fixedChars = (len(_text(tools)) if tools else 0) + len(system or "")
+        self.charsPerToken = CHARS_PER_TOKEN
+        self.stats = {"summarized": 0, "dropped": 0, "tokens": 0, "inputTokens": 0}
+
+    def tokens(self, messages: list):
+        """Estimates the tokens of a request carrying ``messages``."""
+        chars = self.fixedChars + sum(len(_text(message['content'])) for message in messages)
+        return int(chars / self.charsPerToken)
+
+    def record(self, messages: list, usage):
+        """Calibrates the estimate with the input tokens reported for a request.
+
+        Args:
+            messages (list): Messages sent in the request.
+            usage: ``usage`` of the model's response.
+        """
+        inputTokens = sum(getattr(usage, key, None) or 0 for key in
+                          ('input_tokens', 'cache_read_input_tokens', 'cache_creation_input_tokens'))
+        if inputTokens <= 0:
+            return
+        chars = self.fixedChars + sum(len(_text(message['content'])) for message in messages)
+        self.charsPerToken = max(chars / inputTokens, 1.0)
+        self.stats["inputTokens"] = inputTokens
+
+    def turns(self, messages: list):
+        """Returns the index of the first message of each turn.
+
+        A turn starts with a user message that is not a tool result, and holds
+        the assistant replies and tool results that follow it.
+        """
+        return [index for index, message in enumerate(messages)
+                if message['role'] == 'user' and not _isToolResults(message)]
+
+    def summarize(self, messages: list, end: int):
+        """Summarizes the large tool results in ``messages[:end]``."""
+        names = {}
+        for index in range(end):
+            message = messages[index]
+            if message['role'] == 'assistant' and isinstance(message['content'], list):
+                for block in message['content']:
+                    if _block(block, 'type') == 'tool_use':
+                        names[_block(block, 'id')] = _block(block, 'name')
+            elif _isToolResults(message):
+                content = []
+                for block in message['content']:
+                    text = block.get('content')
+                    if (isinstance(text, str) and not text.startswith(SUMMARY_PREFIX)
+                            and len(text) / self.charsPerToken > self.summaryTokens):
+                        block = dict(block, content=summarizeToolResult(names.get(block['tool_use_id'], "tool"), text))
+                        self.stats["summarized"] += 1
+                    content.append(block)
+                # Unchanged messages stay the same objects, so their cache breakpoints still match
+                if any(new is not old for new, old in zip(content, message['content'])):
+                    messages[index] = dict(message, content=content)
+
+    def compact(self, messages: list):
+        """Compacts ``messages`` in place to fit the budget.
+
+        Args:
+            messages (list): Conversation, oldest first. The current turn is
+                always kept.
+
+        Returns:
+            int: Estimated tokens of the compacted request.
+        """
+        starts = self.turns(messages)
+        if len(starts) > self.keepTurns:
+            self.summarize(messages, starts[-self.keepTurns])
+
+        tokens = self.tokens(messages)
+        while tokens > self.budget:
+            # Drop everything before the second turn
+            end = next((index for index in self.turns(messages) if index > 0), None)
+            if end is None:
+                break
+            del messages[:end]
+            self.stats["dropped"] += 1
+            tokens = self.tokens(messages)
+        self.stats["tokens"] = tokens
+        return tokens
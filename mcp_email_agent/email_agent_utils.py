@@ -2,19 +2,41 @@
 Email utility functions for the MCP Email Agent.
 
 This module contains helper functions for email operations including:
-- Email retrieval via POP3
+- Email retrieval via POP3 or IMAP
 - Email sending via SMTP
 - Email parsing and formatting
 
 All functions use environment variables for email server configuration.
 """
 
-from email.parser import Parser
+from email import policy
+from email.feedparser import BytesFeedParser
+from email.header import decode_header, make_header
+from datetime import datetime, timezone
+import atexit
+import time
+import imaplib
 import poplib
 import smtplib
 import os
 from dotenv import load_dotenv
 
+from pop3_session import POP3SessionManager
+from smtp_pool import SMTPConnectionPool
+from tool_executor import checkCancelled
+from uidl_tracker import UidlTracker
+from message_cache import MessageCache
+from search_index import SearchIndex
+from header_index import HeaderIndex
+from attachments import AttachmentStore, encodeChunk, leafParts, partInfo, partManifest
+from bulk_send import renderMessages, sendBulk
+from outbox import Outbox
+from send_scheduler import SendScheduler, throttleDelay
+from mime_builder import OutgoingMessage, streamSendmail
+from mailbox_backend import POP3Backend
+from imap_backend import IMAPBackend
+from body_cleaner import BodyCache, compactText, decodeBody
+
 load_dotenv()
 
 # Email format constants
@@ -22,13 +44,46 @@ FORMAT_HEADERS = "FORMAT_HEADERS"  # Format with only email headers
 FORMAT_MESSAGE = "FORMAT_MESSAGE"  # Format with only email body
 FORMAT_COMBINED = "FORMAT_COMBINED"  # Format with both headers and body
 
+# Number of message lines passed to the parser per feed call
+PARSE_BATCH_LINES = 256
+
 # Load email configuration from environment variables
 EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASS = os.getenv("EMAIL_PASS")
 POP3_SERVER = os.getenv("POP3_SERVER")
 POP3_PORT = int(os.getenv("POP3_PORT", 995))
+MAIL_BACKEND = os.getenv("MAIL_BACKEND", "pop3").lower()
+IMAP_SERVER = os.getenv("IMAP_SERVER")
+IMAP_PORT = int(os.getenv("IMAP_PORT", 993))
+IMAP_MAILBOX = os.getenv("IMAP_MAILBOX", "INBOX")
+IMAP_FETCH_BATCH = int(os.getenv("IMAP_FETCH_BATCH", 64))
 SMTP_SERVER = os.getenv("SMTP_SERVER")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+POP3_SESSION_MAX_AGE = float(os.getenv("POP3_SESSION_MAX_AGE", 30))
+POP3_SESSION_IDLE_TIMEOUT = float(os.getenv("POP3_SESSION_IDLE_TIMEOUT", 300))
+POP3_PIPELINE_WINDOW = int(os.getenv("POP3_PIPELINE_WINDOW", 16))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 4))
+SMTP_POOL_IDLE_TIMEOUT = float(os.getenv("SMTP_POOL_IDLE_TIMEOUT", 60))
+SMTP_POOL_MAX_MESSAGES = int(os.getenv("SMTP_POOL_MAX_MESSAGES", 100))
+BULK_SEND_CONNECTIONS = int(os.getenv("BULK_SEND_CONNECTIONS", min(3, SMTP_POOL_SIZE)))
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "outbox.sqlite3")
+SEND_MAX_ATTEMPTS = int(os.getenv("SEND_MAX_ATTEMPTS", 8))
+SEND_RETRY_BASE_DELAY = float(os.getenv("SEND_RETRY_BASE_DELAY", 30))
+SEND_RETRY_MAX_DELAY = float(os.getenv("SEND_RETRY_MAX_DELAY", 3600))
+SEND_RATE = float(os.getenv("SEND_RATE", 0))
+SEND_BURST = int(os.getenv("SEND_BURST", 10))
+SEND_MAX_CONCURRENCY = int(os.getenv("SEND_MAX_CONCURRENCY", SMTP_POOL_SIZE))
+SEND_THROTTLE_COOLDOWN = float(os.getenv("SEND_THROTTLE_COOLDOWN", 30))
+SEND_MAX_WAIT = float(os.getenv("SEND_MAX_WAIT", 10))
+MESSAGE_CACHE_PATH = os.getenv("MESSAGE_CACHE_PATH", "message_cache.sqlite3")
+MESSAGE_CACHE_MAX_BYTES = int(os.getenv("MESSAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+POLL_PAGE_SIZE = int(os.getenv("POLL_PAGE_SIZE", 20))
+POLL_PAGE_MAX_BYTES = int(os.getenv("POLL_PAGE_MAX_BYTES", 1024 * 1024))
+ATTACHMENT_DIR = os.getenv("ATTACHMENT_DIR") or None
+ATTACHMENT_SPILL_DIR = os.getenv("ATTACHMENT_SPILL_DIR") or None
+ATTACHMENT_CHUNK_BYTES = int(os.getenv("ATTACHMENT_CHUNK_BYTES", 512 * 1024))
+ATTACHMENT_MMAP_THRESHOLD = int(os.getenv("ATTACHMENT_MMAP_THRESHOLD", 1024 * 1024))
+CLEAN_BODY_CACHE_SIZE = int(os.getenv("CLEAN_BODY_CACHE_SIZE", 1024))
 
 def inboxLogin():
     """Logs into the email inbox using POP3.
@@ -43,6 +98,65 @@ def inboxLogin():
     mailbox.pass_(EMAIL_PASS)
     return mailbox
 
+def imapLogin():
+    """Logs into the email inbox using IMAP.
+    
+    Uses environment variables for server and authentication details.
+    
+    Returns:
+        imaplib.IMAP4_SSL: The connected IMAP object.
+    """
+    mailbox = imaplib.IMAP4_SSL(IMAP_SERVER, IMAP_PORT)
+    mailbox.login(EMAIL_USER, EMAIL_PASS)
+    return mailbox
+
+# Shared POP3 session reused across getEmails/deleteEmails calls
+pop3Sessions = POP3SessionManager(inboxLogin, POP3_SESSION_MAX_AGE, POP3_SESSION_IDLE_TIMEOUT)
+
+# Mailbox protocol behind the read and delete functions, chosen by MAIL_BACKEND
+if MAIL_BACKEND == "imap":
+    mailboxBackend = IMAPBackend(imapLogin, IMAP_MAILBOX, IMAP_FETCH_BATCH)
+    MAIL_SERVER = IMAP_SERVER
+else:
+    mailboxBackend = POP3Backend(pop3Sessions, POP3_PIPELINE_WINDOW)
+    MAIL_SERVER = POP3_SERVER
+atexit.register(mailboxBackend.close)
+
+def smtpLogin():
+    """Opens an authenticated SMTP connection.
+    
+    Uses environment variables for server and authentication details.
+    
+    Returns:
+        smtplib.SMTP: The connected and logged-in SMTP object.
+    """
+    send = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+    send.ehlo()  # Identify to the server
+    send.starttls()  # Enable encryption
+    send.ehlo()  # Re-identify over secure connection
+    send.login(EMAIL_USER, EMAIL_PASS)
+    return send
+
+# Shared SMTP connections reused across sendEmail calls
+smtpPool = SMTPConnectionPool(smtpLogin, SMTP_POOL_SIZE, SMTP_POOL_IDLE_TIMEOUT, SMTP_POOL_MAX_MESSAGES)
+atexit.register(smtpPool.close)
+
+# Per-provider send pacing that backs off when the provider throttles
+sendScheduler = SendScheduler(SEND_RATE, SEND_BURST, SEND_MAX_CONCURRENCY, SEND_THROTTLE_COOLDOWN)
+
+# Emails queued for background delivery, kept on disk across restarts
+outbox = Outbox(OUTBOX_PATH, SEND_MAX_ATTEMPTS, SEND_RETRY_BASE_DELAY, SEND_RETRY_MAX_DELAY)
+atexit.register(outbox.close)
+
+def getSessionStats():
+    """Returns counters describing mailbox session and SMTP connection reuse.
+    
+    Returns:
+        dict: Mailbox and SMTP counters of opened, reused and reconnected connections,
+              and the current send rate and concurrency for each SMTP provider.
+    """
+    return {"mailbox": dict(mailboxBackend.stats), "smtp": dict(smtpPool.stats), "sendRate": sendScheduler.stats}
+
 def addAttr(mail: dict, name: str):
     """Safely retrieves an email attribute.
     
@@ -54,40 +168,511 @@ def addAttr(mail: dict, name: str):
         Any: The attribute value if it exists, None otherwise.
     """
     if name in mail:
-        return mail.get(name)
+        return str(mail.get(name))
     else:
         return None
 
-def getEmails(ids: list):
+# Parsed emails remembered by UIDL between polls
+uidlTracker = UidlTracker()
+
+# Raw messages kept on disk by UIDL so restarts do not re-download the mailbox
+messageCache = MessageCache(MESSAGE_CACHE_PATH, MESSAGE_CACHE_MAX_BYTES, f"{EMAIL_USER}@{MAIL_SERVER}")
+atexit.register(messageCache.close)
+
+# Full-text index over every email seen, keyed by UIDL
+searchIndex = SearchIndex()
+
+# Header fields of every email, with date, size and address indexes
+headerIndex = HeaderIndex()
+
+# Decoded attachments, spilled to disk when an agent asks for them
+attachmentStore = AttachmentStore(ATTACHMENT_SPILL_DIR, ATTACHMENT_MMAP_THRESHOLD, f"{EMAIL_USER}@{MAIL_SERVER}")
+atexit.register(attachmentStore.close)
+
+# Bodies with markup, quoted history and signatures removed, by UIDL
+bodyCache = BodyCache(CLEAN_BODY_CACHE_SIZE)
+
+def retrieveMessage(mb, id: int, uidl: str = None):
+    """Retrieves one raw message, using the on-disk cache when possible.
+    
+    Args:
+        mb: Connection from ``mailboxBackend.session()``.
+        id (int): Message number.
+        uidl (str): Unique ID of the message, if known. Enables caching.
+        
+    Returns:
+        tuple: POP3 ``retr`` style response ``(response, lines, octets)``.
+    """
+    checkCancelled()
+    raw = messageCache.get(uidl) if uidl else None
+    if raw is not None:
+        return (b'+OK', raw.split(b'\r\n'), len(raw))
+    [(_, mail)] = mailboxBackend.retrieve(mb, [id])
+    if uidl:
+        messageCache.put(uidl, b'\r\n'.join(mail[1]))
+    return mail
+
+def fetchEmail(mb, id: int, uidl: str = None):
+    """Retrieves and parses one message, using the on-disk cache when possible.
+    
+    Args:
+        mb: Connection from ``mailboxBackend.session()``.
+        id (int): Message number.
+        uidl (str): Unique ID of the message, if known. Enables caching.
+        
+    Returns:
+        dict: Email dictionary containing headers, body and part manifest.
+    """
+    return setEmail(retrieveMessage(mb, id, uidl), id, FORMAT_COMBINED)
+
+def fetchEmails(mb, ids: list, listing: dict = None):
+    """Retrieves and parses several messages, using the on-disk cache when possible.
+    
+    Messages that are not cached are downloaded in one batch, with POP3 RETR
+    commands pipelined or IMAP fetches grouped into UID ranges.
+    
+    Args:
+        mb: Connection from ``mailboxBackend.session()``.
+        ids (list): Message numbers to retrieve.
+        listing (dict): Message number to UIDL, if known. Enables caching.
+        
+    Returns:
+        dict: Message number to email dictionary.
+    """
+    listing = listing or {}
+    emails = {}
+    download = []
+    for id in ids:
+        uidl = listing.get(id)
+        raw = messageCache.get(uidl) if uidl else None
+        if raw is None:
+            download.append(id)
+        else:
+            emails[id] = setEmail((b'+OK', raw.split(b'\r\n'), len(raw)), id, FORMAT_COMBINED)
+    checkCancelled()
+    for id, mail in mailboxBackend.retrieve(mb, download):
+        checkCancelled()
+        uidl = listing.get(id)
+        if uidl:
+            messageCache.put(uidl, b'\r\n'.join(mail[1]))
+        emails[id] = setEmail(mail, id, FORMAT_COMBINED)
+    return emails
+
+def syncEmails(mb, listing: dict, ids: list = None):
+    """Returns emails through the UIDL tracker, downloading unknown ones in one batch.
+    
+    Args:
+        mb: Connection from ``mailboxBackend.session()``.
+        listing (dict): Message number to UIDL, or None if the server lacks UIDL.
+        ids (list): Message numbers to return. If None, returns all.
+        
+    Returns:
+        list: Email dictionaries in the order of ``ids``.
+    """
+    if listing is None:
+        if ids is None:
+            ids = sorted(mailboxBackend.sizes(mb))
+        fetched = fetchEmails(mb, ids)
+        return [fetched[id] for id in ids]
+    fetched = fetchEmails(mb, uidlTracker.unknown(listing, ids), listing)
+    return uidlTracker.sync(listing, lambda id: fetched.get(id) or fetchEmail(mb, id, listing.get(id)), ids)
+
+def cleanEmails(emails: list, listing: dict):
+    """Replaces each body with its cleaned text, cleaned once per UIDL.
+    
+    Args:
+        emails (list): Email dictionaries from setEmail.
+        listing (dict): Message number to UIDL, or None if the server lacks UIDL.
+        
+    Returns:
+        list: New email dictionaries whose ``body`` is text without markup,
+              quoted history or signature.
+    """
+    listing = listing or {}
+    return [dict(email, body=bodyCache.get(listing.get(email['id']), email.get('body'), email.get('charset')))
+            for email in emails]
+
+def getEmails(ids: list, clean: bool = False):
     """Retrieves emails from the mailbox.
     
+    Messages already fetched in an earlier call are recognised by their UIDL
+    and returned from memory; only new messages are downloaded.
+    
     Args:
         ids (list): List of email IDs to retrieve. If empty, retrieves all emails.
+        clean (bool): Return bodies as text without markup, quoted history or signature.
         
     Returns:
         list: List of email dictionaries containing headers and body.
     """
-    mb = inboxLogin()
-    emails = []
-    if not ids:
-        for i in range(len(mb.list()[1])):
-            emails.append(setEmail(mb.retr(i + 1), i + 1, FORMAT_COMBINED))
+    with mailboxBackend.session() as mb:
+        listing = mailboxBackend.listing(mb)
+        emails = syncEmails(mb, listing, ids or None)
+    return cleanEmails(emails, listing) if clean else emails
+
+def getNewEmails(cursor: str, clean: bool = False):
+    """Retrieves only the emails that arrived after a cursor.
+    
+    Args:
+        cursor (str): Cursor returned by an earlier call, or "" for all emails.
+        clean (bool): Return bodies as text without markup, quoted history or signature.
+        
+    Returns:
+        dict: ``emails`` (list of new email dictionaries) and ``cursor`` (str)
+              to pass to the next call.
+    """
+    with mailboxBackend.session() as mb:
+        listing = mailboxBackend.listing(mb)
+        if listing is None:
+            raise poplib.error_proto("Server does not support UIDL")
+        ids = uidlTracker.since(listing, uidlTracker.parseCursor(cursor))
+        emails = syncEmails(mb, listing, ids)
+    if clean:
+        emails = cleanEmails(emails, listing)
+    return {"emails": emails, "cursor": uidlTracker.formatCursor()}
+
+def getPreview(mail: list):
+    """Extracts readable text from the first body lines returned with the headers.
+    
+    Args:
+        mail (list): Truncated email data from ``mailboxBackend.headers``.
+        
+    Returns:
+        str: Text of the first text part found, or an empty string.
+    """
+    msg = parseMessage(mail[1])
+    for part in msg.walk():
+        if part.get_content_maintype() == 'text' and not part.is_multipart():
+            payload = part.get_payload(decode=True) or b''
+            return payload.decode(part.get_content_charset() or 'utf-8', 'replace').strip()
+    return ""
+
+def getEmailPage(offset: int = 0, limit: int = POLL_PAGE_SIZE, cursor: str = "", maxBytes: int = POLL_PAGE_MAX_BYTES,
+                 clean: bool = False):
+    """Retrieves one page of emails, newest first, within a byte budget.
+    
+    Message sizes from LIST are added up before anything is downloaded, and
+    the page ends before it would exceed ``maxBytes``. A page always holds at
+    least one email, so a single large email cannot stall paging.
+    
+    Args:
+        offset (int): Number of emails to skip. Ignored when ``cursor`` is set.
+        limit (int): Maximum number of emails on the page.
+        cursor (str): ``nextCursor`` from the previous page. Unlike offsets,
+                      cursors are not shifted by newly arrived mail.
+        maxBytes (int): Byte budget for the page; 0 for no budget.
+        clean (bool): Return bodies as text without markup, quoted history or signature.
+        
+    Returns:
+        dict: ``emails`` (list), ``total`` (int), and ``nextOffset`` (int) and
+              ``nextCursor`` (str) for the following page, or None on the last page.
+    
+    Raises:
+        ValueError: If ``limit`` is below 1 or ``offset`` is negative, since
+                    such a page would never advance.
+    """
+    if limit < 1:
+        raise ValueError(f"limit must be at least 1, got {limit}")
+    if offset < 0:
+        raise ValueError(f"offset must not be negative, got {offset}")
+    with mailboxBackend.session() as mb:
+        sizes = mailboxBackend.sizes(mb)
+        listing = mailboxBackend.listing(mb)
+        order = sorted(sizes, reverse=True)
+        if cursor:
+            if listing is None:
+                raise poplib.error_proto("Server does not support UIDL")
+            positions = {listing.get(id): position for position, id in enumerate(order)}
+            if cursor not in positions:
+                raise ValueError("Cursor no longer valid; the email it points to was deleted")
+            offset = positions[cursor] + 1
+
+        ids = []
+        used = 0
+        for id in order[offset:offset + limit]:
+            if ids and maxBytes and used + sizes[id] > maxBytes:
+                break
+            ids.append(id)
+            used += sizes[id]
+
+        emails = syncEmails(mb, listing, ids)
+
+    if clean:
+        emails = cleanEmails(emails, listing)
+    end = offset + len(ids)
+    more = end < len(order)
+    return {
+        'emails': emails,
+        'total': len(order),
+        'nextOffset': end if more else None,
+        'nextCursor': listing.get(ids[-1]) if more and ids and listing else None,
+    }
+
+def getEmailHeaders(ids: list, previewLines: int = 0):
+    """Retrieves only the headers of emails, using POP3 TOP or IMAP BODY.PEEK[HEADER].
+    
+    Bodies and attachments are not downloaded, so this is much cheaper than
+    getEmails on a large mailbox.
+    
+    Args:
+        ids (list): List of email IDs. If empty, lists every email.
+        previewLines (int): Number of body lines to fetch for a text preview.
+        
+    Returns:
+        list: Email dictionaries with the headers extracted by setEmail, the
+              message ``size`` in octets and, if requested, a ``preview``.
+    """
+    headers = []
+    with mailboxBackend.session() as mb:
+        sizes = mailboxBackend.sizes(mb)
+        checkCancelled()
+        for id, mail in mailboxBackend.headers(mb, ids or sorted(sizes), previewLines):
+            checkCancelled()
+            obj = setEmail(mail, id, FORMAT_HEADERS)
+            obj['size'] = sizes.get(id)
+            if previewLines:
+                obj['preview'] = getPreview(mail)
+            headers.append(obj)
+    return headers
+
+def decodeHeader(value):
+    """Decodes RFC 2047 encoded words in a header value.
+    
+    Args:
+        value (str): Raw header value, or None.
+        
+    Returns:
+        str: The readable header text, or an empty string.
+    """
+    if not value:
+        return ""
+    try:
+        return str(make_header(decode_header(str(value))))
+    except (UnicodeError, LookupError, ValueError):
+        return str(value)
+
+def getSearchFields(email: dict):
+    """Returns the text of an email's searchable fields, in index order.
+    
+    Args:
+        email (dict): Email dictionary from setEmail.
+        
+    Returns:
+        list: Subject, From, To, Cc and body text.
+    """
+    body = decodeBody(email.get('body') or b'', email.get('charset'))
+    return [decodeHeader(email.get(name)) for name in ('Subject', 'From', 'To', 'Cc')] + [body]
+
+def searchEmails(query: str, limit: int = 10):
+    """Searches the mailbox by subject, sender, recipients and body text.
+    
+    The index is brought up to date first: only messages whose UIDL has not
+    been indexed are fetched, and deleted messages are dropped.
+    
+    Args:
+        query (str): Search words; text in double quotes must match as a phrase.
+        limit (int): Maximum number of results.
+        
+    Returns:
+        list: Matching emails, best first, each with ``id``, ``score`` and
+              the From, To, Cc and Subject headers.
+    """
+    with mailboxBackend.session() as mb:
+        listing = mailboxBackend.listing(mb)
+        if listing is None:
+            raise poplib.error_proto("Server does not support UIDL")
+        searchIndex.retain(set(listing.values()))
+        missing = [id for id, uidl in sorted(listing.items()) if uidl not in searchIndex]
+        for email in syncEmails(mb, listing, missing):
+            searchIndex.add(listing[email['id']], getSearchFields(email))
+
+    ids = {uidl: id for id, uidl in listing.items()}
+    results = []
+    for uidl, score in searchIndex.search(query, limit):
+        email = uidlTracker.get(uidl) or {}
+        results.append({
+            'id': ids[uidl],
+            'score': round(score, 3),
+            'From': email.get('From'),
+            'To': email.get('To'),
+            'Cc': email.get('Cc'),
+            'Subject': email.get('Subject'),
+        })
+    return results
+
+def parseTimestamp(value: str, endOfDay: bool = False):
+    """Converts an ISO 8601 date or date-time to a POSIX timestamp.
+    
+    Args:
+        value (str): e.g. "2024-05-01" or "2024-05-01T09:30:00+02:00". Times
+                     without a timezone are taken as UTC.
+        endOfDay (bool): If True, a bare date means the end of that day.
+        
+    Returns:
+        float: The timestamp, or None for an empty value.
+    """
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    if endOfDay and len(value) == 10:
+        return moment.timestamp() + 86400 - 1e-6
+    return moment.timestamp()
+
+def queryEmails(fromAddress: str = "", toAddress: str = "", subject: str = "",
+                since: str = "", until: str = "", contentType: str = "",
+                minSize: int = 0, maxSize: int = 0, sortBy: str = "date",
+                descending: bool = True, offset: int = 0, limit: int = 20):
+    """Filters and sorts emails by their headers.
+    
+    The header index is brought up to date first, fetching only the headers
+    of messages whose UIDL has not been indexed, so bodies are not downloaded.
+    Backends that search on the server (IMAP) narrow that down to the
+    messages that can match.
+    
+    Args:
+        fromAddress (str): Exact sender address.
+        toAddress (str): Exact address in To or Cc.
+        subject (str): Case-insensitive substring of the subject.
+        since (str): Earliest date, ISO 8601.
+        until (str): Latest date, ISO 8601. A bare date includes that whole day.
+        contentType (str): Content-Type prefix, e.g. "multipart/mixed".
+        minSize (int): Minimum size in bytes.
+        maxSize (int): Maximum size in bytes; 0 for no limit.
+        sortBy (str): "date" or "size".
+        descending (bool): Newest/largest first when True.
+        offset (int): Number of matches to skip.
+        limit (int): Maximum number of matches to return.
+        
+    Returns:
+        list: Matching emails with ``id``, ``size`` and the From, To, Cc,
+              Subject, Date, Message-ID and Content-Type headers.
+    """
+    with mailboxBackend.session() as mb:
+        listing = mailboxBackend.listing(mb)
+        if listing is None:
+            raise poplib.error_proto("Server does not support UIDL")
+        headerIndex.retain(set(listing.values()))
+        candidates = mailboxBackend.search(mb, fromAddress, toAddress, subject, parseTimestamp(since),
+                                           parseTimestamp(until, True), minSize, maxSize)
+        missing = [id for id, uidl in sorted(listing.items())
+                   if uidl not in headerIndex and (candidates is None or id in candidates)]
+        if missing:
+            sizes = mailboxBackend.sizes(mb)
+            known = {id: uidlTracker.get(listing[id]) for id in missing}
+            checkCancelled()
+            for id, mail in mailboxBackend.headers(mb, [id for id in missing if not known[id]]):
+                checkCancelled()
+                known[id] = setEmail(mail, id, FORMAT_HEADERS)
+            entries = []
+            for id in missing:
+                headers = dict(known[id], Subject=decodeHeader(known[id].get('Subject')))
+                entries.append((listing[id], headers, sizes.get(id)))
+            headerIndex.addMany(entries)
+
+    ids = {uidl: id for id, uidl in listing.items()}
+    page = headerIndex.query(
+        fromAddress, toAddress, subject, parseTimestamp(since), parseTimestamp(until, True),
+        contentType, minSize, maxSize, sortBy, descending, offset, limit,
+    )
+    return [dict(record, id=ids[uidl]) for uidl, record in page]
+
+def getAttachment(id: int, partIndex: int, offset: int = 0, length: int = ATTACHMENT_CHUNK_BYTES):
+    """Retrieves a chunk of one decoded MIME part of an email.
+    
+    The part is decoded once into a spill file; later chunks of the same part
+    are read from that file, and only the UIDL listing is asked of the
+    server, to find the message. Without UIDL nothing is spilled, because a
+    message number can belong to another message after a delete, so the part
+    is decoded again for every chunk.
+    
+    Args:
+        id (int): Email ID.
+        partIndex (int): ``index`` of the part in the email's ``parts`` manifest.
+        offset (int): Byte offset into the decoded part.
+        length (int): Maximum number of bytes to return.
+        
+    Returns:
+        dict: Part details, ``encoding`` ("text" or "base64") and ``data`` for
+              the chunk, plus ``nextOffset`` (None when the part is complete).
+    """
+    with mailboxBackend.session() as mb:
+        listing = mailboxBackend.listing(mb) or {}
+        uidl = listing.get(id)
+        info = attachmentStore.find(uidl, partIndex) if uidl else None
+        if info is None:
+            msg = parseMessage(retrieveMessage(mb, id, uidl)[1])
+
+    if info is None:
+        parts = leafParts(msg)
+        if not 0 <= partIndex < len(parts):
+            raise IndexError(f"Email {id} has no part {partIndex}")
+        part = parts[partIndex]
+        info = attachmentStore.spill(uidl, partIndex, part) if uidl else None
+    if info is not None:
+        data, size = attachmentStore.read(info['path'], offset, length)
     else:
-        for id in ids:
-            emails.append(setEmail(mb.retr(id), id, FORMAT_COMBINED))
-    mb.quit()
-    return emails
+        decoded = part.get_payload(decode=True) or b""
+        data, size = decoded[offset:offset + length], len(decoded)
+        info = partInfo(part)
+    encoding, text = encodeChunk(data, info['contentType'], info['charset'])
+    end = offset + len(data)
+    return {
+        'id': id,
+        'partIndex': partIndex,
+        'contentType': info['contentType'],
+        'filename': info['filename'],
+        'size': size,
+        'offset': offset,
+        'encoding': encoding,
+        'data': text,
+        'nextOffset': end if end < size else None,
+    }
 
 def deleteEmails(ids: list):
     """Deletes specified emails from the mailbox.
     
+    The session is committed afterwards (POP3 QUIT or IMAP EXPUNGE), so the
+    deletes are applied and message IDs are renumbered before the next call.
+    If the call is cancelled part-way, none of the deletes are applied. Cached
+    copies of the deleted messages are dropped.
+    
     Args:
         ids (list): List of email IDs to delete.
     """
-    mb = inboxLogin()
-    for id in ids:
-        mb.dele(id)
-    mb.quit()
+    with mailboxBackend.session(commit=True) as mb:
+        listing = mailboxBackend.listing(mb) or {}
+        checkCancelled()
+        for _ in mailboxBackend.delete(mb, ids):
+            checkCancelled()
+    uidls = [listing[id] for id in ids if id in listing]
+    messageCache.invalidate(uidls)
+    uidlTracker.forget(uidls)
+    attachmentStore.invalidate(uidls)
+    bodyCache.invalidate(uidls)
+
+def parseMessage(lines):
+    """Parses raw message lines straight from bytes.
+    
+    Lines are fed to the parser in small batches as POP3 returned them, so
+    the message is never joined into one string or decoded as a whole.
+    Feeding a batch rather than a single line keeps the per-call overhead of
+    the feed parser down. Headers use the modern email policy, which decodes
+    RFC 2047 encoded words.
+    
+    Args:
+        lines (list): Message lines without line endings, as from ``retr``.
+        
+    Returns:
+        email.message.EmailMessage: The parsed message.
+    """
+    parser = BytesFeedParser(policy=policy.default)
+    for start in range(0, len(lines), PARSE_BATCH_LINES):
+        batch = b'\r\n'.join(lines[start:start + PARSE_BATCH_LINES])
+        # Line endings go between lines only, so the body keeps its exact bytes
+        parser.feed(b'\r\n' + batch if start else batch)
+    return parser.close()
 
 def setEmail(mail: list, id: int, format: str):
     """Parses an email message into a structured dictionary.
@@ -102,7 +687,7 @@ def setEmail(mail: list, id: int, format: str):
     """
     obj = {}
     obj['id'] = id
-    msg = Parser().parsestr(b'\r\n'.join(mail[1]).decode('utf-8'))
+    msg = parseMessage(mail[1])
     
     # Extract headers if requested
     if format == FORMAT_HEADERS or format == FORMAT_COMBINED:
@@ -115,52 +700,221 @@ def setEmail(mail: list, id: int, format: str):
         obj['To'] = addAttr(msg, 'To')
         obj['Cc'] = addAttr(msg, 'Cc')
         obj['Content-Language'] = addAttr(msg, 'Content-Language')
+        obj['Date'] = addAttr(msg, 'Date')
+        obj['Message-ID'] = addAttr(msg, 'Message-ID')
     
-    # Extract body if requested
+    # Extract the text body and list the other parts without decoding them
     if format == FORMAT_MESSAGE or format == FORMAT_COMBINED:
         body = ""
+        charset = None
         if msg.is_multipart():
-            for part in msg.walk():
-                if part.get_content_type():
-                    body = part.get_payload(decode=True)
+            text = msg.get_body(preferencelist=('plain', 'html'))
+            if text is not None:
+                body = text.get_payload(decode=True)
+                charset = text.get_content_charset()
         else:
             body = msg.get_payload(decode=True)
+            charset = msg.get_content_charset()
         obj['body'] = body
+        obj['charset'] = charset
+        obj['parts'] = partManifest(msg)
     
     return obj
 
-def sendEmail(fromAddress: str, toAddresses: list, contentType: str, subject: str, body: str):
+def projectEmail(email: dict, fields: list = None, maxBodyChars: int = 0, compact: bool = False):
+    """Trims an email dictionary down to what the caller asked for.
+    
+    Args:
+        email (dict): Email dictionary from setEmail.
+        fields (list): Keys to keep, matched case-insensitively, e.g.
+                       ["from", "subject"]. ``id`` is always kept. Empty keeps all.
+        maxBodyChars (int): If set, the body is decoded to text and cut to this
+                            many characters, and ``truncated`` is set to True.
+        compact (bool): Drop empty values, decode encoded-word headers and
+                        normalize body whitespace.
+        
+    Returns:
+        dict: A new email dictionary; ``email`` is not modified.
+    """
+    if fields:
+        wanted = {name.lower() for name in fields} | {'id'}
+        obj = {key: value for key, value in email.items() if key.lower() in wanted}
+    else:
+        obj = dict(email)
+
+    body = obj.get('body')
+    if body is not None and (maxBodyChars or compact):
+        body = decodeBody(body, email.get('charset'))
+        if compact:
+            # Only normalize as much of a long body as the cut will keep
+            window = maxBodyChars * 2 if maxBodyChars else len(body)
+            while True:
+                text = compactText(body[:window])
+                if window >= len(body) or len(text) > maxBodyChars:
+                    break
+                window *= 2
+            body = text
+        if maxBodyChars and len(body) > maxBodyChars:
+            body = body[:maxBodyChars]
+            obj['truncated'] = True
+        obj['body'] = body
+
+    if compact:
+        for key, value in list(obj.items()):
+            if value is None or value == "" or value == []:
+                del obj[key]
+            elif key not in ('id', 'body', 'parts', 'size', 'preview', 'truncated') and isinstance(value, str):
+                obj[key] = decodeHeader(value)
+        if 'parts' in obj:
+            obj['parts'] = [{k: v for k, v in part.items() if v is not None} for part in obj['parts']]
+    return obj
+
+def projectEmails(emails: list, fields: list = None, maxBodyChars: int = 0, compact: bool = False):
+    """Applies ``projectEmail`` to each email in a list.
+    
+    Returns:
+        list: The projected email dictionaries.
+    """
+    if not fields and not maxBodyChars and not compact:
+        return emails
+    return [projectEmail(email, fields, maxBodyChars, compact) for email in emails]
+
+def sendOutgoing(fromAddress: str, toAddresses: list, message: OutgoingMessage):
+    """Streams a built message to the server on a pooled connection.
+    
+    Returns:
+        dict: Refused recipients, as for ``smtplib.SMTP.sendmail``.
+    """
+    with smtpPool.connection() as pooled:
+        refused = streamSendmail(pooled.smtp, fromAddress, toAddresses, message.chunks())
+        pooled.messages += 1
+        return refused
+
+def sendEmail(fromAddress: str, toAddresses: list, contentType: str, subject: str, body: str,
+              attachments: list = None):
     """Sends an email via SMTP.
     
+    The message is streamed to the server in chunks, so large attachments
+    are never held in memory all at once.
+    
     Args:
         fromAddress (str): Sender's email address.
         toAddresses (list): List of recipient email addresses.
         contentType (str): Content type of the email (e.g., 'text/plain', 'text/html').
         subject (str): Email subject line.
         body (str): Email body content.
+        attachments (list): Paths of files to attach, relative to ATTACHMENT_DIR.
         
     Returns:
         str: Success message or error message.
     """
+    limiter = sendScheduler.limiter(SMTP_SERVER)
     try:
-        # Connect to SMTP server
-        send = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        send.ehlo()  # Identify to the server
-        send.starttls()  # Enable encryption
-        send.ehlo()  # Re-identify over secure connection
-        send.login(EMAIL_USER, EMAIL_PASS)
-        
-        # Construct email message
-        message = "From: " + fromAddress + "\n"
-        message += "To: " + ", ".join(toAddresses) + "\n"
-        message += "MIME-Version: 1.0\n"
-        message += "Content-type: " + contentType + "\n"
-        message += "Subject: " + subject + "\n\n"
-        message += body
-        
-        # Send email
-        send.sendmail(fromAddress, toAddresses, message)
-        send.quit()
+        # Send email on a pooled connection, at a pace the provider accepts
+        message = OutgoingMessage(fromAddress, toAddresses, subject, body, contentType.split('/')[-1], attachments,
+                              ATTACHMENT_DIR)
+        limiter.send(sendOutgoing, fromAddress, toAddresses, message, maxWait=SEND_MAX_WAIT)
         return "Email sent successfully"
     except Exception as e:
-        return f"Failed to send email: {str(e)}"
\ No newline at end of file
+        if throttleDelay(e) is not None:
+            return f"Failed to send email: {str(e)} (throttled by the provider; retry after {limiter.delay():.0f} seconds)"
+        return f"Failed to send email: {str(e)}"
+
+def sendBulkEmails(fromAddress: str, recipients: list, contentType: str, subject: str, body: str):
+    """Sends a templated email to each recipient separately.
+    
+    The subject and body are ``string.Template`` templates rendered per
+    recipient. Messages are spread over up to BULK_SEND_CONNECTIONS pooled
+    SMTP connections, with the envelope pipelined when the server supports it.
+    
+    Args:
+        fromAddress (str): Sender's email address.
+        recipients (list): Recipient addresses, or dicts with ``to`` and an
+            optional ``variables`` dict for the template.
+        contentType (str): Content type of the email (e.g., 'text/plain', 'text/html').
+        subject (str): Subject template.
+        body (str): Body template.
+        
+    Returns:
+        list: One result per recipient with ``to``, ``status`` ("sent" or
+              "failed") and, for failures, ``error``.
+    """
+    subtype = contentType.split('/')[-1]
+    messages = [(to, OutgoingMessage(fromAddress, [to], renderedSubject, renderedBody, subtype).as_bytes())
+                for to, renderedSubject, renderedBody in renderMessages(recipients, subject, body)]
+    return sendBulk(smtpPool, fromAddress, messages, BULK_SEND_CONNECTIONS, sendScheduler.limiter(SMTP_SERVER))
+
+def queueEmail(fromAddress: str, toAddresses: list, contentType: str, subject: str, body: str,
+               attachments: list = None):
+    """Queues an email for background delivery.
+    
+    The message, including any attachments, is stored in the outbox before
+    returning, so it is delivered even if the server restarts or the
+    attachment files are removed in the meantime.
+    
+    Args:
+        fromAddress (str): Sender's email address.
+        toAddresses (list): List of recipient email addresses.
+        contentType (str): Content type of the email (e.g., 'text/plain', 'text/html').
+        subject (str): Email subject line.
+        body (str): Email body content.
+        attachments (list): Paths of files to attach, relative to ATTACHMENT_DIR.
+        
+    Returns:
+        str: Job ID to pass to getSendStatus.
+    """
+    message = OutgoingMessage(fromAddress, toAddresses, subject, body, contentType.split('/')[-1], attachments,
+                              ATTACHMENT_DIR)
+    return outbox.enqueue(fromAddress, toAddresses, message.as_bytes().decode('ascii'))
+
+def deliverQueuedEmail():
+    """Attempts delivery of the next queued email that is due.
+    
+    Temporary failures (4xx replies, dropped connections) are retried later
+    with exponential backoff, or after the provider's retry hint when it is
+    throttling; permanent 5xx refusals fail the job.
+    
+    Returns:
+        bool: True if a job was attempted, False if none was due.
+    """
+    limiter = sendScheduler.limiter(SMTP_SERVER)
+    # Wait out a provider pause before taking a job, so it stays queued meanwhile
+    time.sleep(limiter.delay())
+    job = outbox.claim()
+    if job is None:
+        return False
+    try:
+        refused = limiter.send(smtpPool.sendmail, job['fromAddress'], job['toAddresses'], job['message'])
+        outbox.complete(job['id'], f"Refused recipients: {refused}" if refused else None)
+    except smtplib.SMTPRecipientsRefused as e:
+        if all(code >= 500 for code, _ in e.recipients.values()):
+            outbox.fail(job['id'], str(e))
+        else:
+            outbox.retry(job['id'], str(e), limiter.delay())
+    except smtplib.SMTPResponseException as e:
+        if e.smtp_code >= 500:
+            outbox.fail(job['id'], str(e))
+        else:
+            outbox.retry(job['id'], str(e), limiter.delay())
+    except Exception as e:
+        outbox.retry(job['id'], str(e))
+    return True
+
+def getSendStatus(jobId: str):
+    """Reports the delivery state of a queued email.
+    
+    Args:
+        jobId (str): Job ID returned when the email was queued.
+        
+    Returns:
+        dict: ``id``, ``status`` ("queued", "sending", "sent" or "failed"),
+              ``attempts``, ``error`` from the last attempt, and ``created``,
+              ``updated`` and ``nextAttempt`` as ISO 8601 timestamps.
+    """
+    status = outbox.status(jobId)
+    if status is None:
+        raise ValueError(f"Unknown send job {jobId}")
+    for name in ('created', 'updated', 'nextAttempt'):
+        if status[name] is not None:
+            status[name] = datetime.fromtimestamp(status[name], timezone.utc).isoformat()
+    return status
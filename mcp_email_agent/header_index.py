@@ -0,0 +1,187 @@
+"""
+Structured header index for the MCP Email Agent.
+
+``HeaderIndex`` keeps the headers of every email, keyed by POP3 UIDL, with
+secondary indexes that let ``queryEmails`` avoid scanning the whole mailbox:
+
+- sorted lists of (date, uidl) and (size, uidl), for date ranges and ordering
+- hash maps from lowercased address to UIDLs, for From and To/Cc filters
+
+Like the search index it is maintained incrementally: only new UIDLs are
+added and UIDLs that left the mailbox are removed.
+"""
+
+import bisect
+import threading
+from email.utils import getaddresses, parsedate_to_datetime
+
+# Header fields stored for each email
+FIELDS = ('From', 'To', 'Cc', 'Subject', 'Date', 'Message-ID', 'Content-Type')
+
+# Sort keys accepted by HeaderIndex.query
+SORT_KEYS = ('date', 'size')
+
+
+def parseDate(value):
+    """Converts a Date header to a POSIX timestamp, or 0.0 if it is unusable."""
+    try:
+        return parsedate_to_datetime(str(value)).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return 0.0
+
+
+def parseAddresses(*values):
+    """Returns the set of lowercased email addresses in the given header values."""
+    return {address.lower() for _, address in getaddresses([str(v) for v in values if v]) if address}
+
+
+class HeaderIndex:
+    """Header records with date/size ordering and sender/recipient lookups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = {}
+        self._byDate = []
+        self._bySize = []
+        self._bySender = {}
+        self._byRecipient = {}
+
+    def __contains__(self, uidl: str):
+        return uidl in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, uidl: str, headers: dict, size: int):
+        """Indexes the headers of one email.
+
+        Args:
+            uidl (str): Unique ID of the email.
+            headers (dict): Email dictionary from setEmail.
+            size (int): Message size in octets, from LIST.
+        """
+        self.addMany([(uidl, headers, size)])
+
+    def addMany(self, entries):
+        """Indexes several emails, re-sorting the ordered indexes only once.
+
+        Args:
+            entries (iterable): ``(uidl, headers, size)`` tuples, as for ``add``.
+        """
+        records = {}
+        for uidl, headers, size in entries:
+            record = {name: headers.get(name) for name in FIELDS}
+            record['size'] = size or 0
+            record['_date'] = parseDate(record['Date'])
+            record['_senders'] = parseAddresses(record['From'])
+            record['_recipients'] = parseAddresses(record['To'], record['Cc'])
+            records[uidl] = record
+        with self._lock:
+            # Remove replaced entries while the ordered lists are still sorted
+            for uidl in records:
+                if uidl in self._records:
+                    self._remove(uidl)
+            for uidl, record in records.items():
+                self._records[uidl] = record
+                self._byDate.append((record['_date'], uidl))
+                self._bySize.append((record['size'], uidl))
+                for address in record['_senders']:
+                    self._bySender.setdefault(address, set()).add(uidl)
+                for address in record['_recipients']:
+                    self._byRecipient.setdefault(address, set()).add(uidl)
+            # Appending then sorting once is cheap: the lists were already sorted
+            self._byDate.sort()
+            self._bySize.sort()
+
+    def retain(self, uidls):
+        """Removes every email whose UIDL is not in ``uidls``."""
+        with self._lock:
+            for uidl in [u for u in self._records if u not in uidls]:
+                self._remove(uidl)
+
+    def query(self, sender: str = "", recipient: str = "", subject: str = "",
+              since: float = None, until: float = None, contentType: str = "",
+              minSize: int = 0, maxSize: int = 0, sortBy: str = "date",
+              descending: bool = True, offset: int = 0, limit: int = 20):
+        """Filters, sorts and pages the indexed emails.
+
+        Args:
+            sender (str): Exact sender address.
+            recipient (str): Exact To or Cc address.
+            subject (str): Case-insensitive substring of the subject.
+            since (float): Earliest date, as a POSIX timestamp.
+            until (float): Latest date, as a POSIX timestamp.
+            contentType (str): Content-Type prefix, e.g. "multipart/".
+            minSize (int): Minimum size in octets.
+            maxSize (int): Maximum size in octets; 0 for no limit.
+            sortBy (str): "date" or "size".
+            descending (bool): Largest/newest first when True.
+            offset (int): Number of matches to skip.
+            limit (int): Maximum number of matches to return.
+
+        Returns:
+            list: ``(uidl, record)`` tuples for the requested page.
+        """
+        if sortBy not in SORT_KEYS:
+            raise ValueError(f"sortBy must be one of {', '.join(SORT_KEYS)}")
+        subject = subject.lower()
+        contentType = contentType.lower()
+
+        with self._lock:
+            # Narrow down with the hash indexes first
+            candidates = None
+            if sender:
+                candidates = set(self._bySender.get(sender.lower(), ()))
+            if recipient:
+                matches = self._byRecipient.get(recipient.lower(), set())
+                candidates = matches & candidates if candidates is not None else set(matches)
+
+            # Walk the sorted index for the requested order, or sort a small candidate set
+            ordered = self._byDate if sortBy == 'date' else self._bySize
+            if sortBy == 'date' and (since is not None or until is not None):
+                low = bisect.bisect_left(ordered, (since if since is not None else float('-inf'),))
+                high = bisect.bisect_right(ordered, (until if until is not None else float('inf'), chr(0x10FFFF)))
+                ordered = ordered[low:high]
+            if candidates is not None and len(candidates) < len(ordered):
+                key = '_date' if sortBy == 'date' else 'size'
+                ordered = sorted((self._records[uidl][key], uidl) for uidl in candidates)
+            walk = reversed(ordered) if descending else iter(ordered)
+
+            page = []
+            skipped = 0
+            for _, uidl in walk:
+                record = self._records[uidl]
+                if candidates is not None and uidl not in candidates:
+                    continue
+                if since is not None and record['_date'] < since:
+                    continue
+                if until is not None and record['_date'] > until:
+                    continue
+                if subject and subject not in str(record['Subject'] or '').lower():
+                    continue
+                if contentType and not str(record['Content-Type'] or '').lower().startswith(contentType):
+                    continue
+                if record['size'] < minSize or (maxSize and record['size'] > maxSize):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                page.append((uidl, {k: v for k, v in record.items() if not k.startswith('_')}))
+                if len(page) >= limit:
+                    break
+            return page
+
+    def _remove(self, uidl: str):
+        """Drops one email from every index. Caller holds the lock."""
+        record = self._records.pop(uidl)
+        for ordered, key in ((self._byDate, record['_date']), (self._bySize, record['size'])):
+            position = bisect.bisect_left(ordered, (key, uidl))
+            if position < len(ordered) and ordered[position] == (key, uidl):
+                del ordered[position]
+        for lookup, addresses in ((self._bySender, record['_senders']), (self._byRecipient, record['_recipients'])):
+            for address in addresses:
+                uidls = lookup.get(address)
+                if uidls is not None:
+                    uidls.discard(uidl)
+                    if not uidls:
+                        del lookup[address]
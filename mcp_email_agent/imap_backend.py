@@ -0,0 +1,369 @@
+"""
+IMAP mailbox backend for the MCP Email Agent.
+
+IMAP lets the server do work that POP3 leaves to the client:
+- ``UID FETCH ... BODY.PEEK[HEADER]`` returns just the headers, without
+  setting the \\Seen flag, so header listings never touch message bodies.
+- ``UID SEARCH`` filters by sender, recipient, subject, date and size on the
+  server, so only candidate messages need their headers fetched.
+- A single ``UID FETCH`` accepts a set of UID ranges such as ``4:9,12``, so a
+  batch of messages costs one round trip instead of one per message.
+
+Unlike POP3, several sessions may use a mailbox at once and new mail is seen
+without logging in again, so one connection is kept open and the mailbox is
+re-selected at the start of every session to pick up changes. Messages are
+identified by ``"<UIDVALIDITY>.<UID>"``, which stays the same across
+sessions unless the server renumbers the mailbox. Watching for new mail uses
+IDLE (RFC 2177) on a second connection, so it never holds up the tools.
+"""
+
+import imaplib
+import re
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from mailbox_backend import MailboxBackend
+
+# Messages requested per UID FETCH, bounding the size of a single response
+DEFAULT_BATCH = 64
+
+# Bytes of body text fetched per preview line requested
+PREVIEW_LINE_BYTES = 200
+
+_MESSAGE_START = re.compile(rb'^(\d+) \(')
+_NUMBERS = re.compile(rb'\b(UID|RFC822\.SIZE) (\d+)')
+_SECTION = re.compile(rb'(BODY\[[A-Z.]*\])(?:<\d+>)? \{\d+\}$')
+_CHANGE = re.compile(rb'^\* \d+ (EXISTS|EXPUNGE)\b')
+
+# Seconds between checks of the stop event while idling
+IDLE_POLL = 1.0
+
+
+def uidSet(uids):
+    """Formats UIDs as an IMAP sequence set, collapsing runs into ranges.
+
+    Args:
+        uids (iterable): UIDs as integers.
+
+    Returns:
+        str: e.g. "3:5,9" for [3, 4, 5, 9].
+    """
+    ranges = []
+    for uid in sorted(set(uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(first) if first == last else f"{first}:{last}" for first, last in ranges)
+
+
+def parseFetch(data):
+    """Groups the items of a FETCH response by message.
+
+    Args:
+        data (list): Response data from ``imaplib``, mixing bytes and
+            ``(prefix, literal)`` tuples.
+
+    Returns:
+        list: One dict per message, with ``seq`` and, when present, ``UID``,
+              ``RFC822.SIZE`` and the fetched ``BODY[...]`` sections.
+    """
+    messages = []
+    current = None
+    for item in data:
+        prefix, literal = item if isinstance(item, tuple) else (item, None)
+        if not prefix:
+            continue
+        start = _MESSAGE_START.match(prefix)
+        if start:
+            current = {'seq': int(start.group(1))}
+            messages.append(current)
+        if current is None:
+            continue
+        for name, value in _NUMBERS.findall(prefix):
+            current[name.decode('ascii')] = int(value)
+        section = _SECTION.search(prefix)
+        if section and literal is not None:
+            current[section.group(1).decode('ascii')] = literal
+    return messages
+
+
+def _quote(value: str):
+    """Quotes a search string for an IMAP command."""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _imapDate(timestamp: float):
+    """Formats a POSIX timestamp as an IMAP date, e.g. "01-May-2024"."""
+    moment = datetime.fromtimestamp(timestamp, timezone.utc)
+    return f"{moment.day:02d}-{moment.strftime('%b')}-{moment.year}"
+
+
+def _check(typ, data):
+    """Raises ``imaplib.IMAP4.error`` unless a command returned OK."""
+    if typ != 'OK':
+        raise imaplib.IMAP4.error(b" ".join(d for d in data if isinstance(d, bytes)).decode('utf-8', 'replace'))
+    return data
+
+
+class IMAPBackend(MailboxBackend):
+    """IMAP mailbox over one shared connection.
+
+    Args:
+        connect (callable): Zero-argument function returning a logged-in
+            ``imaplib.IMAP4`` object (normally ``imapLogin``).
+        mailbox (str): Mailbox to select.
+        batchSize (int): Maximum messages requested per UID FETCH.
+    """
+
+    def __init__(self, connect, mailbox: str = "INBOX", batchSize: int = DEFAULT_BATCH):
+        self._connect = connect
+        self.mailbox = mailbox
+        self.batchSize = batchSize
+        self._lock = threading.RLock()
+        self._conn = None
+        self._exists = 0
+        self._uidValidity = None
+        self._uids = None
+        self._pending = []
+        self._idleConn = None
+        self._stats = {"opened": 0, "reused": 0, "reconnects": 0}
+
+    @contextmanager
+    def session(self, commit: bool = False):
+        """Yields the selected connection while holding the connection lock.
+
+        Deletes are applied with EXPUNGE when the block completes, whatever
+        ``commit`` says, since the server holds no session state to commit.
+        If the block raises, messages it flagged for deletion are restored.
+        """
+        with self._lock:
+            conn = self._checkout()
+            try:
+                yield conn
+            except BaseException:
+                self._restore(conn)
+                raise
+            if self._pending:
+                self._expunge(conn)
+
+    def listing(self, conn):
+        return {seq: f"{self._uidValidity}.{uid}" for seq, uid in enumerate(self._uidList(conn), 1)}
+
+    def sizes(self, conn):
+        if not self._exists:
+            return {}
+        messages = parseFetch(_check(*conn.fetch("1:*", "(UID RFC822.SIZE)")))
+        self._uids = [m['UID'] for m in sorted(messages, key=lambda m: m['seq']) if 'UID' in m]
+        return {m['seq']: m['RFC822.SIZE'] for m in messages if 'RFC822.SIZE' in m}
+
+    def retrieve(self, conn, ids):
+        for id, message in self._fetch(conn, ids, "BODY.PEEK[]"):
+            raw = message['BODY[]']
+            if raw.endswith(b'\r\n'):
+                raw = raw[:-2]
+            yield id, (b'+OK', raw.split(b'\r\n'), len(raw))
+
+    def headers(self, conn, ids, bodyLines: int = 0):
+        items = "BODY.PEEK[HEADER]"
+        if bodyLines:
+            items += f" BODY.PEEK[TEXT]<0.{bodyLines * PREVIEW_LINE_BYTES}>"
+        for id, message in self._fetch(conn, ids, items):
+            lines = message['BODY[HEADER]'].rstrip(b'\r\n').split(b'\r\n') + [b'']
+            if bodyLines:
+                lines += message.get('BODY[TEXT]', b'').split(b'\r\n')[:bodyLines]
+            yield id, (b'+OK', lines, 0)
+
+    def delete(self, conn, ids):
+        uids = self._uidsFor(conn, ids)
+        if not uids:
+            return
+        _check(*conn.uid('STORE', uidSet(uids), '+FLAGS.SILENT', '(\\Deleted)'))
+        self._pending.extend(uids)
+        yield from ids
+
+    def search(self, conn, fromAddress: str = "", toAddress: str = "", subject: str = "",
+               since: float = None, until: float = None, minSize: int = 0, maxSize: int = 0):
+        keys = []
+        if fromAddress.isascii() and fromAddress:
+            keys += ['FROM', _quote(fromAddress)]
+        if toAddress.isascii() and toAddress:
+            keys += ['OR', 'TO', _quote(toAddress), 'CC', _quote(toAddress)]
+        if subject.isascii() and subject:
+            keys += ['SUBJECT', _quote(subject)]
+        # SENTSINCE/SENTBEFORE compare the Date header's own calendar day, so
+        # widen by a day on each side to cover every timezone
+        if since is not None:
+            keys += ['SENTSINCE', _imapDate(since - 86400)]
+        if until is not None:
+            keys += ['SENTBEFORE', _imapDate(until + 2 * 86400)]
+        if minSize > 0:
+            keys += ['LARGER', str(minSize - 1)]
+        if maxSize > 0:
+            keys += ['SMALLER', str(maxSize + 1)]
+        if not keys:
+            return None
+        seqs = {uid: seq for seq, uid in enumerate(self._uidList(conn), 1)}
+        data = _check(*conn.uid('SEARCH', *keys))
+        return {seqs[int(uid)] for uid in b" ".join(data).split() if int(uid) in seqs}
+
+    def waitForChange(self, timeout: float, stop):
+        """Waits with IDLE on a separate connection, or for ``timeout`` if the
+        server lacks IDLE."""
+        try:
+            conn = self._idleConnection()
+            if 'IDLE' not in conn.capabilities:
+                stop.wait(timeout)
+                return
+            self._idle(conn, timeout, stop)
+        except (imaplib.IMAP4.abort, OSError):
+            self._idleConn = None
+            raise
+
+    def close(self):
+        with self._lock:
+            for conn in (self._conn, self._idleConn):
+                if conn is None:
+                    continue
+                try:
+                    conn.logout()
+                except (imaplib.IMAP4.error, OSError):
+                    pass
+            self._conn = self._idleConn = None
+
+    @property
+    def stats(self):
+        return self._stats
+
+    def _checkout(self):
+        """Returns a connection with the mailbox freshly selected, reconnecting if needed."""
+        if self._conn is not None:
+            try:
+                self._select(self._conn)
+                self._stats["reused"] += 1
+                return self._conn
+            except (imaplib.IMAP4.abort, OSError):
+                self._discard()
+                self._stats["reconnects"] += 1
+        conn = self._connect()
+        self._select(conn)
+        self._conn = conn
+        self._stats["opened"] += 1
+        return conn
+
+    def _select(self, conn):
+        """Selects the mailbox and resets the cached message numbering."""
+        data = _check(*conn.select(self.mailbox))
+        self._exists = int(data[0] or 0)
+        validity = conn.response('UIDVALIDITY')[1]
+        self._uidValidity = int(validity[0]) if validity and validity[0] else 0
+        self._uids = None
+        self._pending = []
+
+    def _idleConnection(self):
+        """Returns the connection used for IDLE, opening it read-only if needed."""
+        if self._idleConn is None:
+            conn = self._connect()
+            _check(*conn.select(self.mailbox, readonly=True))
+            self._idleConn = conn
+        return self._idleConn
+
+    def _idle(self, conn, timeout: float, stop):
+        """Runs one IDLE command until a message arrives or is expunged, the
+        timeout passes or ``stop`` is set."""
+        tag = conn._new_tag()
+        conn.send(tag + b" IDLE\r\n")
+        changed = False
+        while True:
+            line = conn._get_line()
+            if line.startswith(b"+"):
+                break
+            if line.startswith(tag):
+                del conn.tagged_commands[tag]
+                raise imaplib.IMAP4.error(line.decode('utf-8', 'replace'))
+            changed = changed or bool(_CHANGE.match(line))
+
+        deadline = time.monotonic() + timeout
+        try:
+            while not changed and not stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                conn.sock.settimeout(min(IDLE_POLL, remaining))
+                try:
+                    line = conn._get_line()
+                except (socket.timeout, TimeoutError):
+                    continue
+                changed = bool(_CHANGE.match(line))
+        finally:
+            conn.sock.settimeout(None)
+
+        conn.send(b"DONE\r\n")
+        while True:
+            line = conn._get_line()
+            if line.startswith(tag):
+                break
+        del conn.tagged_commands[tag]
+
+    def _discard(self):
+        """Drops the connection without logging out."""
+        conn, self._conn = self._conn, None
+        try:
+            conn.shutdown()
+        except OSError:
+            pass
+
+    def _uidList(self, conn):
+        """Returns the UID of every message, indexed by message number - 1."""
+        if self._uids is None:
+            if not self._exists:
+                self._uids = []
+            else:
+                data = _check(*conn.uid('SEARCH', 'ALL'))
+                self._uids = sorted(int(uid) for uid in b" ".join(data).split())
+        return self._uids
+
+    def _uidsFor(self, conn, ids):
+        """Maps message numbers to UIDs, rejecting numbers that do not exist."""
+        uids = self._uidList(conn)
+        result = []
+        for id in ids:
+            if not 1 <= id <= len(uids):
+                raise imaplib.IMAP4.error(f"No such message: {id}")
+            result.append(uids[id - 1])
+        return result
+
+    def _fetch(self, conn, ids, items: str):
+        """Yields ``(id, message)`` for ``ids`` in order, one UID FETCH per batch."""
+        ids = list(ids)
+        uids = self._uidsFor(conn, ids)
+        for start in range(0, len(ids), self.batchSize):
+            batch = uids[start:start + self.batchSize]
+            data = _check(*conn.uid('FETCH', uidSet(batch), f"(UID {items})"))
+            fetched = {m['UID']: m for m in parseFetch(data) if 'UID' in m}
+            for id, uid in zip(ids[start:start + self.batchSize], batch):
+                if uid not in fetched:
+                    raise imaplib.IMAP4.error(f"Message {id} no longer exists")
+                yield id, fetched[uid]
+
+    def _expunge(self, conn):
+        """Removes the messages flagged by ``delete``."""
+        uids, self._pending = self._pending, []
+        if 'UIDPLUS' in conn.capabilities:
+            _check(*conn.uid('EXPUNGE', uidSet(uids)))
+        else:
+            _check(*conn.expunge())
+        self._uids = None
+
+    def _restore(self, conn):
+        """Clears the \\Deleted flag from messages flagged in a failed session."""
+        uids, self._pending = self._pending, []
+        if not uids or self._conn is not conn:
+            return
+        try:
+            conn.uid('STORE', uidSet(uids), '-FLAGS.SILENT', '(\\Deleted)')
+        except (imaplib.IMAP4.error, OSError):
+            self._discard()
@@ -0,0 +1,142 @@
+"""
+Mailbox backends for the MCP Email Agent.
+
+The read and delete tools only need a handful of operations from the mail
+server: list the messages with their unique IDs and sizes, download whole
+messages or just their headers, and delete messages. ``MailboxBackend``
+names those operations, and each protocol implements them its own way:
+``POP3Backend`` here, and ``IMAPBackend`` in ``imap_backend``.
+
+Messages are addressed by message number (1 for the oldest message, as in
+POP3 and IMAP sequence numbers) and identified across sessions by their
+unique ID. Messages are returned as POP3 ``retr`` style tuples
+``(response, lines, octets)`` so the parsing code is shared.
+"""
+
+import poplib
+
+from pop3_pipeline import DEFAULT_WINDOW, deleteMany, retrieveMany
+
+
+class MailboxBackend:
+    """Operations the email tools need from a mailbox server."""
+
+    def session(self, commit: bool = False):
+        """Context manager yielding a connection to pass to the other methods.
+
+        Args:
+            commit (bool): If True, changes such as deletes are applied on
+                leaving the block. A block that raises applies none of them
+                where the protocol allows it.
+        """
+        raise NotImplementedError
+
+    def listing(self, conn):
+        """Returns a dict of message number to unique ID, or None if unsupported."""
+        raise NotImplementedError
+
+    def sizes(self, conn):
+        """Returns a dict of message number to size in octets."""
+        raise NotImplementedError
+
+    def retrieve(self, conn, ids):
+        """Yields ``(id, (response, lines, octets))`` for each whole message."""
+        raise NotImplementedError
+
+    def headers(self, conn, ids, bodyLines: int = 0):
+        """Yields ``(id, (response, lines, octets))`` with the headers and the
+        first ``bodyLines`` lines of the body, like POP3 TOP."""
+        raise NotImplementedError
+
+    def delete(self, conn, ids):
+        """Deletes messages, yielding each ID as it is marked."""
+        raise NotImplementedError
+
+    def search(self, conn, fromAddress: str = "", toAddress: str = "", subject: str = "",
+               since: float = None, until: float = None, minSize: int = 0, maxSize: int = 0):
+        """Narrows down the messages matching header criteria on the server.
+
+        The result may include messages that do not match exactly, but never
+        leaves out one that does, so callers still apply their own filter.
+
+        Returns:
+            set: Matching message numbers, or None if the server cannot search.
+        """
+        return None
+
+    def fingerprint(self, conn):
+        """Returns a cheap value that changes when messages arrive or are removed."""
+        listing = self.listing(conn)
+        return tuple(listing.values()) if listing is not None else tuple(self.sizes(conn).items())
+
+    def waitForChange(self, timeout: float, stop):
+        """Blocks until the mailbox may have changed, ``timeout`` seconds pass
+        or ``stop`` (a ``threading.Event``) is set.
+
+        Servers that cannot push changes just wait out the timeout.
+        """
+        stop.wait(timeout)
+
+    def close(self):
+        """Closes any open connection."""
+
+    @property
+    def stats(self):
+        """Counters describing connection reuse."""
+        return {}
+
+
+class POP3Backend(MailboxBackend):
+    """POP3 mailbox through a shared session, with pipelined RETR and DELE.
+
+    Args:
+        sessions (POP3SessionManager): Session manager to take connections from.
+        window (int): Maximum RETR or DELE commands in flight.
+    """
+
+    def __init__(self, sessions, window: int = DEFAULT_WINDOW):
+        self.sessions = sessions
+        self.window = window
+
+    def session(self, commit: bool = False):
+        return self.sessions.session(commit)
+
+    def listing(self, conn):
+        try:
+            lines = conn.uidl()[1]
+        except poplib.error_proto:
+            return None
+        listing = {}
+        for line in lines:
+            num, uidl = line.decode('ascii', 'replace').split(None, 1)
+            listing[int(num)] = uidl
+        return listing
+
+    def sizes(self, conn):
+        sizes = {}
+        for line in conn.list()[1]:
+            num, size = line.split()[:2]
+            sizes[int(num)] = int(size)
+        return sizes
+
+    def retrieve(self, conn, ids):
+        return retrieveMany(conn, ids, self.window)
+
+    def headers(self, conn, ids, bodyLines: int = 0):
+        for id in ids:
+            yield id, conn.top(id, bodyLines)
+
+    def delete(self, conn, ids):
+        for id, _ in deleteMany(conn, ids, self.window):
+            yield id
+
+    def fingerprint(self, conn):
+        listing = self.listing(conn)
+        return tuple(listing.values()) if listing is not None else conn.stat()
+
+    def close(self):
+        self.sessions.close()
+
+    @property
+    def stats(self):
+        return self.sessions.stats
@@ -0,0 +1,118 @@
+"""
+Background mailbox watcher for the MCP Email Agent.
+
+Clients that want to know about new mail would otherwise call a poll tool
+over and over, each call reaching the mail server on its own. A
+``MailboxWatcher`` instead watches the mailbox from one background thread,
+however many clients are subscribed, and calls every subscriber's listener
+when the mailbox changes.
+
+How quickly a change is seen depends on the backend:
+- IMAP servers that support IDLE push new mail, so the watcher wakes as soon
+  as it arrives.
+- Otherwise the watcher compares a cheap fingerprint of the mailbox every
+  ``interval`` seconds: the UIDL list, or the STAT message count and size.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MailboxWatcher:
+    """Watches one mailbox on a background thread and notifies subscribers.
+
+    The thread starts with the first subscriber and stops after the last one
+    leaves.
+
+    Args:
+        backend (MailboxBackend): Mailbox to watch.
+        interval (float): Seconds between checks when the server cannot push
+            changes, and the longest wait for a push when it can.
+    """
+
+    def __init__(self, backend, interval: float = 30.0):
+        self.backend = backend
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._listeners = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._fingerprint = None
+        self.version = 0
+        self.updated = None
+        self.stats = {"checks": 0, "changes": 0, "notified": 0}
+
+    @property
+    def subscribers(self):
+        """Number of subscribed listeners."""
+        return len(self._listeners)
+
+    def subscribe(self, key, listener):
+        """Calls ``listener()`` whenever the mailbox changes, until unsubscribed.
+
+        Args:
+            key: Hashable subscriber identity, e.g. the client session.
+            listener (callable): Called with no arguments on the watcher
+                thread. An exception unsubscribes it.
+        """
+        with self._lock:
+            self._listeners[key] = listener
+            if self._thread is None:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,),
+                                                name="mailbox-watcher", daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self, key):
+        """Stops notifying ``key``, and stops watching if it was the last subscriber."""
+        with self._lock:
+            self._listeners.pop(key, None)
+            if not self._listeners and self._thread is not None:
+                self._stop.set()
+                self._thread = None
+
+    def stop(self):
+        """Unsubscribes everyone and stops the watcher thread."""
+        with self._lock:
+            self._listeners.clear()
+            self._stop.set()
+            self._thread = None
+
+    def check(self):
+        """Compares the mailbox with the previous check and notifies on a change.
+
+        The first check only records the mailbox state.
+
+        Returns:
+            bool: True if the mailbox changed since the previous check.
+        """
+        with self.backend.session() as conn:
+            fingerprint = self.backend.fingerprint(conn)
+        self.stats["checks"] += 1
+        previous, self._fingerprint = self._fingerprint, fingerprint
+        if previous is None or fingerprint == previous:
+            return False
+        self.version += 1
+        self.updated = time.time()
+        self.stats["changes"] += 1
+        for key, listener in list(self._listeners.items()):
+            try:
+                listener()
+                self.stats["notified"] += 1
+            except Exception:
+                logger.exception("Mailbox listener failed; unsubscribing it")
+                self.unsubscribe(key)
+        return True
+
+    def _run(self, stop):
+        """Checks the mailbox, then waits for the backend to signal a change."""
+        while not stop.is_set():
+            try:
+                self.check()
+                self.backend.waitForChange(self.interval, stop)
+            except Exception:
+                logger.exception("Mailbox watch failed")
+                stop.wait(self.interval)
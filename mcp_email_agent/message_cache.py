@@ -0,0 +1,128 @@
+"""
+On-disk cache of raw email messages for the MCP Email Agent.
+
+Raw RFC 822 bytes are stored in SQLite, keyed by mailbox and POP3 UIDL, so a
+message downloaded once does not have to be retrieved again, even after the
+server restarts. The cache has a size cap; when it is exceeded the least
+recently used messages are evicted first.
+"""
+
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    mailbox TEXT NOT NULL,
+    uidl TEXT NOT NULL,
+    raw BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (mailbox, uidl)
+);
+CREATE INDEX IF NOT EXISTS messages_accessed ON messages (accessed);
+"""
+
+
+class MessageCache:
+    """LRU cache of raw messages stored in a SQLite file.
+
+    The database is opened on first use, so creating the cache has no side
+    effects until a message is actually read or stored.
+
+    Args:
+        path (str): SQLite database path, or ":memory:".
+        maxBytes (int): Total size cap for stored messages. 0 disables caching.
+        mailbox (str): Namespace for UIDLs, since they are only unique per mailbox.
+    """
+
+    def __init__(self, path: str, maxBytes: int, mailbox: str = ""):
+        self.path = path
+        self.maxBytes = maxBytes
+        self.mailbox = mailbox
+        self._lock = threading.Lock()
+        self._db = None
+        self._total = 0
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+    def get(self, uidl: str):
+        """Returns the raw message for ``uidl``, or None if it is not cached."""
+        if self.maxBytes <= 0:
+            return None
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT raw FROM messages WHERE mailbox = ? AND uidl = ?",
+                (self.mailbox, uidl),
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            db.execute(
+                "UPDATE messages SET accessed = ? WHERE mailbox = ? AND uidl = ?",
+                (time.time(), self.mailbox, uidl),
+            )
+            db.commit()
+            self.stats["hits"] += 1
+            return bytes(row[0])
+
+    def put(self, uidl: str, raw: bytes):
+        """Stores a raw message, evicting old entries to stay under the cap."""
+        if self.maxBytes <= 0 or len(raw) > self.maxBytes:
+            return
+        with self._lock:
+            db = self._connect()
+            old = db.execute(
+                "SELECT size FROM messages WHERE mailbox = ? AND uidl = ?",
+                (self.mailbox, uidl),
+            ).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO messages (mailbox, uidl, raw, size, accessed) VALUES (?, ?, ?, ?, ?)",
+                (self.mailbox, uidl, raw, len(raw), time.time()),
+            )
+            self._total += len(raw) - (old[0] if old else 0)
+            self._evict(db)
+            db.commit()
+
+    def invalidate(self, uidls):
+        """Removes the given UIDLs, e.g. after their messages were deleted."""
+        if self.maxBytes <= 0:
+            return
+        with self._lock:
+            db = self._connect()
+            for uidl in uidls:
+                row = db.execute(
+                    "SELECT size FROM messages WHERE mailbox = ? AND uidl = ?",
+                    (self.mailbox, uidl),
+                ).fetchone()
+                if row:
+                    db.execute("DELETE FROM messages WHERE mailbox = ? AND uidl = ?", (self.mailbox, uidl))
+                    self._total -= row[0]
+            db.commit()
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _connect(self):
+        """Opens the database on first use. Caller must hold the lock."""
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+            self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM messages").fetchone()[0]
+        return self._db
+
+    def _evict(self, db):
+        """Deletes least recently used messages until under the cap."""
+        while self._total > self.maxBytes:
+            row = db.execute(
+                "SELECT mailbox, uidl, size FROM messages ORDER BY accessed LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            db.execute("DELETE FROM messages WHERE mailbox = ? AND uidl = ?", row[:2])
+            self._total -= row[2]
+            self.stats["evicted"] += 1
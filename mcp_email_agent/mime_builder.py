@@ -0,0 +1,231 @@
+"""
+Streaming outbound message builder for the MCP Email Agent.
+
+``OutgoingMessage`` uses ``email.message.EmailMessage`` for headers and the
+text body, and can carry attachments read from file paths. Instead of
+rendering the whole message into one string, ``chunks()`` yields the encoded
+message piece by piece, reading and base64-encoding each attachment a block
+at a time. ``streamSendmail`` writes those chunks to the server, using RFC
+3030 BDAT when the server advertises CHUNKING and a streamed DATA otherwise,
+so peak memory stays around one chunk whatever the size of the attachments.
+
+Attachment paths come from the agent, so they are resolved against a
+configured attachment directory by ``resolveAttachment``: absolute paths,
+``..`` components and symlinks that lead outside the directory are refused,
+which keeps files such as ``.env`` from being mailed out.
+"""
+
+import base64
+import mimetypes
+import os
+import re
+import smtplib
+import uuid
+from email import policy
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+
+# Bytes of an attachment encoded per chunk (a multiple of 57 gives full 76-character base64 lines)
+CHUNK_BYTES = 57 * 4096
+
+# SMTP line endings, and only 7-bit transfer encodings so no extension is needed
+POLICY = policy.SMTP.clone(cte_type='7bit')
+
+_DOT_AFTER_NEWLINE = re.compile(rb'\n\.')
+
+
+def resolveAttachment(path: str, attachmentDir: str):
+    """Resolves an attachment path inside the attachment directory.
+
+    Args:
+        path (str): Path relative to ``attachmentDir``.
+        attachmentDir (str): Directory attachments may be read from, or None
+            if attachments are disabled.
+
+    Returns:
+        str: The real path of the file.
+
+    Raises:
+        PermissionError: If attachments are disabled or the path is absolute,
+            contains ``..`` or leads outside the directory.
+        FileNotFoundError: If the file does not exist.
+    """
+    if not attachmentDir:
+        raise PermissionError("Attachments are disabled; set ATTACHMENT_DIR to allow them")
+    if os.path.isabs(path) or '..' in re.split(r'[\\/]', path):
+        raise PermissionError(f"Attachment path must be relative to the attachment directory: {path}")
+    root = os.path.realpath(attachmentDir)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise PermissionError(f"Attachment is outside the attachment directory: {path}")
+    if not os.path.isfile(resolved):
+        raise FileNotFoundError(f"Attachment not found: {path}")
+    return resolved
+
+
+def _headerBytes(msg):
+    """Renders the headers of ``msg`` followed by the blank separator line."""
+    return b"".join(msg.policy.fold_binary(name, value) for name, value in msg.items()) + b"\r\n"
+
+
+class OutgoingMessage:
+    """An email to send, rendered on demand in chunks.
+
+    Args:
+        fromAddress (str): Sender's email address.
+        toAddresses (list): Recipient email addresses.
+        subject (str): Email subject line.
+        body (str): Email body content.
+        subtype (str): Body text subtype, "plain" or "html".
+        attachments (list): Paths of files to attach, relative to ``attachmentDir``.
+        attachmentDir (str): Directory attachments may be read from.
+    """
+
+    def __init__(self, fromAddress: str, toAddresses: list, subject: str, body: str,
+                 subtype: str = "plain", attachments: list = None, attachmentDir: str = None):
+        self.attachments = [resolveAttachment(path, attachmentDir) for path in attachments or []]
+
+        self.headers = EmailMessage(policy=POLICY)
+        self.headers['From'] = fromAddress
+        self.headers['To'] = ", ".join(toAddresses)
+        self.headers['Subject'] = subject
+        self.headers['Date'] = formatdate(localtime=True)
+        self.headers['Message-ID'] = make_msgid()
+
+        self.body = EmailMessage(policy=POLICY)
+        self.body.set_content(body, subtype=subtype)
+        if self.attachments:
+            del self.body['MIME-Version']
+            self.boundary = "=_" + uuid.uuid4().hex
+            self.headers['MIME-Version'] = "1.0"
+            self.headers['Content-Type'] = f'multipart/mixed; boundary="{self.boundary}"'
+        else:
+            # A single-part message is the body part with the envelope headers on top
+            for name, value in self.headers.items():
+                self.body[name] = value
+            self.headers = None
+
+    def chunks(self, size: int = CHUNK_BYTES):
+        """Yields the message as CRLF-terminated bytes, one chunk at a time.
+
+        Args:
+            size (int): Attachment bytes encoded per chunk.
+        """
+        if self.headers is None:
+            yield self.body.as_bytes()
+            return
+        delimiter = b"--" + self.boundary.encode('ascii')
+        yield _headerBytes(self.headers) + delimiter + b"\r\n" + self.body.as_bytes()
+        for path in self.attachments:
+            yield b"\r\n" + delimiter + b"\r\n" + _headerBytes(self._attachmentHeaders(path))
+            with open(path, 'rb') as f:
+                while True:
+                    block = f.read(size - size % 57 or 57)
+                    if not block:
+                        break
+                    yield base64.encodebytes(block).replace(b"\n", b"\r\n")
+        yield b"\r\n" + delimiter + b"--\r\n"
+
+    def as_bytes(self):
+        """Returns the whole message, e.g. for storing it in the outbox."""
+        return b"".join(self.chunks())
+
+    def _attachmentHeaders(self, path: str):
+        """Headers of the MIME part for one attachment."""
+        contentType, encoding = mimetypes.guess_type(path)
+        if contentType is None or encoding is not None:
+            contentType = 'application/octet-stream'
+        part = EmailMessage(policy=POLICY)
+        part['Content-Type'] = contentType
+        part.add_header('Content-Disposition', 'attachment', filename=os.path.basename(path))
+        part['Content-Transfer-Encoding'] = 'base64'
+        return part
+
+
+def _lookahead(chunks):
+    """Yields ``(chunk, isLast)`` pairs, skipping empty chunks."""
+    previous = None
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if previous is not None:
+            yield previous, False
+        previous = chunk
+    if previous is not None:
+        yield previous, True
+
+
+def _bdat(smtp, chunks):
+    """Sends the content with BDAT commands, the last one marked LAST."""
+    sent = False
+    for chunk, last in _lookahead(chunks):
+        smtp.send(f"BDAT {len(chunk)}{' LAST' if last else ''}\r\n".encode('ascii') + chunk)
+        code, reply = smtp.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, reply)
+        sent = True
+    if not sent:
+        smtp.send(b"BDAT 0 LAST\r\n")
+        code, reply = smtp.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, reply)
+
+
+def _data(smtp, chunks):
+    """Sends the content after DATA, dot-stuffed across chunk boundaries."""
+    code, reply = smtp.docmd("DATA")
+    if code != 354:
+        raise smtplib.SMTPDataError(code, reply)
+    atLineStart = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        chunk = _DOT_AFTER_NEWLINE.sub(b"\n..", chunk)
+        if atLineStart and chunk.startswith(b"."):
+            chunk = b"." + chunk
+        smtp.send(chunk)
+        atLineStart = chunk.endswith(b"\n")
+    smtp.send(b".\r\n" if atLineStart else b"\r\n.\r\n")
+    code, reply = smtp.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, reply)
+
+
+def streamSendmail(smtp, fromAddress: str, toAddresses: list, chunks):
+    """Sends a message given as an iterable of byte chunks.
+
+    Works like ``smtplib.SMTP.sendmail`` but never needs the whole message in
+    memory: chunks go out with BDAT when the server supports CHUNKING, or
+    through a streamed DATA command otherwise.
+
+    Args:
+        smtp (smtplib.SMTP): Connected, authenticated connection.
+        fromAddress (str): Envelope sender.
+        toAddresses (list): Envelope recipients.
+        chunks (iterable): The message as CRLF-terminated bytes.
+
+    Returns:
+        dict: Refused recipients, as for ``smtplib.SMTP.sendmail``.
+    """
+    smtp.ehlo_or_helo_if_needed()
+    code, reply = smtp.mail(fromAddress)
+    if code != 250:
+        smtp.rset()
+        raise smtplib.SMTPSenderRefused(code, reply, fromAddress)
+    refused = {}
+    for address in toAddresses:
+        code, reply = smtp.rcpt(address)
+        if code not in (250, 251):
+            refused[address] = (code, reply)
+    if len(refused) == len(toAddresses):
+        smtp.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+    try:
+        if smtp.has_extn('chunking'):
+            _bdat(smtp, chunks)
+        else:
+            _data(smtp, chunks)
+    except smtplib.SMTPDataError:
+        smtp.rset()
+        raise
+    return refused
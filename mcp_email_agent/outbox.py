@@ -0,0 +1,196 @@
+"""
+Durable outbound spool for the MCP Email Agent.
+
+Queued emails are written to a SQLite file and delivered later by a
+background worker, so a send tool can return as soon as the message is on
+disk. Each queued email is a job with an ID that can be used to ask for its
+status. Failed deliveries are retried with exponential backoff, and jobs left
+unfinished when the server stopped are picked up again after a restart.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+# Job states
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    sender TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    message TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    nextAttempt REAL NOT NULL,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, nextAttempt);
+"""
+
+
+def backoffDelay(attempts: int, baseDelay: float, maxDelay: float):
+    """Returns the wait before the next attempt after ``attempts`` failures."""
+    return min(maxDelay, baseDelay * 2 ** max(attempts - 1, 0))
+
+
+class Outbox:
+    """Queue of outbound emails stored in a SQLite file.
+
+    The database is opened on first use. Jobs that were being sent when the
+    process stopped are put back in the queue when it is opened again.
+
+    Args:
+        path (str): SQLite database path, or ":memory:".
+        maxAttempts (int): Delivery attempts before a job is marked failed.
+        baseDelay (float): Seconds to wait after the first failed attempt;
+            the wait doubles after each further failure.
+        maxDelay (float): Upper bound on the wait between attempts.
+    """
+
+    def __init__(self, path: str, maxAttempts: int = 8, baseDelay: float = 30.0, maxDelay: float = 3600.0):
+        self.path = path
+        self.maxAttempts = maxAttempts
+        self.baseDelay = baseDelay
+        self.maxDelay = maxDelay
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._db = None
+
+    def enqueue(self, fromAddress: str, toAddresses: list, message: str):
+        """Stores an email for delivery.
+
+        Returns:
+            str: The job ID.
+        """
+        jobId = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT INTO jobs (id, sender, recipients, message, status, nextAttempt, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (jobId, fromAddress, json.dumps(list(toAddresses)), message, QUEUED, now, now, now),
+            )
+            db.commit()
+        self._wakeup.set()
+        return jobId
+
+    def claim(self):
+        """Takes the next job that is due and marks it as being sent.
+
+        Returns:
+            dict: ``id``, ``fromAddress``, ``toAddresses``, ``message`` and
+                  ``attempts`` (including this one), or None if nothing is due.
+        """
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT id, sender, recipients, message, attempts FROM jobs "
+                "WHERE status = ? AND nextAttempt <= ? ORDER BY nextAttempt LIMIT 1",
+                (QUEUED, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                (SENDING, time.time(), row[0]),
+            )
+            db.commit()
+        return {'id': row[0], 'fromAddress': row[1], 'toAddresses': json.loads(row[2]),
+                'message': row[3], 'attempts': row[4] + 1}
+
+    def complete(self, jobId: str, error: str = None):
+        """Marks a job as sent. ``error`` records recipients that were refused."""
+        self._finish(jobId, SENT, error)
+
+    def fail(self, jobId: str, error: str):
+        """Marks a job as permanently failed."""
+        self._finish(jobId, FAILED, error)
+
+    def retry(self, jobId: str, error: str, minDelay: float = 0.0):
+        """Schedules another attempt after a temporary failure.
+
+        The job is marked failed instead once it has used ``maxAttempts``.
+        ``minDelay`` lets a server's retry hint push the next attempt back
+        further than the backoff would.
+        """
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT attempts FROM jobs WHERE id = ?", (jobId,)).fetchone()
+            if row is None:
+                return
+            now = time.time()
+            if row[0] >= self.maxAttempts:
+                db.execute("UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                           (FAILED, error, now, jobId))
+            else:
+                delay = max(backoffDelay(row[0], self.baseDelay, self.maxDelay), minDelay)
+                db.execute("UPDATE jobs SET status = ?, error = ?, nextAttempt = ?, updated = ? WHERE id = ?",
+                           (QUEUED, error, now + delay, now, jobId))
+            db.commit()
+
+    def status(self, jobId: str):
+        """Returns the state of a job, or None if the ID is unknown.
+
+        Returns:
+            dict: ``id``, ``status``, ``attempts``, ``error``, and ``created``,
+                  ``updated`` and ``nextAttempt`` as POSIX timestamps
+                  (``nextAttempt`` is None unless the job is queued).
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT id, status, attempts, error, created, updated, nextAttempt FROM jobs WHERE id = ?",
+                (jobId,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {'id': row[0], 'status': row[1], 'attempts': row[2], 'error': row[3],
+                'created': row[4], 'updated': row[5], 'nextAttempt': row[6] if row[1] == QUEUED else None}
+
+    def nextDue(self):
+        """Returns seconds until the next queued job is due, or None if the queue is empty."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT MIN(nextAttempt) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def wait(self, timeout: float = None):
+        """Blocks until a job is enqueued or ``timeout`` seconds have passed."""
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _finish(self, jobId: str, status: str, error: str):
+        with self._lock:
+            db = self._connect()
+            db.execute("UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                       (status, error, time.time(), jobId))
+            db.commit()
+
+    def _connect(self):
+        """Opens the database on first use. Caller must hold the lock."""
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+            # Jobs interrupted mid-send are delivered again
+            self._db.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, SENDING))
+            self._db.commit()
+        return self._db
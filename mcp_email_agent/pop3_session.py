@@ -0,0 +1,122 @@
+"""
+Managed POP3 session for the MCP Email Agent.
+
+Opening a POP3 connection costs a TCP connect, a TLS handshake and the
+USER/PASS exchange. This module keeps a single authenticated session warm so
+that consecutive reads can share it.
+
+POP3 rules that shape the design:
+- A server grants at most one session per maildrop (RFC 1939 section 8), so
+  the manager never opens a second connection while one is alive and only
+  lets one caller use the session at a time.
+- The maildrop is a snapshot taken at login. New mail only becomes visible
+  after a reconnect, so sessions are refreshed after ``maxAge`` seconds.
+- DELE only takes effect on QUIT. ``commit()`` is the boundary that applies
+  pending deletes; a session that fails mid-operation is closed without QUIT
+  so that partial deletes are discarded.
+"""
+
+import poplib
+import threading
+import time
+from contextlib import contextmanager
+
+
+class POP3SessionManager:
+    """Keeps one authenticated POP3 session alive and hands it out serially.
+
+    Args:
+        connect (callable): Zero-argument function returning a logged-in
+            ``poplib.POP3`` object (normally ``inboxLogin``).
+        maxAge (float): Seconds after login before the session is committed
+            and replaced, so new mail becomes visible.
+        idleTimeout (float): Seconds of inactivity after which the server has
+            probably dropped the session; it is replaced without a NOOP probe.
+    """
+
+    def __init__(self, connect, maxAge: float = 30.0, idleTimeout: float = 300.0):
+        self._connect = connect
+        self.maxAge = maxAge
+        self.idleTimeout = idleTimeout
+        self._lock = threading.RLock()
+        self._mailbox = None
+        self._openedAt = 0.0
+        self._lastUsed = 0.0
+        self.stats = {
+            "opened": 0,
+            "reused": 0,
+            "reconnects": 0,
+            "commits": 0,
+            "discarded": 0,
+        }
+
+    @contextmanager
+    def session(self, commit: bool = False):
+        """Yields the live POP3 mailbox while holding the maildrop lock.
+
+        Args:
+            commit (bool): If True, QUIT after the block so pending DELE
+                commands are applied before returning.
+
+        Yields:
+            poplib.POP3: The authenticated mailbox object.
+        """
+        with self._lock:
+            mailbox = self._checkout()
+            try:
+                yield mailbox
+            except BaseException:
+                self._discard()
+                raise
+            self._lastUsed = time.monotonic()
+            if commit:
+                self.commit()
+
+    def commit(self):
+        """Sends QUIT, applying pending deletes, and drops the session."""
+        with self._lock:
+            if self._mailbox is None:
+                return
+            mailbox, self._mailbox = self._mailbox, None
+            try:
+                mailbox.quit()
+                self.stats["commits"] += 1
+            except (poplib.error_proto, OSError):
+                mailbox.close()
+
+    def close(self):
+        """Commits and closes the current session, if any."""
+        self.commit()
+
+    def _checkout(self):
+        """Returns a usable session, reconnecting when it has gone stale."""
+        now = time.monotonic()
+        if self._mailbox is not None:
+            if now - self._openedAt >= self.maxAge:
+                self.commit()
+            elif now - self._lastUsed >= self.idleTimeout:
+                self._discard()
+                self.stats["reconnects"] += 1
+            else:
+                try:
+                    self._mailbox.noop()
+                    self.stats["reused"] += 1
+                    return self._mailbox
+                except (poplib.error_proto, OSError):
+                    self._discard()
+                    self.stats["reconnects"] += 1
+        self._mailbox = self._connect()
+        self._openedAt = self._lastUsed = time.monotonic()
+        self.stats["opened"] += 1
+        return self._mailbox
+
+    def _discard(self):
+        """Closes the socket without QUIT so pending deletes are abandoned."""
+        if self._mailbox is None:
+            return
+        mailbox, self._mailbox = self._mailbox, None
+        self.stats["discarded"] += 1
+        try:
+            mailbox.close()
+        except OSError:
+            pass
@@ -0,0 +1,113 @@
+"""
+Prompt caching for the MCP client's model requests.
+
+Each request repeats the tool definitions, the system prompt and the
+conversation so far; only the newest messages change. ``PromptCache`` marks
+that repeated prefix with ``cache_control`` breakpoints so the model reads it
+from its prompt cache instead of processing it again:
+
+1. The system prompt, or the last tool definition without one. This covers
+   the tools and system prompt, which never change during a session.
+2. The last message of the previous request, where the previous request
+   wrote the cache, so this request reads everything up to it.
+3. The last message of this request, so the next request can read it.
+
+Breakpoints are added to copies of the request; the conversation itself is
+not changed. Messages compacted by ``ConversationContext`` are new objects,
+so a breakpoint on a compacted message is simply dropped.
+
+For each request, the ``usage`` of the response tells how many input tokens
+were read from the cache, written to it, or processed without it.
+"""
+
+# Cache entry type; ephemeral entries live for five minutes after their last use
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _withBreakpoint(message: dict):
+    """Returns a copy of ``message`` whose last content block carries a breakpoint."""
+    content = message['content']
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    else:
+        content = list(content)
+    last = content[-1]
+    if not isinstance(last, dict):
+        last = last.model_dump(exclude_none=True)
+    content[-1] = dict(last, cache_control=CACHE_CONTROL)
+    return dict(message, content=content)
+
+
+class PromptCache:
+    """Places cache breakpoints on model requests and reports cache use per turn."""
+
+    def __init__(self):
+        self._previous = None
+        self.turn = self._emptyTotals()
+        self.stats = dict(self._emptyTotals(), requests=0, hits=0)
+
+    @staticmethod
+    def _emptyTotals():
+        return {"cacheRead": 0, "cacheWrite": 0, "uncached": 0, "output": 0}
+
+    def prepare(self, params: dict):
+        """Adds cache breakpoints to the parameters of a ``messages.create`` call.
+
+        Args:
+            params (dict): Request parameters with ``messages`` and optionally
+                ``system`` and ``tools``.
+
+        Returns:
+            dict: A copy of ``params`` with breakpoints.
+        """
+        params = dict(params)
+        if params.get('system'):
+            system = params['system']
+            if isinstance(system, str):
+                system = [{"type": "text", "text": system}]
+            params['system'] = system[:-1] + [dict(system[-1], cache_control=CACHE_CONTROL)]
+        elif params.get('tools'):
+            tools = list(params['tools'])
+            tools[-1] = dict(tools[-1], cache_control=CACHE_CONTROL)
+            params['tools'] = tools
+
+        messages = list(params['messages'])
+        if messages:
+            marked = {len(messages) - 1}
+            for index, message in enumerate(messages[:-1]):
+                if message is self._previous:
+                    marked.add(index)
+            for index in marked:
+                messages[index] = _withBreakpoint(messages[index])
+            self._previous = params['messages'][-1]
+        params['messages'] = messages
+        return params
+
+    def record(self, usage):
+        """Adds the token counts of one response to the turn and session totals.
+
+        Args:
+            usage: ``usage`` of the model's response.
+        """
+        counts = {
+            "cacheRead": getattr(usage, 'cache_read_input_tokens', None) or 0,
+            "cacheWrite": getattr(usage, 'cache_creation_input_tokens', None) or 0,
+            "uncached": getattr(usage, 'input_tokens', None) or 0,
+            "output": getattr(usage, 'output_tokens', None) or 0,
+        }
+        for key, value in counts.items():
+            self.turn[key] += value
+            self.stats[key] += value
+        self.stats["requests"] += 1
+        if counts["cacheRead"]:
+            self.stats["hits"] += 1
+
+    def report(self):
+        """Returns a line describing the cache use of the current turn and starts a new turn."""
+        turn = self.turn
+        inputTokens = turn["cacheRead"] + turn["cacheWrite"] + turn["uncached"]
+        share = turn["cacheRead"] / inputTokens if inputTokens else 0.0
+        self.turn = self._emptyTotals()
+        return (f"Cache: {turn['cacheRead']} input tokens read from cache, {turn['cacheWrite']} written, "
+                f"{turn['uncached']} uncached ({share:.0%} hit), {turn['output']} output tokens; "
+                f"{self.stats['hits']} of {self.stats['requests']} requests hit the cache")
@@ -0,0 +1,159 @@
+"""
+Full-text search index for the MCP Email Agent.
+
+``SearchIndex`` is an in-memory inverted index over the subject, sender,
+recipients and body of each email. Postings keep term positions so that
+quoted phrases can be matched, and results are ranked with Okapi BM25.
+
+Documents are keyed by POP3 UIDL, so the index is maintained incrementally:
+only messages with a UIDL the index has not seen are added, and messages
+that disappeared from the mailbox are removed.
+"""
+
+import heapq
+import math
+import re
+import threading
+
+# BM25 tuning constants
+K1 = 1.2
+B = 0.75
+
+# Position gap between fields, so a phrase never matches across two fields
+FIELD_GAP = 1000
+
+# Terms found in more than this share of emails only add to the scores of
+# emails already matched by a rarer query term. Their BM25 weight is close to
+# zero, and walking their postings would dominate query time.
+COMMON_TERM_SHARE = 0.25
+
+_TOKEN = re.compile(r"\w+")
+_PHRASE = re.compile(r'"([^"]*)"')
+
+
+def tokenize(text: str):
+    """Splits text into lowercase word tokens."""
+    return _TOKEN.findall(text.lower())
+
+
+class SearchIndex:
+    """Positional inverted index with BM25 ranking and phrase queries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._terms = {}
+        self._lengths = {}
+        self._totalLength = 0
+
+    def __contains__(self, uidl: str):
+        return uidl in self._lengths
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def add(self, uidl: str, fields: list):
+        """Indexes one email.
+
+        Args:
+            uidl (str): Unique ID of the email.
+            fields (list): Text of each searchable field, in a fixed order.
+        """
+        positions = {}
+        position = 0
+        for text in fields:
+            for token in tokenize(text or ""):
+                positions.setdefault(token, []).append(position)
+                position += 1
+            position += FIELD_GAP
+        length = sum(len(p) for p in positions.values())
+
+        with self._lock:
+            if uidl in self._lengths:
+                self._remove(uidl)
+            for term, termPositions in positions.items():
+                self._postings.setdefault(term, {})[uidl] = termPositions
+            self._terms[uidl] = list(positions)
+            self._lengths[uidl] = length
+            self._totalLength += length
+
+    def retain(self, uidls):
+        """Removes every email whose UIDL is not in ``uidls``."""
+        with self._lock:
+            for uidl in [u for u in self._lengths if u not in uidls]:
+                self._remove(uidl)
+
+    def search(self, query: str, limit: int = 10):
+        """Finds the best-matching emails for a query.
+
+        Words are matched individually and ranked with BM25. Text in double
+        quotes must appear as an exact phrase in a matching email.
+
+        Args:
+            query (str): Search words and/or quoted phrases.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: ``(uidl, score)`` tuples, best match first.
+        """
+        phrases = [tokenize(p) for p in _PHRASE.findall(query)]
+        phrases = [p for p in phrases if p]
+        terms = set(tokenize(_PHRASE.sub(" ", query)))
+        for phrase in phrases:
+            terms.update(phrase)
+        if not terms:
+            return []
+
+        with self._lock:
+            count = len(self._lengths)
+            if not count:
+                return []
+            candidates = self._phraseMatches(phrases) if phrases else None
+            if candidates is not None and not candidates:
+                return []
+            averageLength = self._totalLength / count
+            scores = {}
+            postingLists = sorted((p for p in map(self._postings.get, terms) if p), key=len)
+            for rank, postings in enumerate(postingLists):
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                if candidates is None and rank and len(postings) > COMMON_TERM_SHARE * count:
+                    candidates = set(scores)
+                if candidates is not None:
+                    matches = ((uidl, postings[uidl]) for uidl in candidates if uidl in postings)
+                else:
+                    matches = postings.items()
+                for uidl, positions in matches:
+                    tf = len(positions)
+                    norm = K1 * (1 - B + B * self._lengths[uidl] / averageLength)
+                    scores[uidl] = scores.get(uidl, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+            return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def _phraseMatches(self, phrases: list):
+        """Returns the UIDLs containing every phrase. Caller holds the lock."""
+        words = {term for phrase in phrases for term in phrase}
+        postings = sorted((self._postings.get(term, {}) for term in words), key=len)
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates.intersection_update(other)
+            if not candidates:
+                break
+        return {uidl for uidl in candidates
+                if all(self._hasPhrase(uidl, phrase) for phrase in phrases)}
+
+    def _hasPhrase(self, uidl: str, phrase: list):
+        """Checks whether the words of ``phrase`` appear consecutively. Caller holds the lock."""
+        postings = [self._postings.get(term, {}).get(uidl) for term in phrase]
+        if not all(postings):
+            return False
+        following = [set(p) for p in postings[1:]]
+        return any(all(start + offset + 1 in positions for offset, positions in enumerate(following))
+                   for start in postings[0])
+
+    def _remove(self, uidl: str):
+        """Drops one email from the index. Caller holds the lock."""
+        for term in self._terms.pop(uidl):
+            postings = self._postings[term]
+            del postings[uidl]
+            if not postings:
+                del self._postings[term]
+        self._totalLength -= self._lengths.pop(uidl)
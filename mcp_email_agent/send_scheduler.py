@@ -0,0 +1,265 @@
+"""
+Adaptive send rate control for the MCP Email Agent.
+
+Mail providers throttle accounts that send too fast, answering with 421, 451
+or an enhanced status code of 4.7.x, and sometimes saying how long to wait.
+Retrying straight away makes it worse and can get the account blocked.
+
+``SendScheduler`` keeps one ``ProviderLimiter`` per SMTP provider. Each
+limiter combines:
+
+- a token bucket, so messages start at no more than ``rate`` per second
+  (with bursts of up to ``burst``)
+- a concurrency limit on messages in flight
+
+Both follow AIMD: a throttling reply halves them and pauses sending for the
+server's retry hint (or ``cooldown`` seconds without one), and every
+successful send raises them again by a small step.
+
+A ``rate`` of 0 sets no limit: messages start as fast as the concurrency
+limit allows until the provider first throttles. The rate measured at that
+point becomes the maximum rate, and AIMD carries on from there.
+"""
+
+import re
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Reply codes providers use for rate limiting
+THROTTLE_CODES = (421, 451)
+
+# Fraction of the maximum rate regained after each successful send
+RATE_INCREASE = 0.05
+
+_ENHANCED_THROTTLE = re.compile(rb'\b4\.7\.\d{1,3}\b')
+_RETRY_HINT = re.compile(
+    rb'(?:try again|retry)(?: later)?(?: in| after)?\s+(\d+)\s*(s|secs?|seconds?|m|mins?|minutes?)?\b',
+    re.IGNORECASE,
+)
+
+
+def isThrottle(code: int, message: bytes):
+    """Tells whether an SMTP reply is a temporary rate-limit refusal."""
+    if isinstance(message, str):
+        message = message.encode('utf-8', 'replace')
+    return code in THROTTLE_CODES or (400 <= code < 500 and bool(_ENHANCED_THROTTLE.search(message or b"")))
+
+
+def retryHint(message: bytes):
+    """Returns the wait in seconds a reply asks for, e.g. "try again in 5 minutes", or None."""
+    if isinstance(message, str):
+        message = message.encode('utf-8', 'replace')
+    match = _RETRY_HINT.search(message or b"")
+    if match is None:
+        return None
+    seconds = float(match.group(1))
+    if (match.group(2) or b"s").lower().startswith(b"m"):
+        seconds *= 60
+    return seconds
+
+
+def throttleDelay(error: Exception):
+    """Checks whether a send failure was caused by throttling.
+
+    Returns:
+        float: Seconds the server asked to wait (0 if it gave no hint), or
+               None if the failure was not a throttling reply.
+    """
+    if isinstance(error, smtplib.SMTPResponseException):
+        replies = [(error.smtp_code, error.smtp_error)]
+    elif isinstance(error, smtplib.SMTPRecipientsRefused):
+        replies = list(error.recipients.values())
+    else:
+        return None
+    throttled = [message for code, message in replies if isThrottle(code, message)]
+    if not throttled:
+        return None
+    return max((retryHint(message) or 0.0) for message in throttled)
+
+
+class SendThrottled(Exception):
+    """Raised when a send would have to wait longer than the caller allows.
+
+    Attributes:
+        retryAfter (float): Seconds until sending is expected to resume.
+    """
+
+    def __init__(self, retryAfter: float):
+        super().__init__(f"Sending is throttled by the provider; retry after {retryAfter:.0f} seconds")
+        self.retryAfter = retryAfter
+
+
+class ProviderLimiter:
+    """Token bucket and AIMD concurrency limit for one provider.
+
+    Args:
+        rate (float): Maximum messages started per second; 0 sets no limit
+            until the provider throttles.
+        burst (int): Messages that may start at once after a quiet period.
+        maxConcurrency (int): Maximum messages in flight.
+        cooldown (float): Seconds to pause after a throttling reply that
+            carries no retry hint.
+    """
+
+    def __init__(self, rate: float, burst: int, maxConcurrency: int, cooldown: float = 30.0):
+        self.maxRate = rate
+        self.maxConcurrency = maxConcurrency
+        self.burst = burst
+        self.cooldown = cooldown
+        self.rate = rate
+        self.concurrency = float(maxConcurrency)
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._pausedUntil = 0.0
+        self._inflight = 0
+        # Start times of the latest sends, to measure the rate while unlimited
+        self._starts = deque(maxlen=max(2, burst))
+        self._cond = threading.Condition()
+        self.stats = {"sent": 0, "throttled": 0}
+
+    def delay(self):
+        """Returns seconds until a message could start, ignoring concurrency."""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if not self.rate:
+                return max(self._pausedUntil - now, 0.0)
+            return max(self._pausedUntil - now, (1 - self._tokens) / self.rate, 0.0)
+
+    def acquire(self, maxWait: float = None):
+        """Waits for a token and a free slot.
+
+        Args:
+            maxWait (float): Raise ``SendThrottled`` instead of waiting longer
+                than this many seconds. None waits as long as needed.
+        """
+        deadline = None if maxWait is None else time.monotonic() + maxWait
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = max(self._pausedUntil - now, 0.0)
+                if not wait and self._inflight < max(1, int(self.concurrency)):
+                    if not self.rate:
+                        self._starts.append(now)
+                        self._inflight += 1
+                        return
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self._inflight += 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                timeout = wait or None
+                if deadline is not None:
+                    if now + wait > deadline or (not wait and now >= deadline):
+                        raise SendThrottled(max(wait, 1.0))
+                    timeout = wait or deadline - now
+                # A slot freed by release() also wakes this wait
+                self._cond.wait(timeout)
+
+    def release(self):
+        """Frees the slot taken by ``acquire``."""
+        with self._cond:
+            self._inflight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, maxWait: float = None):
+        """Holds a send slot for the duration of the block."""
+        self.acquire(maxWait)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def succeeded(self):
+        """Additive increase after a message was accepted."""
+        with self._cond:
+            self.stats["sent"] += 1
+            if self.maxRate:
+                self.rate = min(self.maxRate, self.rate + self.maxRate * RATE_INCREASE)
+            self.concurrency = min(float(self.maxConcurrency), self.concurrency + 1 / self.concurrency)
+            self._cond.notify_all()
+
+    def throttled(self, retryAfter: float = 0.0):
+        """Multiplicative decrease and a pause after a throttling reply."""
+        with self._cond:
+            self.stats["throttled"] += 1
+            if not self.maxRate:
+                self.maxRate = self.rate = self._measuredRate()
+            self.rate = max(self.maxRate * RATE_INCREASE, self.rate / 2)
+            self.concurrency = max(1.0, self.concurrency / 2)
+            now = time.monotonic()
+            self._refill(now)
+            self._pausedUntil = max(self._pausedUntil, now + (retryAfter or self.cooldown))
+            # Start again with an empty bucket once the pause is over, not with a burst
+            self._tokens = min(self._tokens, 0.0)
+            self._refilled = self._pausedUntil
+
+    def send(self, func, *args, maxWait: float = None):
+        """Calls ``func(*args)`` in a slot and adapts to the outcome.
+
+        Throttling failures slow the limiter down and are re-raised for the
+        caller to retry later; other failures leave the limits unchanged.
+        """
+        with self.slot(maxWait):
+            try:
+                result = func(*args)
+            except Exception as e:
+                delay = throttleDelay(e)
+                if delay is not None:
+                    self.throttled(delay)
+                raise
+            self.succeeded()
+            return result
+
+    def _measuredRate(self):
+        """Returns the messages per second started recently, at least 1. Caller holds the lock."""
+        if len(self._starts) < 2 or self._starts[-1] <= self._starts[0]:
+            return 1.0
+        return max(1.0, (len(self._starts) - 1) / (self._starts[-1] - self._starts[0]))
+
+    def _refill(self, now: float):
+        """Adds the tokens earned since the last refill. Caller holds the lock."""
+        if now <= self._refilled or not self.rate:
+            return
+        self._tokens = min(float(self.burst), self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+
+class SendScheduler:
+    """One ``ProviderLimiter`` per SMTP provider, created on first use.
+
+    Args:
+        rate (float): Maximum messages per second for each provider; 0 sets
+            no limit until the provider throttles.
+        burst (int): Token bucket size for each provider.
+        maxConcurrency (int): Maximum messages in flight per provider.
+        cooldown (float): Pause after a throttling reply without a retry hint.
+    """
+
+    def __init__(self, rate: float, burst: int, maxConcurrency: int, cooldown: float = 30.0):
+        self.rate = rate
+        self.burst = burst
+        self.maxConcurrency = maxConcurrency
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._limiters = {}
+
+    def limiter(self, provider: str):
+        """Returns the limiter for ``provider``, e.g. the SMTP server host."""
+        with self._lock:
+            if provider not in self._limiters:
+                self._limiters[provider] = ProviderLimiter(self.rate, self.burst, self.maxConcurrency, self.cooldown)
+            return self._limiters[provider]
+
+    @property
+    def stats(self):
+        """Current rate, concurrency and counters for each provider."""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {provider: dict(limiter.stats, rate=limiter.rate, concurrency=limiter.concurrency)
+                for provider, limiter in limiters.items()}
@@ -0,0 +1,150 @@
+"""
+SMTP connection pool for the MCP Email Agent.
+
+Each new SMTP connection costs EHLO, STARTTLS, a second EHLO and AUTH on top
+of the TCP and TLS handshakes. The pool keeps a bounded number of
+authenticated connections and hands them out to senders.
+
+A pooled connection is checked with RSET before reuse, which both proves the
+server is still there and clears any half-finished transaction. Connections
+are replaced after ``idleTimeout`` seconds without use (servers close idle
+clients after a few minutes) or after ``maxMessages`` messages (many
+providers cap messages per session).
+"""
+
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PooledConnection:
+    """An authenticated SMTP connection plus the bookkeeping the pool needs.
+
+    Attributes:
+        smtp (smtplib.SMTP): The underlying connection.
+        createdAt (float): Monotonic time the connection was opened.
+        lastUsed (float): Monotonic time the connection was last returned.
+        messages (int): Number of messages sent on this connection.
+    """
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.createdAt = self.lastUsed = time.monotonic()
+        self.messages = 0
+
+    def close(self):
+        """Ends the SMTP session, ignoring errors from a dead connection."""
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+
+
+class SMTPConnectionPool:
+    """Bounded pool of authenticated SMTP connections.
+
+    Args:
+        connect (callable): Zero-argument function returning a logged-in
+            ``smtplib.SMTP`` object (normally ``smtpLogin``).
+        size (int): Maximum number of connections open at once.
+        idleTimeout (float): Seconds a connection may sit unused before it
+            is closed instead of reused.
+        maxMessages (int): Messages sent on one connection before it is
+            replaced.
+    """
+
+    def __init__(self, connect, size: int = 4, idleTimeout: float = 60.0, maxMessages: int = 100):
+        self._connect = connect
+        self.size = size
+        self.idleTimeout = idleTimeout
+        self.maxMessages = maxMessages
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self.stats = {
+            "opened": 0,
+            "reused": 0,
+            "reconnects": 0,
+            "evicted": 0,
+        }
+
+    @contextmanager
+    def connection(self):
+        """Checks out a connection for the duration of the block.
+
+        Blocks while ``size`` connections are already in use. A connection
+        that lost its socket inside the block is closed rather than returned.
+
+        Yields:
+            PooledConnection: The checked-out connection.
+        """
+        self._slots.acquire()
+        try:
+            pooled = self._checkout()
+            try:
+                yield pooled
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # The server answered, so the connection itself is still usable
+                self._checkin(pooled)
+                raise
+            except OSError:
+                pooled.smtp.close()
+                raise
+            except BaseException:
+                pooled.close()
+                raise
+            self._checkin(pooled)
+        finally:
+            self._slots.release()
+
+    def sendmail(self, fromAddress: str, toAddresses: list, message):
+        """Sends one message on a pooled connection.
+
+        Returns:
+            dict: Refused recipients, as returned by ``smtplib.SMTP.sendmail``.
+        """
+        with self.connection() as pooled:
+            refused = pooled.smtp.sendmail(fromAddress, toAddresses, message)
+            pooled.messages += 1
+            return refused
+
+    def close(self):
+        """Closes every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            pooled.close()
+
+    def _checkout(self):
+        """Returns a live idle connection, or opens a new one."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                pooled = self._idle.pop()
+            if time.monotonic() - pooled.lastUsed >= self.idleTimeout:
+                self.stats["evicted"] += 1
+                pooled.close()
+                continue
+            try:
+                if pooled.smtp.rset()[0] == 250:
+                    self.stats["reused"] += 1
+                    return pooled
+            except OSError:
+                pass
+            self.stats["reconnects"] += 1
+            pooled.smtp.close()
+        pooled = PooledConnection(self._connect())
+        self.stats["opened"] += 1
+        return pooled
+
+    def _checkin(self, pooled):
+        """Returns a connection to the pool unless it has reached its limit."""
+        if pooled.messages >= self.maxMessages:
+            self.stats["evicted"] += 1
+            pooled.close()
+            return
+        pooled.lastUsed = time.monotonic()
+        with self._lock:
+            self._idle.append(pooled)
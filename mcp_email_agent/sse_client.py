@@ -5,19 +5,34 @@ from contextlib import AsyncExitStack
 from mcp import ClientSession
 from mcp.client.sse import sse_client
 from dotenv import load_dotenv
-from anthropic import AnthropicBedrock
+from anthropic import AsyncAnthropicBedrock
 import mcp.types as types
+from conversation_context import ConversationContext
+from prompt_cache import PromptCache
+from tool_result_cache import ToolResultCache, cacheKey
 
 # Load environment variables
 load_dotenv()
 
+# Sent as the system prompt of every request; it never changes, so it is cached with the tools
+SYSTEM_PROMPT = "You are a helpful assistant, you have the ability to call tools to achieve user requests."
+
+# Tool lists by server, kept across connections
+_tool_lists = {}
+
 class SSE_MCP_Client:
     """
     Client for connecting to an MCP server using SSE.
+
+    Results of read-only tools are cached (see ``tool_result_cache``), so a
+    repeated read costs no round trip to the server.
     """
-    def __init__(self):
+    def __init__(self, cache: ToolResultCache = None):
         self.exit_stack = AsyncExitStack()
         self.session: Optional[ClientSession] = None
+        self.server_key = None
+        self.cache = cache or ToolResultCache()
+        self._inflight = {}
 
     async def connect_to_server(self, server_url: str):
         """Connects to an MCP server via SSE."""
@@ -26,19 +41,64 @@ class SSE_MCP_Client:
             sse_recv, sse_sent = sse_transport
             self.session = await self.exit_stack.enter_async_context(ClientSession(sse_recv, sse_sent))
             if self.session:
-                await self.session.initialize()
+                result = await self.session.initialize()
+                self.server_key = (server_url, result.serverInfo.name, result.serverInfo.version)
                 print(f"Connected to MCP server at {server_url}")
         except Exception as e:
             print(f"Failed to connect to server: {e}")
 
-    async def get_tools(self) -> List[types.Tool]:
-        """Retrieves available tools from the server."""
+    async def get_tools(self, refresh: bool = False) -> List[types.Tool]:
+        """Retrieves available tools from the server, or from an earlier connection to it."""
         if not self.session:
             print("Session not initialized. Cannot retrieve tools.")
             return []
-        response = await self.session.list_tools()
-        print("Available tools:", [tool.name for tool in response.tools])
-        return response.tools
+        tools = None if refresh else _tool_lists.get(self.server_key)
+        if tools is None:
+            response = await self.session.list_tools()
+            tools = _tool_lists[self.server_key] = response.tools
+        # Tools the server marks read-only are cached along with the known ones
+        for tool in tools:
+            annotations = getattr(tool, "annotations", None) or {}
+            if isinstance(annotations, dict):
+                read_only = annotations.get("readOnlyHint")
+            else:
+                read_only = getattr(annotations, "readOnlyHint", False)
+            if read_only:
+                self.cache.readOnly.add(tool.name)
+        print("Available tools:", [tool.name for tool in tools])
+        return tools
+
+    async def call_tool(self, name: str, arguments: dict):
+        """
+        Calls a tool on the server, answering repeated read-only calls from the cache.
+
+        Identical calls made at the same time share one request. Calls to tools
+        that change the mailbox clear the cache before and after they run.
+        """
+        cached = self.cache.get(name, arguments)
+        if cached is not None:
+            return cached
+        if not self.cache.cacheable(name):
+            self.cache.observe(name)
+            try:
+                return await self.session.call_tool(name, arguments)
+            finally:
+                self.cache.observe(name)
+
+        key = cacheKey(name, arguments)
+        if key not in self._inflight:
+            self._inflight[key] = asyncio.ensure_future(self._fetch(name, arguments, key))
+        return await asyncio.shield(self._inflight[key])
+
+    async def _fetch(self, name: str, arguments: dict, key):
+        generation = self.cache.generation
+        try:
+            result = await self.session.call_tool(name, arguments)
+        finally:
+            self._inflight.pop(key, None)
+        if not result.isError:
+            self.cache.put(name, arguments, result, generation)
+        return result
 
     async def cleanup(self):
         """Closes the connection and cleans up resources."""
@@ -56,77 +116,165 @@ def reformat_tools_for_anthropic(tools: List[types.Tool]):
     } for tool in tools]
 
 
-def check_tool_call(response):
+def get_tool_calls(response):
+    """
+    Returns every tool_use block in the response, in the order the model asked for them.
+    """
+    if response.stop_reason != "tool_use":
+        return []
+    return [block for block in response.content if block.type == "tool_use"]
+
+
+def get_text(response):
+    """
+    Returns the text blocks of the response joined together.
+    """
+    return "".join(block.text for block in response.content if block.type == "text").strip()
+
+
+async def call_tool(session: ClientSession, tool_call, output=None):
     """
-    Checks if the response contains a tool call.
+    Runs one tool call and returns its tool_result block.
     """
     try:
-        if response.stop_reason == "tool_use":
-            return response.content[1]  # Assuming response.content format is [chat_message, tool_call]
-        return False
+        tool_response = await session.call_tool(tool_call.name, tool_call.input)
+        text = "\n".join(item.text for item in tool_response.content if item.type == "text").strip()
+        is_error = bool(tool_response.isError)
     except Exception as e:
-        print(f"Error checking tool call: {e}")
-        return None
+        text = f"Error calling {tool_call.name}: {e}"
+        is_error = True
+    print(f"Tool Response ({tool_call.name}): {text}", file=output)
+    return {"type": "tool_result", "tool_use_id": tool_call.id, "content": text, "is_error": is_error}
+
+
+def start_tool_call(session: ClientSession, tool_call, output=None):
+    """
+    Starts a tool call in the background and returns the task that yields its tool_result block.
+    """
+    return asyncio.ensure_future(call_tool(session, tool_call, output))
+
+
+async def next_response(chat: AsyncAnthropicBedrock, session: ClientSession, params: dict,
+                        stream: bool = False, output=None):
+    """
+    Gets the model's next response and starts the tool calls it asks for.
+
+    Without streaming, the response is printed once it is complete and its tool
+    calls are started together. With streaming, text is printed as it arrives
+    and each tool call is started as soon as its tool_use block is complete,
+    while the rest of the response is still being generated. Those calls are
+    cancelled if the response does not end with ``stop_reason`` "tool_use".
+
+    Returns the response and the tasks of its tool calls, in the order of the calls.
+    """
+    if not stream:
+        response = await chat.messages.create(**params)
+        print(f"LLM: {get_text(response)}", file=output)
+        return response, [start_tool_call(session, tool_call, output) for tool_call in get_tool_calls(response)]
+
+    pending = []
+    print("LLM: ", end="", file=output, flush=True)
+    try:
+        async with chat.messages.stream(**params) as events:
+            async for event in events:
+                if event.type == "text":
+                    print(event.text, end="", file=output, flush=True)
+                elif event.type == "content_block_stop" and event.content_block.type == "tool_use":
+                    pending.append(start_tool_call(session, event.content_block, output))
+            response = await events.get_final_message()
+    except BaseException:
+        for task in pending:
+            task.cancel()
+        raise
+    print(file=output)
+    # Like get_tool_calls, a response that did not stop to use tools runs none,
+    # e.g. one cut off by max_tokens after a complete tool_use block
+    if response.stop_reason != "tool_use":
+        for task in pending:
+            task.cancel()
+        return response, []
+    return response, pending
+
+
+async def run_turn(chat: AsyncAnthropicBedrock, model_name: str, session: ClientSession, messages: list, tools: list,
+                   stream: bool = False, output=None, context: ConversationContext = None, system: str = None,
+                   cache: PromptCache = None):
+    """
+    Sends the conversation to the model and runs the tools it asks for until it answers.
+
+    All tool calls of a response run at the same time and their results go back
+    to the model in one message. The assistant replies and tool results are
+    appended to ``messages``. With a ``context``, the conversation is compacted
+    to its token budget before every request. With a ``cache``, the repeated
+    prefix of every request is marked for prompt caching.
+    """
+    params = dict(model=model_name, max_tokens=2048, messages=messages, tools=tools)
+    if system:
+        params["system"] = system
+
+    async def ask(params):
+        if context:
+            context.compact(messages)
+        request = cache.prepare(params) if cache else params
+        llm_response, pending = await next_response(chat, session, request, stream, output)
+        if context:
+            context.record(messages, llm_response.usage)
+        if cache:
+            cache.record(llm_response.usage)
+        messages.append({"role": "assistant", "content": llm_response.content})
+        return llm_response, pending
+
+    llm_response, pending = await ask(params)
+    while pending:
+        tool_results = list(await asyncio.gather(*pending))
+        messages.append({"role": "user", "content": tool_results})
+
+        # Give the tool responses to the LLM to create a final response to the User
+        llm_response, pending = await ask(dict(params, temperature=0.1))
+    return llm_response
 
 
 async def main():
-    client = SSE_MCP_Client()
-    chat = AnthropicBedrock()
+    client = SSE_MCP_Client(ToolResultCache(
+        ttl=float(os.getenv("TOOL_CACHE_TTL", 60)),
+        maxEntries=int(os.getenv("TOOL_CACHE_SIZE", 128)),
+    ))
+    chat = AsyncAnthropicBedrock()
     model_name = os.getenv("BEDROCK_MODEL_NAME")
+    stream = os.getenv("CLIENT_STREAM", "true").lower() in ("1", "true", "yes")
+    prompt_cache = PromptCache() if os.getenv("PROMPT_CACHE", "true").lower() in ("1", "true", "yes") else None
     print(f"Using model: {model_name}")
     
     try:
         await client.connect_to_server("http://localhost:5553/sse")
         tools = await client.get_tools()
         formatted_tools = reformat_tools_for_anthropic(tools)
+        context = ConversationContext(
+            budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", 50000)),
+            keepTurns=int(os.getenv("CONTEXT_KEEP_TURNS", 4)),
+            summaryTokens=int(os.getenv("CONTEXT_SUMMARY_TOKENS", 500)),
+            tools=formatted_tools,
+            system=SYSTEM_PROMPT,
+        )
 
         messages = []
-        user_message = input("Input: ")
-
-        # Create initial message
-        chat_prompt = "You are a helpful assistant, you have the ability to call tools to achieve user requests.\n\n"
-        chat_prompt += "User request: " + user_message + "\n\n"
-        messages.append({"role": "user", "content": chat_prompt}) # passing in as user message
-
+        user_message = ""
         while True:
-            if not user_message:
-                continue
-
-            # Generate a response from the User Message
-            llm_response = chat.messages.create(
-                model=model_name,
-                max_tokens=2048,
-                messages=messages,
-                tools=formatted_tools
-            )
-            llm_text_response = llm_response.content[0].text.strip()
-            print(f"LLM Response: {llm_text_response}")
-            messages.append({"role": "assistant", "content": llm_text_response})
-
-
-            while (tool_call := check_tool_call(llm_response)):
-                # Get a response from the Tool
-                tool_response = await client.session.call_tool(tool_call.name, tool_call.input)
-                tool_result_text = tool_response.content[0].text.strip()
-                print(f"Tool Response: {tool_result_text}")
-
-                messages.append({"role": "user", "content": f"Tool result: {tool_result_text}"})
-
-                # Give the tool response to the LLM to create a final response to the User
-                llm_response = chat.messages.create(
-                    model=model_name,
-                    max_tokens=2048,
-                    messages=messages,
-                    tools=formatted_tools,
-                    temperature=0.1
-                )
-                llm_text_response = llm_response.content[0].text.strip()
-                print(f"LLM: {llm_text_response}")
-                messages.append({"role": "assistant", "content": llm_text_response})
-
-            user_message = input("Input: ")
+            # Read input on a thread so the SSE connection keeps being served while waiting
+            while not user_message:
+                user_message = await asyncio.to_thread(input, "Input: ")
             messages.append({"role": "user", "content": user_message})
 
+            # Tool calls go through the client, which answers repeated reads from its cache
+            await run_turn(chat, model_name, client, messages, formatted_tools, stream, context=context,
+                           system=SYSTEM_PROMPT, cache=prompt_cache)
+            print(f"Context: ~{context.stats['tokens']} tokens in {len(messages)} messages "
+                  f"({context.stats['summarized']} tool results summarized, {context.stats['dropped']} turns dropped)")
+            if prompt_cache:
+                print(prompt_cache.report())
+            print(f"Tool cache: {client.cache.stats['hits']} hits, {client.cache.stats['misses']} misses")
+            user_message = ""
+
     finally:
         await client.cleanup()
 
@@ -9,21 +9,26 @@ The server exposes several tools for email operations including:
 - Reading emails from an inbox
 - Retrieving specific emails by ID
 - Deleting emails
-- Sending plain text and HTML emails
+- Sending plain text and HTML emails, directly or through a background queue
+
+Clients can also subscribe to the ``email://inbox`` resource to be notified
+when new mail arrives, instead of polling.
 """
 
+import asyncio
+import logging
+import os
+import threading
 from typing import List
 from mcp.server.fastmcp import FastMCP
 from mcp.types import Tool
 import aiohttp
 from dotenv import load_dotenv
 
-# Import email utility functions from our module
-from email_agent_utils import (
-    getEmails,
-    deleteEmails,
-    sendEmail
-)
+# Email utility functions are looked up on the module at call time
+import email_agent_utils
+from tool_executor import ToolExecutor
+from mailbox_watcher import MailboxWatcher
 
 # Load environment variables
 load_dotenv()
@@ -31,31 +36,269 @@ load_dotenv()
 # Initialize MCP server
 mcp = FastMCP("SimpleMCPServer")
 
+# Blocking POP3/SMTP calls run on worker threads so the event loop stays free.
+# POP3 is serialized per mailbox; SMTP runs in parallel up to the pool size.
+POP3_LANE = "pop3"
+SMTP_LANE = "smtp"
+MAILBOX_KEY = f"{email_agent_utils.EMAIL_USER}@{email_agent_utils.MAIL_SERVER}"
+executor = ToolExecutor(
+    int(os.getenv("TOOL_WORKERS", 8)),
+    {
+        POP3_LANE: int(os.getenv("POP3_TOOL_CONCURRENCY", 1)),
+        SMTP_LANE: int(os.getenv("SMTP_TOOL_CONCURRENCY", email_agent_utils.SMTP_POOL_SIZE)),
+    },
+)
+
+def deliveryWorker():
+    """Delivers queued emails until the process exits.
+    
+    Sleeps until the next retry is due or a new email is queued.
+    """
+    while True:
+        try:
+            if email_agent_utils.deliverQueuedEmail():
+                continue
+            email_agent_utils.outbox.wait(email_agent_utils.outbox.nextDue())
+        except Exception:
+            logging.exception("Queued email delivery failed")
+            email_agent_utils.outbox.wait(email_agent_utils.SEND_RETRY_BASE_DELAY)
+
+# One watcher for the mailbox, shared by every subscribed client
+INBOX_URI = "email://inbox"
+watcher = MailboxWatcher(email_agent_utils.mailboxBackend, float(os.getenv("MAIL_WATCH_INTERVAL", 30)))
+
+# FastMCP reports resources as not subscribable; the inbox resource is.
+# mcp 1.2.0 hard-codes ``subscribe=False``, and neither NotificationOptions nor
+# experimental_capabilities can change it, so the capabilities are amended
+# here. mcp is pinned in requirements.txt, and test_mcp_tools checks that the
+# initialization options still advertise subscriptions.
+_getCapabilities = mcp._mcp_server.get_capabilities
+
+def getCapabilities(*args, **kwargs):
+    """Server capabilities with resource subscriptions enabled."""
+    capabilities = _getCapabilities(*args, **kwargs)
+    if capabilities.resources is not None:
+        capabilities.resources.subscribe = True
+    return capabilities
+
+mcp._mcp_server.get_capabilities = getCapabilities
+
+@mcp.resource(INBOX_URI, name="inbox", mime_type="application/json",
+              description="Inbox change counter; subscribe to be notified when new mail arrives")
+def inboxResource() -> dict:
+    """Describes the watched inbox.
+    
+    Returns:
+        dict: ``mailbox`` name, ``version`` (incremented on every change seen
+              by the watcher), ``updated`` POSIX time of the last change, and
+              number of ``subscribers``.
+    """
+    return {
+        "mailbox": MAILBOX_KEY,
+        "version": watcher.version,
+        "updated": watcher.updated,
+        "subscribers": watcher.subscribers,
+    }
+
+STATS_URI = "email://stats"
+
+@mcp.resource(STATS_URI, name="stats", mime_type="application/json",
+              description="Connection reuse and send rate counters of this server")
+def statsResource() -> dict:
+    """Reports how well mailbox sessions and SMTP connections are reused.
+    
+    Returns:
+        dict: ``mailbox`` and ``smtp`` counters of opened, reused and
+              reconnected connections, and the current send rate and
+              concurrency of each SMTP provider under ``sendRate``.
+    """
+    return email_agent_utils.getSessionStats()
+
+@mcp._mcp_server.subscribe_resource()
+async def subscribeResource(uri) -> None:
+    """Sends the calling client a resource-updated notification on new mail.
+    
+    The notification is sent from the watcher thread through the event loop
+    the client's session runs on. A client whose notification fails is
+    unsubscribed.
+    
+    Args:
+        uri (AnyUrl): Resource to watch; only ``email://inbox`` is supported.
+    """
+    if str(uri) != INBOX_URI:
+        raise ValueError(f"Unknown resource: {uri}")
+    session = mcp._mcp_server.request_context.session
+    loop = asyncio.get_running_loop()
+
+    def sent(future):
+        if future.cancelled() or future.exception() is not None:
+            watcher.unsubscribe(session)
+
+    def notify():
+        asyncio.run_coroutine_threadsafe(session.send_resource_updated(uri), loop).add_done_callback(sent)
+
+    watcher.subscribe(session, notify)
+
+@mcp._mcp_server.unsubscribe_resource()
+async def unsubscribeResource(uri) -> None:
+    """Stops new-mail notifications for the calling client.
+    
+    Args:
+        uri (AnyUrl): Resource passed to the earlier subscribe request.
+    """
+    watcher.unsubscribe(mcp._mcp_server.request_context.session)
+
 # Tool definitions
 @mcp.tool()
-async def pollEmails() -> list:
-    """Retrieves all emails from the inbox.
+async def pollEmails(offset: int = 0, limit: int = email_agent_utils.POLL_PAGE_SIZE, cursor: str = "",
+                     maxBytes: int = email_agent_utils.POLL_PAGE_MAX_BYTES, fields: list = None,
+                     maxBodyChars: int = 0, compact: bool = False, clean: bool = False) -> dict:
+    """Retrieves one page of emails from the inbox, newest first.
+    
+    A page ends at ``limit`` emails or before the emails' combined size would
+    exceed ``maxBytes``, whichever comes first.
     
-    Fetches every email currently in the inbox using POP3.
+    Args:
+        offset (int): Number of emails to skip. Ignored when ``cursor`` is set.
+        limit (int): Maximum number of emails to return.
+        cursor (str): The ``nextCursor`` from the previous page.
+        maxBytes (int): Size budget for the page in bytes; 0 for no budget.
+        fields (list): Keys to return for each email, e.g. ["From", "Subject"]; empty returns all.
+        maxBodyChars (int): Cut each body to this many characters; 0 for no limit.
+        compact (bool): Drop empty fields and return the body as normalized text.
+        clean (bool): Return the body as text without HTML, quoted replies or signature.
     
     Returns:
-        list: A list of dictionaries representing all emails in the inbox.
-              Each dictionary contains email headers and body content.
+        dict: ``emails`` (list of email dictionaries with headers and body),
+              ``total`` number of emails in the inbox, and ``nextOffset`` /
+              ``nextCursor`` for the next page (None on the last page).
+    """
+    page = await executor.run(POP3_LANE, email_agent_utils.getEmailPage, offset, limit, cursor, maxBytes, clean,
+                              key=MAILBOX_KEY)
+    return dict(page, emails=email_agent_utils.projectEmails(page['emails'], fields, maxBodyChars, compact))
+
+@mcp.tool()
+async def pollNewEmails(cursor: str = "", fields: list = None, maxBodyChars: int = 0, compact: bool = False,
+                        clean: bool = False) -> dict:
+    """Retrieves only the emails that arrived since a previous call.
+    
+    Args:
+        cursor (str): The cursor returned by the previous call. Leave empty
+                      to receive every email currently in the inbox.
+        fields (list): Keys to return for each email, e.g. ["From", "Subject"]; empty returns all.
+        maxBodyChars (int): Cut each body to this many characters; 0 for no limit.
+        compact (bool): Drop empty fields and return the body as normalized text.
+        clean (bool): Return the body as text without HTML, quoted replies or signature.
+        
+    Returns:
+        dict: ``emails`` with the new emails and ``cursor`` to pass next time.
     """
-    return getEmails([])
+    result = await executor.run(POP3_LANE, email_agent_utils.getNewEmails, cursor, clean, key=MAILBOX_KEY)
+    return dict(result, emails=email_agent_utils.projectEmails(result['emails'], fields, maxBodyChars, compact))
 
 @mcp.tool()
-async def getEmailsById(ids: list) -> list:
+async def getEmailsById(ids: list, fields: list = None, maxBodyChars: int = 0, compact: bool = False,
+                        clean: bool = False) -> list:
     """Retrieves specific emails by their IDs.
     
     Args:
         ids (list): A list of integer message IDs to retrieve.
+        fields (list): Keys to return for each email, e.g. ["From", "Subject"]; empty returns all.
+        maxBodyChars (int): Cut each body to this many characters; 0 for no limit.
+        compact (bool): Drop empty fields and return the body as normalized text.
+        clean (bool): Return the body as text without HTML, quoted replies or signature.
         
     Returns:
         list: A list of dictionaries representing the requested emails.
               Each dictionary contains email headers and body content.
     """
-    return getEmails(ids)
+    emails = await executor.run(POP3_LANE, email_agent_utils.getEmails, ids, clean, key=MAILBOX_KEY)
+    return email_agent_utils.projectEmails(emails, fields, maxBodyChars, compact)
+
+@mcp.tool()
+async def listEmailHeaders(ids: list = None, previewLines: int = 0, fields: list = None, compact: bool = False) -> list:
+    """Lists email headers and sizes without downloading bodies.
+    
+    Useful for triaging a large inbox before fetching specific emails.
+    
+    Args:
+        ids (list): Optional list of integer message IDs. Empty lists every email.
+        previewLines (int): Number of body lines to include as a text preview.
+        fields (list): Keys to return for each email, e.g. ["From", "Subject"]; empty returns all.
+        compact (bool): Drop empty fields and decode encoded header text.
+        
+    Returns:
+        list: A list of dictionaries with header fields, ``size`` in bytes and,
+              if requested, a ``preview`` of the body.
+    """
+    ids = ids or []
+    headers = await executor.run(POP3_LANE, email_agent_utils.getEmailHeaders, ids, previewLines, key=MAILBOX_KEY)
+    return email_agent_utils.projectEmails(headers, fields, 0, compact)
+
+@mcp.tool()
+async def searchEmails(query: str, limit: int = 10) -> list:
+    """Searches emails by subject, sender, recipients and body text.
+    
+    Args:
+        query (str): Search words. Put text in double quotes to match an exact phrase.
+        limit (int): Maximum number of results to return.
+        
+    Returns:
+        list: Matching emails, best first, with ``id``, ``score`` and the
+              From, To, Cc and Subject headers.
+    """
+    return await executor.run(POP3_LANE, email_agent_utils.searchEmails, query, limit, key=MAILBOX_KEY)
+
+@mcp.tool()
+async def queryEmails(fromAddress: str = "", toAddress: str = "", subject: str = "",
+                      since: str = "", until: str = "", contentType: str = "",
+                      minSize: int = 0, maxSize: int = 0, sortBy: str = "date",
+                      descending: bool = True, offset: int = 0, limit: int = 20) -> list:
+    """Filters and sorts emails by header fields without downloading bodies.
+    
+    Args:
+        fromAddress (str): Only emails from this exact address.
+        toAddress (str): Only emails with this exact address in To or Cc.
+        subject (str): Only emails whose subject contains this text.
+        since (str): Only emails dated on or after this ISO 8601 date/time.
+        until (str): Only emails dated on or before this ISO 8601 date/time.
+        contentType (str): Only emails whose Content-Type starts with this.
+        minSize (int): Minimum size in bytes.
+        maxSize (int): Maximum size in bytes; 0 for no limit.
+        sortBy (str): "date" or "size".
+        descending (bool): Newest/largest first when True.
+        offset (int): Number of matching emails to skip.
+        limit (int): Maximum number of emails to return.
+        
+    Returns:
+        list: Matching emails with ``id``, ``size`` and header fields.
+    """
+    return await executor.run(
+        POP3_LANE, email_agent_utils.queryEmails,
+        fromAddress, toAddress, subject, since, until, contentType,
+        minSize, maxSize, sortBy, descending, offset, limit,
+        key=MAILBOX_KEY,
+    )
+
+@mcp.tool()
+async def getAttachment(id: int, partIndex: int, offset: int = 0,
+                        length: int = email_agent_utils.ATTACHMENT_CHUNK_BYTES) -> dict:
+    """Retrieves the content of one attachment or MIME part of an email.
+    
+    Parts are listed in the ``parts`` manifest of each email. Large parts are
+    returned in chunks; call again with ``nextOffset`` to continue.
+    
+    Args:
+        id (int): The email's message ID.
+        partIndex (int): The ``index`` of the part in the email's ``parts`` list.
+        offset (int): Byte offset into the decoded part.
+        length (int): Maximum number of bytes to return.
+        
+    Returns:
+        dict: Part details, ``encoding`` ("text" or "base64"), ``data`` for the
+              chunk and ``nextOffset`` (None once the whole part was returned).
+    """
+    return await executor.run(POP3_LANE, email_agent_utils.getAttachment, id, partIndex, offset, length, key=MAILBOX_KEY)
 
 @mcp.tool()
 async def deleteEmailsById(ids: list) -> list:
@@ -67,10 +310,11 @@ async def deleteEmailsById(ids: list) -> list:
     Args:
         ids (list): A list of integer message IDs to delete.
     """
-    deleteEmails(ids)
+    await executor.run(POP3_LANE, email_agent_utils.deleteEmails, ids, key=MAILBOX_KEY)
 
 @mcp.tool()
-async def sendTextEmail(fromAddress: str, toAddresses: list, subject: str, body: str) -> str:
+async def sendTextEmail(fromAddress: str, toAddresses: list, subject: str, body: str, queue: bool = False,
+                        attachments: list = None) -> str:
     """Sends a plain text email.
     
     Args:
@@ -78,18 +322,26 @@ async def sendTextEmail(fromAddress: str, toAddresses: list, subject: str, body:
         toAddresses (list): List of recipient email addresses.
         subject (str): Email subject line.
         body (str): Plain text content for the email body.
+        queue (bool): Queue the email for background delivery and return a
+            job ID for getSendStatus instead of waiting for the SMTP server.
+        attachments (list): Paths of files to attach, relative to ATTACHMENT_DIR.
         
     Returns:
-        str: Success or error message.
+        str: Success or error message, or the job ID when queued.
     """
+    attachments = attachments or []
     try:
-        result = sendEmail(fromAddress, toAddresses, "text/plain", subject, body)
+        if queue:
+            jobId = await executor.run(SMTP_LANE, email_agent_utils.queueEmail, fromAddress, toAddresses, "text/plain", subject, body, attachments)
+            return f"Email queued with job ID {jobId}"
+        result = await executor.run(SMTP_LANE, email_agent_utils.sendEmail, fromAddress, toAddresses, "text/plain", subject, body, attachments)
         return result
     except Exception as e:
         return f"Error sending email: {str(e)}"
 
 @mcp.tool()
-async def sendHtmlEmail(fromAddress: str, toAddresses: list, subject: str, body: str) -> str:
+async def sendHtmlEmail(fromAddress: str, toAddresses: list, subject: str, body: str, queue: bool = False,
+                        attachments: list = None) -> str:
     """Sends an HTML-formatted email.
     
     Args:
@@ -97,16 +349,59 @@ async def sendHtmlEmail(fromAddress: str, toAddresses: list, subject: str, body:
         toAddresses (list): List of recipient email addresses.
         subject (str): Email subject line.
         body (str): HTML-formatted content for the email body.
+        queue (bool): Queue the email for background delivery and return a
+            job ID for getSendStatus instead of waiting for the SMTP server.
+        attachments (list): Paths of files to attach, relative to ATTACHMENT_DIR.
         
     Returns:
-        str: Success or error message.
+        str: Success or error message, or the job ID when queued.
     """
+    attachments = attachments or []
     try:
-        result = sendEmail(fromAddress, toAddresses, "text/html", subject, body)
+        if queue:
+            jobId = await executor.run(SMTP_LANE, email_agent_utils.queueEmail, fromAddress, toAddresses, "text/html", subject, body, attachments)
+            return f"Email queued with job ID {jobId}"
+        result = await executor.run(SMTP_LANE, email_agent_utils.sendEmail, fromAddress, toAddresses, "text/html", subject, body, attachments)
         return result
     except Exception as e:
         return f"Error sending HTML email: {str(e)}"
 
+@mcp.tool()
+async def sendBulkEmails(fromAddress: str, recipients: list, subject: str, body: str, html: bool = False) -> list:
+    """Sends a templated email to each recipient separately (mail merge).
+    
+    ``$name`` placeholders in the subject and body are replaced with the
+    recipient's variables; ``$email`` is the recipient's address.
+    
+    Args:
+        fromAddress (str): The sender's email address.
+        recipients (list): Recipient email addresses, or objects with ``to``
+            and an optional ``variables`` object.
+        subject (str): Email subject template.
+        body (str): Email body template.
+        html (bool): Send the body as HTML instead of plain text.
+        
+    Returns:
+        list: One result per recipient with ``to``, ``status`` ("sent" or
+              "failed") and, for failures, ``error``.
+    """
+    contentType = "text/html" if html else "text/plain"
+    return await executor.run(SMTP_LANE, email_agent_utils.sendBulkEmails, fromAddress, recipients, contentType, subject, body)
+
+@mcp.tool()
+async def getSendStatus(jobId: str) -> dict:
+    """Reports the delivery state of an email queued with ``queue=True``.
+    
+    Args:
+        jobId (str): The job ID returned when the email was queued.
+        
+    Returns:
+        dict: ``status`` ("queued", "sending", "sent" or "failed"), number of
+              ``attempts``, ``error`` from the last attempt, and ``created``,
+              ``updated`` and ``nextAttempt`` timestamps.
+    """
+    return await executor.run(SMTP_LANE, email_agent_utils.getSendStatus, jobId)
+
 
 async def list_tools() -> List[Tool]:
     """List the tools available to the LLM.
@@ -119,11 +414,76 @@ async def list_tools() -> List[Tool]:
     return [
         Tool(
             name="pollEmails",
-            description="Returns a list of all emails currently in the inbox",
+            description="Returns one page of emails from the inbox, newest first",
             inputSchema={
                 "name": "pollEmails",
                 "required": [],
-                "properties": {}
+                "properties": {
+                    "offset": {
+                        "type": "integer",
+                        "description": "Number of emails to skip"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum number of emails to return"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "nextCursor from the previous page"
+                    },
+                    "maxBytes": {
+                        "type": "integer",
+                        "description": "Size budget for the page in bytes"
+                    },
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Keys to return for each email, e.g. [\"From\", \"Subject\"]; empty for all"
+                    },
+                    "maxBodyChars": {
+                        "type": "integer",
+                        "description": "Cut each body to this many characters; 0 for no limit"
+                    },
+                    "compact": {
+                        "type": "boolean",
+                        "description": "Drop empty fields and return bodies as normalized text"
+                    },
+                    "clean": {
+                        "type": "boolean",
+                        "description": "Return bodies as text without HTML, quoted replies or signatures"
+                    }
+                }
+            },
+        ),
+        Tool(
+            name="pollNewEmails",
+            description="Returns emails that arrived since the given cursor, plus a new cursor",
+            inputSchema={
+                "name": "pollNewEmails",
+                "required": [],
+                "properties": {
+                    "cursor": {
+                        "type": "string",
+                        "description": "Cursor from the previous call; empty for all emails"
+                    },
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Keys to return for each email, e.g. [\"From\", \"Subject\"]; empty for all"
+                    },
+                    "maxBodyChars": {
+                        "type": "integer",
+                        "description": "Cut each body to this many characters; 0 for no limit"
+                    },
+                    "compact": {
+                        "type": "boolean",
+                        "description": "Drop empty fields and return bodies as normalized text"
+                    },
+                    "clean": {
+                        "type": "boolean",
+                        "description": "Return bodies as text without HTML, quoted replies or signatures"
+                    }
+                }
             },
         ),
         Tool(
@@ -137,10 +497,109 @@ async def list_tools() -> List[Tool]:
                         "type": "array",
                         "items": {"type": "integer"},
                         "description": "List of email IDs to retrieve"
+                    },
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Keys to return for each email, e.g. [\"From\", \"Subject\"]; empty for all"
+                    },
+                    "maxBodyChars": {
+                        "type": "integer",
+                        "description": "Cut each body to this many characters; 0 for no limit"
+                    },
+                    "compact": {
+                        "type": "boolean",
+                        "description": "Drop empty fields and return bodies as normalized text"
+                    },
+                    "clean": {
+                        "type": "boolean",
+                        "description": "Return bodies as text without HTML, quoted replies or signatures"
+                    }
+                }
+            },
+        ),
+        Tool(
+            name="listEmailHeaders",
+            description="Returns email headers and sizes without downloading bodies",
+            inputSchema={
+                "name": "listEmailHeaders",
+                "required": [],
+                "properties": {
+                    "ids": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "description": "List of email IDs; empty for all emails"
+                    },
+                    "previewLines": {
+                        "type": "integer",
+                        "description": "Number of body lines to include as a preview"
+                    },
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Keys to return for each email, e.g. [\"From\", \"Subject\"]; empty for all"
+                    },
+                    "compact": {
+                        "type": "boolean",
+                        "description": "Drop empty fields and decode encoded header text"
+                    }
+                }
+            },
+        ),
+        Tool(
+            name="searchEmails",
+            description="Searches emails by subject, sender, recipients and body text",
+            inputSchema={
+                "name": "searchEmails",
+                "required": ["query"],
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Search words; double-quoted text must match as a phrase"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum number of results"
                     }
                 }
             },
         ),
+        Tool(
+            name="queryEmails",
+            description="Filters and sorts emails by sender, recipient, subject, date, content type and size",
+            inputSchema={
+                "name": "queryEmails",
+                "required": [],
+                "properties": {
+                    "fromAddress": {"type": "string", "description": "Exact sender address"},
+                    "toAddress": {"type": "string", "description": "Exact To or Cc address"},
+                    "subject": {"type": "string", "description": "Text the subject must contain"},
+                    "since": {"type": "string", "description": "Earliest date (ISO 8601)"},
+                    "until": {"type": "string", "description": "Latest date (ISO 8601)"},
+                    "contentType": {"type": "string", "description": "Content-Type prefix"},
+                    "minSize": {"type": "integer", "description": "Minimum size in bytes"},
+                    "maxSize": {"type": "integer", "description": "Maximum size in bytes"},
+                    "sortBy": {"type": "string", "enum": ["date", "size"], "description": "Sort key"},
+                    "descending": {"type": "boolean", "description": "Newest/largest first"},
+                    "offset": {"type": "integer", "description": "Number of results to skip"},
+                    "limit": {"type": "integer", "description": "Maximum number of results"}
+                }
+            },
+        ),
+        Tool(
+            name="getAttachment",
+            description="Returns the content of one attachment or MIME part of an email, in chunks",
+            inputSchema={
+                "name": "getAttachment",
+                "required": ["id", "partIndex"],
+                "properties": {
+                    "id": {"type": "integer", "description": "Email ID"},
+                    "partIndex": {"type": "integer", "description": "Index of the part in the email's parts list"},
+                    "offset": {"type": "integer", "description": "Byte offset into the decoded part"},
+                    "length": {"type": "integer", "description": "Maximum number of bytes to return"}
+                }
+            },
+        ),
         Tool(
             name="deleteEmailsById",
             description="Deletes specific emails by their IDs",
@@ -179,6 +638,15 @@ async def list_tools() -> List[Tool]:
                     "body": {
                         "type": "string",
                         "description": "Plain text body of the email"
+                    },
+                    "queue": {
+                        "type": "boolean",
+                        "description": "Queue for background delivery and return a job ID instead of waiting"
+                    },
+                    "attachments": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Paths of files to attach, relative to the server's ATTACHMENT_DIR"
                     }
                 }
             },
@@ -206,6 +674,72 @@ async def list_tools() -> List[Tool]:
                     "body": {
                         "type": "string",
                         "description": "HTML-formatted body of the email"
+                    },
+                    "queue": {
+                        "type": "boolean",
+                        "description": "Queue for background delivery and return a job ID instead of waiting"
+                    },
+                    "attachments": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Paths of files to attach, relative to the server's ATTACHMENT_DIR"
+                    }
+                }
+            },
+        ),
+        Tool(
+            name="sendBulkEmails",
+            description="Sends a templated email to each recipient separately and reports the result per recipient",
+            inputSchema={
+                "name": "sendBulkEmails",
+                "required": ["fromAddress", "recipients", "subject", "body"],
+                "properties": {
+                    "fromAddress": {
+                        "type": "string",
+                        "description": "Email address to send from"
+                    },
+                    "recipients": {
+                        "type": "array",
+                        "items": {
+                            "anyOf": [
+                                {"type": "string"},
+                                {
+                                    "type": "object",
+                                    "required": ["to"],
+                                    "properties": {
+                                        "to": {"type": "string"},
+                                        "variables": {"type": "object"}
+                                    }
+                                }
+                            ]
+                        },
+                        "description": "Recipient email addresses, or objects with 'to' and template 'variables'"
+                    },
+                    "subject": {
+                        "type": "string",
+                        "description": "Subject template; $name placeholders are replaced per recipient"
+                    },
+                    "body": {
+                        "type": "string",
+                        "description": "Body template; $name placeholders are replaced per recipient, $email with the address"
+                    },
+                    "html": {
+                        "type": "boolean",
+                        "description": "Send the body as HTML instead of plain text"
+                    }
+                }
+            },
+        ),
+        Tool(
+            name="getSendStatus",
+            description="Reports the delivery status of a queued email",
+            inputSchema={
+                "name": "getSendStatus",
+                "required": ["jobId"],
+                "properties": {
+                    "jobId": {
+                        "type": "string",
+                        "description": "Job ID returned when the email was queued"
                     }
                 }
             },
@@ -215,4 +749,5 @@ async def list_tools() -> List[Tool]:
 
 # Start MCP server with SSE transport
 if __name__ == "__main__":
+    threading.Thread(target=deliveryWorker, name="email-delivery", daemon=True).start()
     mcp.run(transport="sse")
\ No newline at end of file
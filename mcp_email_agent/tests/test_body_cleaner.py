@@ -0,0 +1,116 @@
+"""
+Pytest tests for email body normalization.
+"""
+
+import sys
+import os
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from body_cleaner import BodyCache, cleanBody, htmlToText, looksLikeHtml, stripQuotes, stripSignature
+
+
+def test_html_to_text():
+    """Markup, styles and scripts are dropped and block elements become lines."""
+    html = (
+        "<html><head><style>p {color: red}</style></head><body>"
+        "<p>Hello&nbsp;<b>there</b>,</p><div>See the list:<ul><li>one</li><li>two</li></ul></div>"
+        "<script>track()</script><p>Thanks<br>Ann</p></body></html>"
+    )
+    assert looksLikeHtml(html)
+    assert cleanBody(html) == "Hello there,\n\nSee the list:\n\n- one\n- two\n\nThanks\nAnn"
+
+
+def test_plain_text_is_not_html():
+    """Plain text that mentions a tag is left alone."""
+    assert not looksLikeHtml("Use the <p> tag for paragraphs")
+
+
+def test_gmail_reply_history_removed():
+    """Everything from a wrapped "On ... wrote:" line down is dropped."""
+    body = (
+        "Sounds good, see you then.\r\n"
+        "\r\n"
+        "On Wed, May 1, 2024 at 9:00 AM Bob Smith <bob@example.com>\r\n"
+        "wrote:\r\n"
+        "\r\n"
+        "> Can we meet at 10?\r\n"
+        ">\r\n"
+        "> Bob\r\n"
+    ).encode()
+    assert cleanBody(body) == "Sounds good, see you then."
+
+
+def test_outlook_reply_history_removed():
+    """An Outlook From/Sent/To/Subject block starts the quoted history."""
+    body = (
+        "Approved.\n\n"
+        "________________________________\n"
+        "From: Bob Smith <bob@example.com>\n"
+        "Sent: Wednesday, May 1, 2024 9:00 AM\n"
+        "To: Ann <ann@example.com>\n"
+        "Subject: Budget\n\n"
+        "Please approve the budget.\n"
+    )
+    assert cleanBody(body) == "Approved.\n\n________________________________"
+
+
+def test_inline_replies_keep_new_text():
+    """Interleaved replies keep the new text and drop only the quoted lines."""
+    body = "> First question?\nYes.\n> Second question?\nNo.\n"
+    assert stripQuotes(body) == "Yes.\nNo.\n"
+
+
+def test_interleaved_reply_after_header_kept():
+    """Answers written between quotes after an "On ... wrote:" line are kept."""
+    body = (b"Hi Bob,\n\nOn Tue, 1 May 2024, Bob <b@x.com> wrote:\n> Can you send the report?\n"
+            b"Yes, attached.\n> And the invoice?\nWill do tomorrow.\n")
+    assert cleanBody(body) == "Hi Bob,\n\nYes, attached.\nWill do tomorrow."
+
+
+def test_html_blockquote_removed():
+    """Quoted HTML history in a blockquote is dropped like > lines."""
+    html = "<div>Agreed.</div><div class=\"gmail_quote\"><blockquote>Old message<br>more</blockquote></div>"
+    assert "> Old message\n> more" in htmlToText(html)
+    assert cleanBody(html) == "Agreed."
+
+
+def test_signature_and_footer_removed():
+    """The text after the "-- " delimiter and mobile footers are dropped."""
+    assert stripSignature("Thanks!\n-- \nAnn Lee\nACME Corp\n") == "Thanks!"
+    assert cleanBody("See you.\n\nSent from my iPhone\n") == "See you."
+
+
+def test_quote_only_message_is_kept():
+    """A message that is nothing but quoted text is returned whole."""
+    body = "> forwarded line one\n> forwarded line two\n"
+    assert cleanBody(body) == "> forwarded line one\n> forwarded line two"
+
+
+def test_whitespace_collapsed():
+    """Trailing spaces and runs of blank lines are collapsed."""
+    assert cleanBody(b"Line one   \r\n\r\n\r\n\r\nLine two\r\n\r\n") == "Line one\n\nLine two"
+
+
+def test_body_decoded_with_charset():
+    """Bytes are decoded in the declared charset, and as UTF-8 when there is none."""
+    assert cleanBody(b"Caf\xe9 cr\xe8me", "iso-8859-1") == "Café crème"
+    assert cleanBody("Café crème".encode()) == "Café crème"
+    assert cleanBody("Café crème".encode(), "no-such-charset") == "Café crème"
+
+
+def test_body_cache():
+    """A body is cleaned once per UIDL; least recently used entries are evicted."""
+    cache = BodyCache(maxEntries=2)
+    assert cache.get("a", b"Hello  \r\n") == "Hello"
+    # A cached UIDL is not cleaned again, whatever body is passed
+    assert cache.get("a", b"ignored") == "Hello"
+    cache.get("b", b"B")
+    cache.get("c", b"C")
+    assert cache.get("a", b"Again") == "Again"
+    assert cache.stats == {"hits": 1, "misses": 4}
+
+    cache.invalidate(["a"])
+    assert cache.get("a", b"New") == "New"
+    assert cache.get(None, b"No UIDL  ") == "No UIDL"
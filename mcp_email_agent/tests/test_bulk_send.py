@@ -0,0 +1,186 @@
+"""
+Pytest tests for bulk sending and ESMTP pipelining.
+
+These tests use a fake SMTP connection with scripted replies, so no SMTP
+server is needed.
+"""
+
+import smtplib
+import pytest
+import sys
+import os
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bulk_send import pipelinedSendmail, prepareData, renderMessages, sendBulk
+from smtp_pool import SMTPConnectionPool
+from send_scheduler import ProviderLimiter
+
+
+class FakeSMTP:
+    """SMTP connection that records writes and answers from a reply script."""
+
+    def __init__(self, pipelining=True, refuse=()):
+        self.pipelining = pipelining
+        self.refuse = set(refuse)
+        self.writes = []
+        self.replies = []
+        self.sent = []
+
+    def has_extn(self, name):
+        return self.pipelining and name == 'pipelining'
+
+    def send(self, data):
+        self.writes.append(data)
+        if isinstance(data, str):
+            for line in data.splitlines():
+                if line.startswith("MAIL"):
+                    self.replies.append((250, b"OK"))
+                elif line.startswith("RCPT"):
+                    address = line[len("RCPT TO:<"):-1]
+                    self.replies.append((550, b"No such user") if address in self.refuse else (250, b"OK"))
+                elif line == "DATA":
+                    self.replies.append((354, b"Go ahead"))
+        else:
+            self.sent.append(data)
+            self.replies.append((250, b"Queued"))
+
+    def getreply(self):
+        return self.replies.pop(0)
+
+    def sendmail(self, fromAddress, toAddresses, message):
+        self.sent.append(message)
+        return {}
+
+    def rset(self):
+        return (250, b"OK")
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_envelope_is_written_once():
+    """MAIL, every RCPT and DATA go out in a single write."""
+    smtp = FakeSMTP()
+
+    refused = pipelinedSendmail(smtp, "a@example.com", ["b@example.com", "c@example.com"], "Subject: x\n\nbody")
+
+    assert refused == {}
+    assert smtp.writes[0] == ("MAIL FROM:<a@example.com>\r\nRCPT TO:<b@example.com>\r\n"
+                              "RCPT TO:<c@example.com>\r\nDATA\r\n")
+    assert len(smtp.writes) == 2
+    assert smtp.sent == [b"Subject: x\r\n\r\nbody\r\n.\r\n"]
+
+
+def test_refused_recipients():
+    """Refused recipients are reported; refusing all raises before sending content."""
+    smtp = FakeSMTP(refuse={"c@example.com"})
+    refused = pipelinedSendmail(smtp, "a@example.com", ["b@example.com", "c@example.com"], "body")
+    assert refused == {"c@example.com": (550, b"No such user")}
+
+    smtp = FakeSMTP(refuse={"c@example.com"})
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pipelinedSendmail(smtp, "a@example.com", ["c@example.com"], "body")
+    # The server accepted DATA, so an empty message ended it
+    assert smtp.writes[-1] == b".\r\n"
+    assert smtp.replies == []
+
+
+def test_fallback_without_pipelining():
+    """Servers without PIPELINING use plain sendmail."""
+    smtp = FakeSMTP(pipelining=False)
+    pipelinedSendmail(smtp, "a@example.com", ["b@example.com"], "body")
+    assert smtp.writes == []
+    assert smtp.sent == ["body"]
+
+
+def test_dot_stuffing():
+    """Lines starting with a dot are doubled and line endings become CRLF."""
+    assert prepareData(".hidden\n..two\nend") == b"..hidden\r\n...two\r\nend\r\n.\r\n"
+
+
+def test_render_messages():
+    """Templates are rendered per recipient; unknown placeholders are left alone."""
+    rendered = renderMessages(
+        ["a@example.com", {"to": "b@example.com", "variables": {"name": "Bob"}}],
+        "Hi $name", "Sent to $email",
+    )
+    assert rendered == [
+        ("a@example.com", "Hi $name", "Sent to a@example.com"),
+        ("b@example.com", "Hi Bob", "Sent to b@example.com"),
+    ]
+
+
+def test_send_bulk_over_few_connections():
+    """Messages share a few connections and each gets its own result."""
+    created = []
+
+    def connect():
+        smtp = FakeSMTP(refuse={"bad@example.com"})
+        created.append(smtp)
+        return smtp
+
+    pool = SMTPConnectionPool(connect, size=4, maxMessages=3)
+    recipients = [f"user{i}@example.com" for i in range(10)] + ["bad@example.com"]
+    messages = [(to, f"To: {to}\n\nHello") for to in recipients]
+
+    results = sendBulk(pool, "a@example.com", messages, connections=2)
+
+    assert [r['to'] for r in results] == recipients
+    assert [r['status'] for r in results] == ["sent"] * 10 + ["failed"]
+    assert "No such user" in results[-1]['error']
+    delivered = [[data for data in smtp.sent if data != b".\r\n"] for smtp in created]
+    assert sum(len(sent) for sent in delivered) == 10
+    # Connections are retired after maxMessages and replaced
+    assert all(len(sent) <= 3 for sent in delivered)
+    assert len(created) >= 4
+
+
+def test_send_bulk_survives_dropped_connection():
+    """A disconnect fails only the message in flight; the rest use a new connection."""
+    created = []
+
+    def connect():
+        smtp = FakeSMTP()
+        if not created:
+            smtp.send = lambda data: (_ for _ in ()).throw(smtplib.SMTPServerDisconnected("gone"))
+        created.append(smtp)
+        return smtp
+
+    pool = SMTPConnectionPool(connect)
+    messages = [(f"user{i}@example.com", "Hello") for i in range(3)]
+
+    results = sendBulk(pool, "a@example.com", messages, connections=1)
+
+    assert [r['status'] for r in results] == ["failed", "sent", "sent"]
+    assert len(created) == 2
+
+
+def test_send_bulk_requeues_throttled_messages():
+    """A throttled message is retried after the limiter's pause instead of failing."""
+    created = []
+
+    def connect():
+        smtp = FakeSMTP()
+        if not created:
+            # The first connection is throttled on its first message, then closed by the server
+            def closed():
+                raise smtplib.SMTPServerDisconnected("Connection closed")
+            smtp.getreply = lambda: (smtp.replies.clear(), (421, b"4.7.0 Try again in 0 seconds"))[1]
+            smtp.rset = closed
+        created.append(smtp)
+        return smtp
+
+    pool = SMTPConnectionPool(connect)
+    limiter = ProviderLimiter(rate=100, burst=5, maxConcurrency=2, cooldown=0.05)
+    messages = [(f"user{i}@example.com", "Hello") for i in range(3)]
+
+    results = sendBulk(pool, "a@example.com", messages, connections=1, limiter=limiter)
+
+    assert [r['status'] for r in results] == ["sent", "sent", "sent"]
+    assert limiter.stats == {"sent": 3, "throttled": 1}
+    assert limiter.rate < 100
@@ -0,0 +1,125 @@
+"""
+Pytest tests for conversation context compaction in the client.
+"""
+
+import json
+import sys
+import os
+from types import SimpleNamespace
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conversation_context import SUMMARY_PREFIX, ConversationContext, summarizeToolResult
+
+
+def emailPage(count: int, bodyChars: int = 2000):
+    """A pollEmails result as the server returns it."""
+    emails = [{"id": i, "From": f"user{i}@example.com", "Subject": f"Report {i}", "Date": "Wed, 1 May 2024",
+               "Cc": None, "body": "x" * bodyChars} for i in range(1, count + 1)]
+    return json.dumps({"emails": emails, "total": count, "nextOffset": None})
+
+
+def turn(index: int, result: str):
+    """One user turn: a request, a tool call, its result and the answer."""
+    return [
+        {"role": "user", "content": f"Request {index}"},
+        {"role": "assistant", "content": [{"type": "tool_use", "id": f"t{index}", "name": "pollEmails", "input": {}}]},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": f"t{index}", "content": result}]},
+        {"role": "assistant", "content": [{"type": "text", "text": f"Answer {index}"}]},
+    ]
+
+
+def conversation(turns: int, result: str):
+    messages = []
+    for index in range(turns):
+        messages.extend(turn(index, result))
+    return messages
+
+
+def test_email_list_summary():
+    """An email page is reduced to one line per email."""
+    summary = summarizeToolResult("pollEmails", emailPage(2))
+    assert summary.splitlines() == [
+        f"{SUMMARY_PREFIX}pollEmails result: 2 emails; call pollEmails again for details]",
+        "#1 From: user1@example.com | Subject: Report 1 | Date: Wed, 1 May 2024",
+        "#2 From: user2@example.com | Subject: Report 2 | Date: Wed, 1 May 2024",
+    ]
+
+
+def test_text_summary():
+    """Other results keep only their first characters."""
+    summary = summarizeToolResult("getAttachment", "a" * 5000, maxChars=100)
+    assert summary.startswith(f"{SUMMARY_PREFIX}getAttachment result, 5000 characters")
+    assert summary.endswith("\n" + "a" * 100)
+
+
+def test_old_tool_results_summarized_recent_kept():
+    """Large results outside the recent turns are summarized once; recent ones stay whole."""
+    page = emailPage(5)
+    messages = conversation(6, page)
+    context = ConversationContext(budget=10 ** 6, keepTurns=2, summaryTokens=100)
+
+    before = context.tokens(messages)
+    after = context.compact(messages)
+
+    results = [m["content"][0]["content"] for m in messages if m["role"] == "user" and isinstance(m["content"], list)]
+    assert [r.startswith(SUMMARY_PREFIX) for r in results] == [True] * 4 + [False] * 2
+    assert after < before / 2
+    assert context.stats["summarized"] == 4
+
+    # Compacting again changes nothing and keeps every message object
+    kept = list(messages)
+    assert context.compact(messages) == after
+    assert context.stats["summarized"] == 4
+    assert all(new is old for new, old in zip(messages, kept))
+
+
+def test_small_results_keep_message_identity():
+    """Tool results too small to summarize are not copied, so cache breakpoints still match."""
+    messages = conversation(6, "small result")
+    kept = list(messages)
+    ConversationContext(budget=10 ** 6, keepTurns=2, summaryTokens=100).compact(messages)
+    assert all(new is old for new, old in zip(messages, kept))
+
+
+def test_budget_drops_oldest_turns():
+    """Over budget, the oldest turns are dropped whole; the current turn stays."""
+    messages = conversation(8, "small result")
+    messages.append({"role": "user", "content": "Current request"})
+    context = ConversationContext(budget=150, keepTurns=2)
+
+    tokens = context.compact(messages)
+
+    assert tokens <= 150
+    assert messages[0]["role"] == "user" and messages[0]["content"].startswith("Request ")
+    assert messages[0]["content"] != "Request 0"
+    assert messages[-1]["content"] == "Current request"
+    assert context.stats["dropped"] > 0
+    roles = [m["role"] for m in messages]
+    assert ("assistant", "assistant") not in zip(roles, roles[1:])
+    # Every remaining tool result still follows its tool call
+    ids = [b["id"] for m in messages if m["role"] == "assistant" and isinstance(m["content"], list)
+           for b in m["content"] if b["type"] == "tool_use"]
+    results = [b["tool_use_id"] for m in messages if m["role"] == "user" and isinstance(m["content"], list)
+               for b in m["content"]]
+    assert ids == results
+
+
+def test_current_turn_never_dropped():
+    """A turn bigger than the budget on its own is kept."""
+    messages = [{"role": "user", "content": "First"}] + turn(0, "r" * 4000)
+    context = ConversationContext(budget=10, keepTurns=1)
+    context.compact(messages)
+    assert [m["role"] for m in messages] == ["user", "assistant", "user", "assistant"]
+    assert messages[0]["content"] == "Request 0"
+
+
+def test_record_calibrates_estimate():
+    """Reported input tokens correct the characters-per-token estimate."""
+    messages = [{"role": "user", "content": "x" * 3000}]
+    context = ConversationContext()
+    assert context.tokens(messages) == 750
+    context.record(messages, SimpleNamespace(input_tokens=800, cache_read_input_tokens=200))
+    assert context.tokens(messages) == 1000
+    assert context.stats["inputTokens"] == 1000
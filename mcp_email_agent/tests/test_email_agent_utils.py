@@ -0,0 +1,570 @@
+"""
+Pytest tests for the email helper functions in email_agent_utils.py.
+
+A small in-memory POP3 mailbox stands in for the server, so the helpers run
+their real parsing and bookkeeping code without any network access.
+"""
+
+import base64
+import poplib
+import smtplib
+import pytest
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import email_agent_utils
+from pop3_session import POP3SessionManager
+from mailbox_backend import POP3Backend
+from uidl_tracker import UidlTracker
+from message_cache import MessageCache
+from search_index import SearchIndex
+from header_index import HeaderIndex
+from body_cleaner import BodyCache
+from attachments import AttachmentStore
+from outbox import Outbox
+from send_scheduler import SendScheduler
+
+
+def makeMessage(subject, body="Hello", sender="sender@example.com"):
+    """Builds a raw RFC 822 message as a list of CRLF-free lines."""
+    text = (
+        f"From: {sender}\r\n"
+        "To: recipient@example.com\r\n"
+        f"Subject: {subject}\r\n"
+        "Content-Type: text/plain\r\n"
+        "\r\n"
+        f"{body}\r\n"
+    )
+    return text.encode('utf-8').split(b'\r\n')
+
+
+class FakeMailbox:
+    """In-memory stand-in for poplib.POP3_SSL with command counters."""
+
+    def __init__(self, messages, pipelining=False):
+        self.messages = list(messages)
+        self.uidls = [f"uid-{i}" for i in range(len(self.messages))]
+        self.deleted = set()
+        self.calls = []
+        self.pipelining = pipelining
+        self.pending = []
+
+    def _check(self, which):
+        if which < 1 or which > len(self.messages) or which in self.deleted:
+            raise poplib.error_proto(b"-ERR no such message")
+
+    def capa(self):
+        self.calls.append("CAPA")
+        return {'PIPELINING': []} if self.pipelining else {}
+
+    def _putcmd(self, line):
+        # Pipelined commands are only recorded; they run when their response is read
+        self.calls.append(line)
+        command, which = line.split()
+        self.pending.append((command, int(which)))
+
+    def _getresp(self):
+        self.calls.append("READ")
+        command, which = self.pending.pop(0)
+        self._check(which)
+        self.deleted.add(which)
+        return b"+OK"
+
+    def _getlongresp(self):
+        self.calls.append("READ")
+        command, which = self.pending.pop(0)
+        self._check(which)
+        lines = self.messages[which - 1]
+        return b"+OK", list(lines), sum(len(l) + 2 for l in lines)
+
+    def noop(self):
+        self.calls.append("NOOP")
+        return b"+OK"
+
+    def list(self):
+        self.calls.append("LIST")
+        lines = [f"{i} {sum(len(l) + 2 for l in m)}".encode()
+                 for i, m in enumerate(self.messages, 1) if i not in self.deleted]
+        return b"+OK", lines, 0
+
+    def uidl(self, which=None):
+        self.calls.append("UIDL")
+        lines = [f"{i} {u}".encode() for i, u in enumerate(self.uidls, 1) if i not in self.deleted]
+        return b"+OK", lines, 0
+
+    def retr(self, which):
+        self.calls.append(f"RETR {which}")
+        self._check(which)
+        lines = self.messages[which - 1]
+        return b"+OK", list(lines), sum(len(l) + 2 for l in lines)
+
+    def top(self, which, howmuch):
+        self.calls.append(f"TOP {which} {howmuch}")
+        self._check(which)
+        lines = self.messages[which - 1]
+        end = lines.index(b"")
+        return b"+OK", lines[:end + 1 + howmuch], 0
+
+    def dele(self, which):
+        self.calls.append(f"DELE {which}")
+        self._check(which)
+        self.deleted.add(which)
+        return b"+OK"
+
+    def quit(self):
+        self.calls.append("QUIT")
+        keep = [i for i in range(1, len(self.messages) + 1) if i not in self.deleted]
+        self.messages = [self.messages[i - 1] for i in keep]
+        self.uidls = [self.uidls[i - 1] for i in keep]
+        self.deleted = set()
+        return b"+OK"
+
+    def close(self):
+        self.calls.append("CLOSE")
+        self.deleted = set()
+
+
+@pytest.fixture
+def mailbox():
+    """Fixture wiring a FakeMailbox into the POP3 mailbox backend, tracker and cache."""
+    fake = FakeMailbox([makeMessage("First"), makeMessage("Second")])
+    with patch.object(email_agent_utils, 'mailboxBackend', POP3Backend(POP3SessionManager(lambda: fake))), \
+         patch.object(email_agent_utils, 'uidlTracker', UidlTracker()), \
+         patch.object(email_agent_utils, 'messageCache', MessageCache(":memory:", 1024 * 1024)), \
+         patch.object(email_agent_utils, 'searchIndex', SearchIndex()), \
+         patch.object(email_agent_utils, 'headerIndex', HeaderIndex()), \
+         patch.object(email_agent_utils, 'bodyCache', BodyCache()):
+        yield fake
+
+
+def test_get_emails_parses_all(mailbox):
+    """getEmails([]) returns every message with parsed headers and body."""
+    emails = email_agent_utils.getEmails([])
+
+    assert [email['id'] for email in emails] == [1, 2]
+    assert emails[0]['Subject'] == 'First'
+    assert emails[1]['body'].strip() == b'Hello'
+
+
+def test_repeat_poll_only_fetches_new(mailbox):
+    """A second poll downloads only the message that arrived in between."""
+    email_agent_utils.getEmails([])
+    mailbox.messages.append(makeMessage("Third"))
+    mailbox.uidls.append("uid-new")
+    mailbox.calls.clear()
+
+    emails = email_agent_utils.getEmails([])
+
+    assert [email['Subject'] for email in emails] == ['First', 'Second', 'Third']
+    assert [call for call in mailbox.calls if call.startswith("RETR")] == ["RETR 3"]
+
+
+def test_get_new_emails_cursor(mailbox):
+    """getNewEmails returns nothing new until another message arrives."""
+    first = email_agent_utils.getNewEmails("")
+    assert len(first['emails']) == 2
+
+    second = email_agent_utils.getNewEmails(first['cursor'])
+    assert second['emails'] == []
+
+    mailbox.messages.append(makeMessage("Third"))
+    mailbox.uidls.append("uid-new")
+    third = email_agent_utils.getNewEmails(second['cursor'])
+    assert [email['Subject'] for email in third['emails']] == ['Third']
+
+
+def test_delete_commits_with_quit(mailbox):
+    """deleteEmails removes the message and renumbers the rest."""
+    email_agent_utils.deleteEmails([1])
+
+    assert "QUIT" in mailbox.calls
+    emails = email_agent_utils.getEmails([])
+    assert [(email['id'], email['Subject']) for email in emails] == [(1, 'Second')]
+
+
+def test_pipelined_fetch_and_delete(mailbox):
+    """With PIPELINING, every RETR and DELE is sent before the first response is read."""
+    mailbox.pipelining = True
+    mailbox.messages.append(makeMessage("Third"))
+    mailbox.uidls.append("uid-new")
+
+    emails = email_agent_utils.getEmails([])
+    assert [email['Subject'] for email in emails] == ['First', 'Second', 'Third']
+    calls = [call for call in mailbox.calls if call.startswith(("RETR", "READ"))]
+    assert calls == ["RETR 1", "RETR 2", "RETR 3", "READ", "READ", "READ"]
+
+    mailbox.calls.clear()
+    email_agent_utils.deleteEmails([1, 3])
+    calls = [call for call in mailbox.calls if call.startswith(("DELE", "READ"))]
+    assert calls == ["DELE 1", "DELE 3", "READ", "READ"]
+    assert [email['Subject'] for email in email_agent_utils.getEmails([])] == ['Second']
+
+
+def test_headers_use_top_not_retr(mailbox):
+    """getEmailHeaders reads headers and sizes without any RETR."""
+    headers = email_agent_utils.getEmailHeaders([])
+
+    assert [h['Subject'] for h in headers] == ['First', 'Second']
+    assert 'body' not in headers[0]
+    assert headers[0]['size'] > 0
+    assert not any(call.startswith("RETR") for call in mailbox.calls)
+    assert "TOP 1 0" in mailbox.calls
+
+
+def test_headers_with_preview(mailbox):
+    """previewLines adds the first lines of the body as text."""
+    headers = email_agent_utils.getEmailHeaders([2], previewLines=1)
+
+    assert headers[0]['id'] == 2
+    assert headers[0]['preview'] == 'Hello'
+
+
+def test_restart_is_served_from_cache(mailbox):
+    """With an empty tracker, as after a restart, messages come from the disk cache."""
+    email_agent_utils.getEmails([])
+    mailbox.calls.clear()
+
+    with patch.object(email_agent_utils, 'uidlTracker', UidlTracker()):
+        emails = email_agent_utils.getEmails([2])
+
+    assert emails[0]['Subject'] == 'Second'
+    assert not any(call.startswith("RETR") for call in mailbox.calls)
+
+
+def test_delete_invalidates_cache(mailbox):
+    """Deleted messages are removed from the disk cache."""
+    email_agent_utils.getEmails([])
+    email_agent_utils.deleteEmails([1])
+
+    assert email_agent_utils.messageCache.get("uid-0") is None
+    assert email_agent_utils.messageCache.get("uid-1") is not None
+
+
+def test_search_indexes_only_new_messages(mailbox):
+    """searchEmails finds body text and only fetches unindexed messages."""
+    mailbox.messages.append(makeMessage("Quarterly report", body="Revenue grew this quarter"))
+    mailbox.uidls.append("uid-report")
+
+    results = email_agent_utils.searchEmails("revenue")
+    assert [r['Subject'] for r in results] == ['Quarterly report']
+    assert results[0]['id'] == 3
+
+    mailbox.calls.clear()
+    email_agent_utils.searchEmails("hello")
+    assert not any(call.startswith("RETR") for call in mailbox.calls)
+
+
+def test_search_decodes_declared_charset(mailbox):
+    """A latin-1 body is indexed as text, so accented words are found."""
+    mailbox.messages.append([
+        b"From: chef@example.com",
+        b"Subject: Dessert",
+        b"Content-Type: text/plain; charset=iso-8859-1",
+        b"",
+        b"Caf\xe9 cr\xe8me",
+    ])
+    mailbox.uidls.append("uid-dessert")
+
+    assert [r['Subject'] for r in email_agent_utils.searchEmails("crème")] == ['Dessert']
+
+
+def test_query_uses_headers_only(mailbox):
+    """queryEmails indexes headers with TOP and filters by sender."""
+    mailbox.messages.append(makeMessage("From Alice", sender="alice@example.com"))
+    mailbox.uidls.append("uid-alice")
+
+    results = email_agent_utils.queryEmails(fromAddress="alice@example.com")
+
+    assert [(r['id'], r['Subject']) for r in results] == [(3, 'From Alice')]
+    assert results[0]['size'] > 0
+    assert not any(call.startswith("RETR") for call in mailbox.calls)
+
+
+def test_page_is_newest_first_with_cursor(mailbox):
+    """Pages run newest first and a cursor continues after the last email."""
+    mailbox.messages.append(makeMessage("Third"))
+    mailbox.uidls.append("uid-2")
+
+    first = email_agent_utils.getEmailPage(limit=2)
+    assert [email['Subject'] for email in first['emails']] == ['Third', 'Second']
+    assert first['total'] == 3
+    assert first['nextOffset'] == 2
+
+    # New mail arriving between pages does not shift a cursor
+    mailbox.messages.append(makeMessage("Fourth"))
+    mailbox.uidls.append("uid-3")
+    second = email_agent_utils.getEmailPage(limit=2, cursor=first['nextCursor'])
+    assert [email['Subject'] for email in second['emails']] == ['First']
+    assert second['nextCursor'] is None
+
+
+def test_page_respects_byte_budget(mailbox):
+    """A page stops before the LIST sizes would exceed maxBytes."""
+    size = int(mailbox.list()[1][0].split()[1])
+    mailbox.calls.clear()
+
+    page = email_agent_utils.getEmailPage(limit=10, maxBytes=size + 1)
+
+    assert len(page['emails']) == 1
+    assert page['nextOffset'] == 1
+    assert [call for call in mailbox.calls if call.startswith("RETR")] == ["RETR 2"]
+
+
+def test_page_always_holds_one_email(mailbox):
+    """An email larger than the budget is still returned on its own."""
+    page = email_agent_utils.getEmailPage(limit=10, maxBytes=1)
+    assert len(page['emails']) == 1
+
+
+def test_page_rejects_limit_and_offset_that_never_advance(mailbox):
+    """A page that could never move forward is refused instead of returned empty."""
+    with pytest.raises(ValueError):
+        email_agent_utils.getEmailPage(limit=0)
+    with pytest.raises(ValueError):
+        email_agent_utils.getEmailPage(offset=-1)
+    assert mailbox.calls == []
+
+
+def test_set_email_handles_non_utf8():
+    """Latin-1 bodies and RFC 2047 subjects parse without errors."""
+    lines = [
+        b"From: sender@example.com",
+        b"Subject: =?utf-8?q?Caf=C3=A9?=",
+        b"Content-Type: text/plain; charset=latin-1",
+        b"",
+        b"Caf\xe9 au lait",
+    ]
+    email = email_agent_utils.setEmail((b"+OK", lines, 0), 1, email_agent_utils.FORMAT_COMBINED)
+
+    assert email['Subject'] == 'Caf\u00e9'
+    assert email['body'].strip() == b'Caf\xe9 au lait'
+    assert email['charset'] == 'latin-1'
+
+
+def test_body_decoded_with_declared_charset():
+    """Projected and cleaned bodies are decoded in the charset the part declares."""
+    lines = [
+        b"From: sender@example.com",
+        b"Subject: Menu",
+        b"Content-Type: text/plain; charset=iso-8859-1",
+        b"Content-Transfer-Encoding: 8bit",
+        b"",
+        b"Caf\xe9 cr\xe8me",
+    ]
+    email = email_agent_utils.setEmail((b"+OK", lines, 0), 1, email_agent_utils.FORMAT_COMBINED)
+
+    assert email_agent_utils.projectEmail(email, compact=True)['body'] == "Café crème"
+    assert email_agent_utils.projectEmail(email, ['body'], maxBodyChars=4)['body'] == "Café"
+    assert email_agent_utils.cleanEmails([email], None)[0]['body'] == "Café crème"
+
+
+@pytest.mark.parametrize("batchLines", [1, 2, 256])
+def test_set_email_body_round_trips(batchLines):
+    """The body is returned byte for byte, whatever the parse batch size."""
+    body = b"First line\r\n\r\nSecond line\r\nno line ending at the end"
+    lines = [b"From: sender@example.com", b"Subject: Exact", b"Content-Type: text/plain", b""] + body.split(b"\r\n")
+
+    with patch.object(email_agent_utils, 'PARSE_BATCH_LINES', batchLines):
+        assert email_agent_utils.setEmail((b"+OK", lines, 0), 1, email_agent_utils.FORMAT_MESSAGE)['body'] == body
+        lines.append(b"")
+        assert email_agent_utils.setEmail((b"+OK", lines, 0), 1, email_agent_utils.FORMAT_MESSAGE)['body'] == body + b"\r\n"
+
+
+def test_set_email_lists_parts():
+    """For multipart mail the body is the plain text part and all parts are listed."""
+    text = (
+        "From: sender@example.com\r\n"
+        "Content-Type: multipart/alternative; boundary=xyz\r\n"
+        "\r\n"
+        "--xyz\r\n"
+        "Content-Type: text/plain\r\n"
+        "\r\n"
+        "plain\r\n"
+        "--xyz\r\n"
+        "Content-Type: text/html\r\n"
+        "\r\n"
+        "<p>html</p>\r\n"
+        "--xyz--\r\n"
+    )
+    lines = text.encode().split(b"\r\n")
+    email = email_agent_utils.setEmail((b"+OK", lines, 0), 1, email_agent_utils.FORMAT_MESSAGE)
+
+    assert email['body'].strip() == b'plain'
+    assert [(p['index'], p['contentType']) for p in email['parts']] == [(0, 'text/plain'), (1, 'text/html')]
+
+
+def test_get_attachment_in_chunks(mailbox, tmp_path):
+    """getAttachment decodes one part to a spill file and serves it in chunks."""
+    payload = bytes(range(256)) * 40
+    text = (
+        "From: sender@example.com\r\n"
+        "Content-Type: multipart/mixed; boundary=xyz\r\n"
+        "\r\n"
+        "--xyz\r\n"
+        "Content-Type: text/plain\r\n"
+        "\r\n"
+        "See attached\r\n"
+        "--xyz\r\n"
+        "Content-Type: application/octet-stream\r\n"
+        "Content-Disposition: attachment; filename=data.bin\r\n"
+        "Content-Transfer-Encoding: base64\r\n"
+        "\r\n"
+        + base64.encodebytes(payload).decode().replace("\n", "\r\n") +
+        "--xyz--\r\n"
+    )
+    mailbox.messages.append(text.encode().split(b"\r\n"))
+    mailbox.uidls.append("uid-attach")
+
+    email = email_agent_utils.getEmails([3])[0]
+    assert email['body'].strip() == b'See attached'
+    assert email['parts'][1]['filename'] == 'data.bin'
+    assert abs(email['parts'][1]['size'] - len(payload)) < 4
+
+    store = AttachmentStore(str(tmp_path), mmapThreshold=1024, mailbox="me@example.com")
+    parse = MagicMock(side_effect=email_agent_utils.parseMessage)
+    # Nothing is kept in the message cache, so a refetch would show as RETR
+    with patch.object(email_agent_utils, 'attachmentStore', store), \
+         patch.object(email_agent_utils, 'messageCache', MessageCache(":memory:", 0)), \
+         patch.object(email_agent_utils, 'parseMessage', parse):
+        first = email_agent_utils.getAttachment(3, 1, 0, 6000)
+        mailbox.calls.clear()
+        parse.reset_mock()
+        second = email_agent_utils.getAttachment(3, 1, first['nextOffset'], 6000)
+
+    assert first['encoding'] == 'base64'
+    assert first['size'] == len(payload)
+    assert second['nextOffset'] is None
+    assert second['filename'] == 'data.bin'
+    assert second['contentType'] == 'application/octet-stream'
+    data = base64.b64decode(first['data']) + base64.b64decode(second['data'])
+    assert data == payload
+    assert not any(call.startswith("RETR") for call in mailbox.calls)
+    parse.assert_not_called()
+
+    # The same UIDL in another mailbox does not share the spill file
+    assert store.find("uid-attach", 1)['size'] == len(payload)
+    assert AttachmentStore(str(tmp_path), mailbox="other@example.com").find("uid-attach", 1) is None
+
+
+def test_attachment_not_spilled_without_uidl(mailbox, tmp_path):
+    """Without UIDL a part is read from the message each time, so a renumbered ID never serves a stale file."""
+    def attachment(data):
+        return (
+            "From: sender@example.com\r\n"
+            "Content-Type: multipart/mixed; boundary=xyz\r\n"
+            "\r\n"
+            "--xyz\r\n"
+            "Content-Type: application/octet-stream\r\n"
+            "Content-Transfer-Encoding: base64\r\n"
+            "\r\n"
+            + base64.encodebytes(data).decode().replace("\n", "\r\n") +
+            "--xyz--\r\n"
+        ).encode().split(b"\r\n")
+
+    mailbox.messages = [attachment(b"first"), attachment(b"second")]
+    mailbox.uidl = MagicMock(side_effect=poplib.error_proto(b"-ERR not supported"))
+    store = AttachmentStore(str(tmp_path))
+    with patch.object(email_agent_utils, 'attachmentStore', store):
+        assert base64.b64decode(email_agent_utils.getAttachment(1, 0)['data']) == b"first"
+        email_agent_utils.deleteEmails([1])
+        assert base64.b64decode(email_agent_utils.getAttachment(1, 0)['data']) == b"second"
+    assert os.listdir(tmp_path) == []
+
+
+def test_queued_email_is_retried_then_sent():
+    """A queued email survives a temporary SMTP failure and is sent on retry."""
+    pool = MagicMock()
+    pool.sendmail.side_effect = [smtplib.SMTPResponseException(450, b"Mailbox busy"), {}]
+    with patch.object(email_agent_utils, 'outbox', Outbox(":memory:", baseDelay=0, maxDelay=0)), \
+         patch.object(email_agent_utils, 'smtpPool', pool):
+        jobId = email_agent_utils.queueEmail("a@example.com", ["b@example.com"], "text/plain", "Hi", "Hello")
+        assert email_agent_utils.getSendStatus(jobId)['status'] == "queued"
+
+        assert email_agent_utils.deliverQueuedEmail()
+        assert email_agent_utils.getSendStatus(jobId)['error'] == "(450, b'Mailbox busy')"
+        assert email_agent_utils.deliverQueuedEmail()
+        assert not email_agent_utils.deliverQueuedEmail()
+
+        status = email_agent_utils.getSendStatus(jobId)
+    assert status['status'] == "sent"
+    assert status['attempts'] == 2
+    message = pool.sendmail.call_args[0][2]
+    assert "Subject: Hi\r\n" in message
+    assert message.endswith("\r\n\r\nHello\r\n")
+
+
+def test_queued_email_permanent_failure():
+    """A 5xx refusal fails the job without retrying."""
+    pool = MagicMock()
+    pool.sendmail.side_effect = smtplib.SMTPRecipientsRefused({"b@example.com": (550, b"No such user")})
+    with patch.object(email_agent_utils, 'outbox', Outbox(":memory:", baseDelay=0, maxDelay=0)), \
+         patch.object(email_agent_utils, 'smtpPool', pool):
+        jobId = email_agent_utils.queueEmail("a@example.com", ["b@example.com"], "text/plain", "Hi", "Hello")
+        email_agent_utils.deliverQueuedEmail()
+
+        assert email_agent_utils.getSendStatus(jobId)['status'] == "failed"
+        assert not email_agent_utils.deliverQueuedEmail()
+        with pytest.raises(ValueError):
+            email_agent_utils.getSendStatus("missing")
+
+
+def test_throttled_send_honours_retry_hint():
+    """A throttling reply pauses sending and tells the caller when to retry."""
+    pool = MagicMock()
+    pool.sendmail.side_effect = smtplib.SMTPResponseException(421, b"4.7.0 Try again in 2 minutes")
+    outbox = Outbox(":memory:", baseDelay=0, maxDelay=0)
+    with patch.object(email_agent_utils, 'sendScheduler', SendScheduler(10, 5, 2)), \
+         patch.object(email_agent_utils, 'outbox', outbox), \
+         patch.object(email_agent_utils, 'smtpPool', pool):
+        jobId = email_agent_utils.queueEmail("a@example.com", ["b@example.com"], "text/plain", "Hi", "Hello")
+        email_agent_utils.deliverQueuedEmail()
+        assert outbox.nextDue() > 110
+
+        result = email_agent_utils.sendEmail("a@example.com", ["b@example.com"], "text/plain", "Hi", "Hello")
+
+    assert outbox.status(jobId)["status"] == "queued"
+    assert result.startswith("Failed to send email: Sending is throttled by the provider; retry after 1")
+    # The paused limiter did not hit the server a second time
+    assert pool.sendmail.call_count == 1
+
+
+def test_project_email_fields_and_compact():
+    """Projection keeps the requested keys, drops empty ones and normalizes the body."""
+    email = {
+        'id': 3,
+        'From': 'sender@example.com',
+        'Subject': '=?utf-8?q?Caf=C3=A9?=',
+        'User-Agent': None,
+        'Cc': None,
+        'body': b'Hello  \r\n\r\n\r\n\r\nBye\r\n',
+        'parts': [{'index': 0, 'contentType': 'text/plain', 'filename': None, 'size': 20}],
+    }
+
+    assert email_agent_utils.projectEmail(email, ['FROM']) == {'id': 3, 'From': 'sender@example.com'}
+    compact = email_agent_utils.projectEmail(email, compact=True)
+    assert compact == {
+        'id': 3,
+        'From': 'sender@example.com',
+        'Subject': 'Café',
+        'body': 'Hello\n\nBye',
+        'parts': [{'index': 0, 'contentType': 'text/plain', 'size': 20}],
+    }
+    assert email['body'].startswith(b'Hello')
+    assert email_agent_utils.projectEmails([email]) == [email]
+
+
+def test_clean_bodies_cached_by_uidl(mailbox):
+    """clean=True strips quoted history, and each body is cleaned once per UIDL."""
+    mailbox.messages[1] = makeMessage("Re: First", body="Fine by me.\r\n\r\n> Hello")
+
+    emails = email_agent_utils.getEmails([], clean=True)
+    assert [email['body'] for email in emails] == ["Hello", "Fine by me."]
+    email_agent_utils.getEmailPage(clean=True)
+    assert email_agent_utils.bodyCache.stats == {"hits": 2, "misses": 2}
+
+    # Without clean the raw body is returned
+    assert email_agent_utils.getEmails([2])[0]['body'].startswith(b"Fine by me.\r\n\r\n> Hello")
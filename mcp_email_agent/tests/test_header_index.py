@@ -0,0 +1,74 @@
+"""
+Pytest tests for the structured header index.
+"""
+
+import pytest
+import sys
+import os
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from header_index import HeaderIndex, parseDate
+
+
+@pytest.fixture
+def index():
+    """Fixture with four emails on different days and of different sizes."""
+    index = HeaderIndex()
+    index.addMany([
+        ("a", {'From': 'Alice <alice@example.com>', 'To': 'bob@example.com', 'Subject': 'Lunch',
+               'Date': 'Mon, 01 Jan 2024 10:00:00 +0000', 'Content-Type': 'text/plain'}, 100),
+        ("b", {'From': 'carol@example.com', 'To': 'bob@example.com', 'Cc': 'dave@example.com',
+               'Subject': 'Budget report', 'Date': 'Tue, 02 Jan 2024 10:00:00 +0000',
+               'Content-Type': 'multipart/mixed; boundary=x'}, 5000),
+        ("c", {'From': 'alice@example.com', 'To': 'dave@example.com', 'Subject': 'Re: Budget report',
+               'Date': 'Wed, 03 Jan 2024 10:00:00 +0000', 'Content-Type': 'text/plain'}, 300),
+        ("d", {'From': 'eve@example.com', 'To': 'bob@example.com', 'Subject': 'No date'}, 50),
+    ])
+    return index
+
+
+def uidls(page):
+    return [uidl for uidl, _ in page]
+
+
+def test_default_is_newest_first(index):
+    """Without filters, emails come back newest first; undated emails last."""
+    assert uidls(index.query()) == ["c", "b", "a", "d"]
+
+
+def test_sender_and_recipient_lookup(index):
+    """From matches the bare address, and To/Cc filters include Cc."""
+    assert uidls(index.query(sender="ALICE@example.com")) == ["c", "a"]
+    assert uidls(index.query(recipient="dave@example.com")) == ["c", "b"]
+    assert uidls(index.query(sender="alice@example.com", recipient="bob@example.com")) == ["a"]
+
+
+def test_date_range_and_subject(index):
+    """Date ranges use the sorted index and combine with other filters."""
+    since = parseDate('Tue, 02 Jan 2024 00:00:00 +0000')
+    assert uidls(index.query(since=since)) == ["c", "b"]
+    assert uidls(index.query(since=since, subject="re:")) == ["c"]
+
+
+def test_size_sort_and_paging(index):
+    """Sorting by size with offset/limit pages through the results."""
+    assert uidls(index.query(sortBy="size", descending=False)) == ["d", "a", "c", "b"]
+    assert uidls(index.query(sortBy="size", offset=1, limit=2)) == ["c", "a"]
+    assert uidls(index.query(minSize=200, maxSize=1000)) == ["c"]
+
+
+def test_content_type_and_retain(index):
+    """Content-Type is matched by prefix, and retain drops deleted emails."""
+    assert uidls(index.query(contentType="multipart/")) == ["b"]
+
+    index.retain({"a", "c"})
+    assert uidls(index.query(recipient="bob@example.com")) == ["a"]
+    assert len(index) == 2
+
+
+def test_invalid_sort_key(index):
+    """An unknown sort key is rejected."""
+    with pytest.raises(ValueError):
+        index.query(sortBy="subject")
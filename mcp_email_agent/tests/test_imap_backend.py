@@ -0,0 +1,388 @@
+"""
+Pytest tests for the IMAP mailbox backend.
+
+A small IMAP server runs in a thread on localhost and speaks just enough
+IMAP4rev1 for the backend, so the real ``imaplib`` client is exercised
+without a mail server.
+"""
+
+import imaplib
+import re
+import socketserver
+import threading
+import time
+import pytest
+import sys
+import os
+from email.utils import parsedate_to_datetime
+from unittest.mock import patch
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import email_agent_utils
+from imap_backend import IMAPBackend, parseFetch, uidSet
+from uidl_tracker import UidlTracker
+from message_cache import MessageCache
+from search_index import SearchIndex
+from header_index import HeaderIndex
+
+UIDVALIDITY = 7
+
+_TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)')
+
+
+def makeMessage(subject, body="Hello", sender="sender@example.com", date="Wed, 01 May 2024 09:00:00 +0000"):
+    """Builds a raw RFC 822 message with CRLF line endings."""
+    return (
+        f"From: {sender}\r\n"
+        "To: recipient@example.com\r\n"
+        f"Subject: {subject}\r\n"
+        f"Date: {date}\r\n"
+        "Content-Type: text/plain\r\n"
+        "\r\n"
+        f"{body}\r\n"
+    ).encode('utf-8')
+
+
+class StubMailbox:
+    """Messages and the commands received, shared by all stub connections."""
+
+    def __init__(self, messages):
+        self.messages = [{'uid': uid, 'raw': raw, 'flags': set()} for uid, raw in enumerate(messages, 1)]
+        self.nextUid = len(self.messages) + 1
+        self.commands = []
+        self.idlers = []
+
+    def add(self, raw):
+        """Delivers a message, telling idling connections about it."""
+        self.messages.append({'uid': self.nextUid, 'raw': raw, 'flags': set()})
+        self.nextUid += 1
+        for handler in list(self.idlers):
+            handler.send(f"* {len(self.messages)} EXISTS".encode())
+
+    def header(self, message, name):
+        match = re.search(rb'^' + name.encode() + rb': (.*)$', message['raw'], re.M | re.I)
+        return match.group(1).decode().strip() if match else ""
+
+    def matches(self, message, tokens):
+        """Evaluates the search keys in ``tokens``, consuming them."""
+        key = tokens.pop(0).upper()
+        if key == 'ALL':
+            return True
+        if key == 'OR':
+            first = self.matches(message, tokens)
+            second = self.matches(message, tokens)
+            return first or second
+        if key in ('FROM', 'TO', 'CC', 'SUBJECT'):
+            return tokens.pop(0).lower() in self.header(message, key).lower()
+        if key in ('LARGER', 'SMALLER'):
+            limit = int(tokens.pop(0))
+            size = len(message['raw'])
+            return size > limit if key == 'LARGER' else size < limit
+        if key in ('SENTSINCE', 'SENTBEFORE'):
+            day = parsedate_to_datetime(f"{tokens.pop(0).replace('-', ' ')} 00:00 +0000").date()
+            sent = parsedate_to_datetime(self.header(message, 'Date')).date()
+            return sent >= day if key == 'SENTSINCE' else sent < day
+        raise ValueError(key)
+
+
+class StubHandler(socketserver.StreamRequestHandler):
+    """Serves one IMAP connection against the shared StubMailbox."""
+
+    def handle(self):
+        self.mailbox = self.server.mailbox
+        self.send(b"* OK [CAPABILITY IMAP4rev1 UIDPLUS IDLE] Stub ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, command, *rest = line.decode().rstrip('\r\n').split(' ', 2)
+            args = rest[0] if rest else ""
+            self.mailbox.commands.append(f"{command} {args}".strip())
+            if not self.dispatch(tag, command.upper(), args):
+                return
+
+    def send(self, data):
+        self.wfile.write(data + b"\r\n")
+
+    def dispatch(self, tag, command, args):
+        mailbox = self.mailbox
+        if command == 'CAPABILITY':
+            self.send(b"* CAPABILITY IMAP4rev1 UIDPLUS IDLE")
+        elif command == 'LOGOUT':
+            self.send(b"* BYE")
+            self.send(f"{tag} OK LOGOUT completed".encode())
+            return False
+        elif command == 'IDLE':
+            self.send(b"+ idling")
+            mailbox.idlers.append(self)
+            mailbox.commands.append(self.rfile.readline().decode().strip())
+            mailbox.idlers.remove(self)
+        elif command in ('SELECT', 'EXAMINE'):
+            self.send(f"* {len(mailbox.messages)} EXISTS".encode())
+            self.send(f"* OK [UIDVALIDITY {UIDVALIDITY}] UIDs valid".encode())
+            self.send(f"{tag} OK [READ-WRITE] SELECT completed".encode())
+            return True
+        elif command == 'FETCH':
+            sequence, items = args.split(' ', 1)
+            self.fetch(self.select(sequence, useUid=False), items)
+        elif command == 'EXPUNGE':
+            self.expunge(lambda message: True)
+        elif command == 'UID':
+            subcommand, args = args.split(' ', 1)
+            subcommand = subcommand.upper()
+            if subcommand == 'FETCH':
+                sequence, items = args.split(' ', 1)
+                self.fetch(self.select(sequence, useUid=True), items)
+            elif subcommand == 'SEARCH':
+                tokens = [quoted if quoted else plain for quoted, plain in _TOKEN.findall(args)]
+                found = []
+                for message in mailbox.messages:
+                    remaining = list(tokens)
+                    matched = True
+                    while remaining:
+                        matched = mailbox.matches(message, remaining) and matched
+                    if matched:
+                        found.append(str(message['uid']))
+                self.send(("* SEARCH " + " ".join(found)).strip().encode())
+            elif subcommand == 'STORE':
+                sequence, change, flags = args.split(' ', 2)
+                for _, message in self.select(sequence, useUid=True):
+                    if change.startswith('+'):
+                        message['flags'].add('\\Deleted')
+                    else:
+                        message['flags'].discard('\\Deleted')
+            elif subcommand == 'EXPUNGE':
+                uids = {message['uid'] for _, message in self.select(args, useUid=True)}
+                self.expunge(lambda message: message['uid'] in uids)
+        self.send(f"{tag} OK {command} completed".encode())
+        return True
+
+    def select(self, sequence, useUid):
+        """Returns ``(seq, message)`` pairs for an IMAP sequence set."""
+        chosen = []
+        for part in sequence.split(','):
+            first, _, last = part.partition(':')
+            for seq, message in enumerate(self.mailbox.messages, 1):
+                number = message['uid'] if useUid else seq
+                high = number if last == '*' else int(last or first)
+                if int(first) <= number <= high:
+                    chosen.append((seq, message))
+        return chosen
+
+    def fetch(self, chosen, items):
+        for seq, message in chosen:
+            raw = message['raw']
+            head, _, text = raw.partition(b"\r\n\r\n")
+            response = f"* {seq} FETCH (UID {message['uid']}".encode()
+            if 'RFC822.SIZE' in items:
+                response += f" RFC822.SIZE {len(raw)}".encode()
+            sections = []
+            if 'BODY.PEEK[]' in items:
+                sections.append((b"BODY[]", raw))
+            if 'BODY.PEEK[HEADER]' in items:
+                sections.append((b"BODY[HEADER]", head + b"\r\n\r\n"))
+            partial = re.search(r'BODY\.PEEK\[TEXT\]<0\.(\d+)>', items)
+            if partial:
+                sections.append((b"BODY[TEXT]<0>", text[:int(partial.group(1))]))
+            for name, data in sections:
+                response += b" " + name + f" {{{len(data)}}}\r\n".encode() + data
+            self.send(response + b")")
+
+    def expunge(self, chosen):
+        kept = []
+        for seq, message in enumerate(self.mailbox.messages, 1):
+            if '\\Deleted' in message['flags'] and chosen(message):
+                # Each EXPUNGE renumbers the messages after it
+                self.send(f"* {len(kept) + 1} EXPUNGE".encode())
+            else:
+                kept.append(message)
+        self.mailbox.messages = kept
+
+
+class StubServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+@pytest.fixture
+def stub():
+    """Fixture running the stub IMAP server, yielding its mailbox and a connect function."""
+    mailbox = StubMailbox([
+        makeMessage("First", sender="alice@example.com"),
+        makeMessage("Second", body="Line one\r\nLine two\r\nLine three"),
+        makeMessage("Third", sender="alice@example.com", date="Fri, 10 May 2024 12:00:00 +0000"),
+        makeMessage("Fourth", body="x" * 2000),
+        makeMessage("Fifth"),
+    ])
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    server.mailbox = mailbox
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def connect():
+        conn = imaplib.IMAP4("127.0.0.1", server.server_address[1])
+        conn.login("user", "secret")
+        return conn
+
+    yield mailbox, connect
+    server.shutdown()
+    server.server_close()
+
+
+def test_uid_set_collapses_ranges():
+    """Consecutive UIDs are sent as ranges."""
+    assert uidSet([9, 3, 4, 5, 12, 11]) == "3:5,9,11:12"
+
+
+def test_parse_fetch_groups_literals():
+    """Literals that follow each other belong to the message that opened them."""
+    data = [(b'1 (UID 4 BODY[HEADER] {3}', b'abc'), (b' BODY[TEXT]<0> {2}', b'de'), b')', b'2 (UID 6 RFC822.SIZE 10)']
+    assert parseFetch(data) == [
+        {'seq': 1, 'UID': 4, 'BODY[HEADER]': b'abc', 'BODY[TEXT]': b'de'},
+        {'seq': 2, 'UID': 6, 'RFC822.SIZE': 10},
+    ]
+
+
+def test_listing_and_sizes(stub):
+    """Message numbers map to UIDVALIDITY-qualified UIDs and RFC822 sizes."""
+    mailbox, connect = stub
+    backend = IMAPBackend(connect)
+    with backend.session() as conn:
+        listing = backend.listing(conn)
+        sizes = backend.sizes(conn)
+    assert listing == {seq: f"{UIDVALIDITY}.{seq}" for seq in range(1, 6)}
+    assert sizes == {seq: len(message['raw']) for seq, message in enumerate(mailbox.messages, 1)}
+
+
+def test_retrieve_batches_uid_ranges(stub):
+    """Whole messages are fetched with BODY.PEEK[], one UID FETCH per batch of ranges."""
+    mailbox, connect = stub
+    backend = IMAPBackend(connect, batchSize=2)
+    with backend.session() as conn:
+        mailbox.commands.clear()
+        fetched = list(backend.retrieve(conn, [1, 2, 3, 5]))
+
+    assert [id for id, _ in fetched] == [1, 2, 3, 5]
+    assert b"\r\n".join(fetched[1][1][1]) + b"\r\n" == mailbox.messages[1]['raw']
+    fetches = [c for c in mailbox.commands if c.startswith("UID FETCH")]
+    assert fetches == ["UID FETCH 1:2 (UID BODY.PEEK[])", "UID FETCH 3,5 (UID BODY.PEEK[])"]
+
+
+def test_headers_with_preview(stub):
+    """Headers come from BODY.PEEK[HEADER], with the first body lines when asked."""
+    mailbox, connect = stub
+    backend = IMAPBackend(connect)
+    with backend.session() as conn:
+        [(id, mail)] = list(backend.headers(conn, [2], bodyLines=2))
+
+    lines = mail[1]
+    assert lines[lines.index(b""):] == [b"", b"Line one", b"Line two"]
+    assert b"Subject: Second" in lines
+    assert any("BODY.PEEK[HEADER]" in c for c in mailbox.commands)
+
+
+def test_search_narrows_on_server(stub):
+    """Header criteria become a UID SEARCH and come back as message numbers."""
+    mailbox, connect = stub
+    backend = IMAPBackend(connect)
+    with backend.session() as conn:
+        assert backend.search(conn) is None
+        assert backend.search(conn, fromAddress="alice@example.com") == {1, 3}
+        assert backend.search(conn, minSize=1000) == {4}
+        assert backend.search(conn, fromAddress="alice@example.com", since=1715299200.0) == {3}
+
+
+def test_delete_expunges_on_completion(stub):
+    """Deleted messages are flagged, then removed with UID EXPUNGE when the session ends."""
+    mailbox, connect = stub
+    backend = IMAPBackend(connect)
+    with backend.session(commit=True) as conn:
+        assert list(backend.delete(conn, [2, 4])) == [2, 4]
+    assert [message['uid'] for message in mailbox.messages] == [1, 3, 5]
+    assert "UID EXPUNGE 2,4" in mailbox.commands
+
+    with backend.session() as conn:
+        assert backend.listing(conn) == {1: "7.1", 2: "7.3", 3: "7.5"}
+
+
+def test_failed_session_restores_flags(stub):
+    """Messages flagged in a session that raises are neither expunged nor left flagged."""
+    mailbox, connect = stub
+    backend = IMAPBackend(connect)
+    with pytest.raises(RuntimeError):
+        with backend.session(commit=True) as conn:
+            list(backend.delete(conn, [1]))
+            raise RuntimeError("cancelled")
+    assert len(mailbox.messages) == 5
+    assert not mailbox.messages[0]['flags']
+
+
+def test_connection_reused_and_reconnected(stub):
+    """The connection is kept between sessions and replaced when it drops."""
+    mailbox, connect = stub
+    backend = IMAPBackend(connect)
+    with backend.session():
+        pass
+    with backend.session():
+        pass
+    backend._conn.shutdown()
+    with backend.session() as conn:
+        assert len(backend.listing(conn)) == 5
+    assert backend.stats == {"opened": 2, "reused": 1, "reconnects": 1}
+    backend.close()
+
+
+def test_email_tools_over_imap(stub):
+    """getEmails, queryEmails and deleteEmails work unchanged over the IMAP backend."""
+    mailbox, connect = stub
+    with patch.object(email_agent_utils, 'mailboxBackend', IMAPBackend(connect)), \
+         patch.object(email_agent_utils, 'uidlTracker', UidlTracker()), \
+         patch.object(email_agent_utils, 'messageCache', MessageCache(":memory:", 1024 * 1024)), \
+         patch.object(email_agent_utils, 'searchIndex', SearchIndex()), \
+         patch.object(email_agent_utils, 'headerIndex', HeaderIndex()):
+        emails = email_agent_utils.getEmails([])
+        assert [email['Subject'] for email in emails] == ["First", "Second", "Third", "Fourth", "Fifth"]
+
+        mailbox.commands.clear()
+        assert [e['id'] for e in email_agent_utils.queryEmails(fromAddress="alice@example.com")] == [3, 1]
+        assert not any("BODY.PEEK[]" in c for c in mailbox.commands)
+
+        email_agent_utils.deleteEmails([1])
+        assert [email['Subject'] for email in email_agent_utils.getEmails([])] == ["Second", "Third", "Fourth", "Fifth"]
+
+
+def test_idle_wakes_on_new_mail(stub):
+    """waitForChange returns as soon as the server reports new mail during IDLE."""
+    mailbox, connect = stub
+    backend = IMAPBackend(connect)
+    stop = threading.Event()
+    done = threading.Event()
+
+    def wait():
+        backend.waitForChange(30, stop)
+        done.set()
+
+    threading.Thread(target=wait, daemon=True).start()
+    for _ in range(500):
+        if mailbox.idlers:
+            break
+        time.sleep(0.01)
+    mailbox.add(makeMessage("Sixth"))
+
+    assert done.wait(5)
+    assert "IDLE" in mailbox.commands and "DONE" in mailbox.commands
+    with backend.session() as conn:
+        assert len(backend.listing(conn)) == 6
+    backend.close()
+
+
+def test_idle_stops_on_request(stub):
+    """Setting the stop event ends IDLE without waiting for the timeout."""
+    mailbox, connect = stub
+    backend = IMAPBackend(connect)
+    stop = threading.Event()
+    stop.set()
+    backend.waitForChange(30, stop)
+    assert "DONE" in mailbox.commands
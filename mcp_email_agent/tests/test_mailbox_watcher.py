@@ -0,0 +1,119 @@
+"""
+Pytest tests for the background mailbox watcher.
+
+A fake backend stands in for the mail server, so no server is needed.
+"""
+
+import threading
+import time
+import sys
+import os
+from contextlib import contextmanager
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mailbox_backend import MailboxBackend
+from mailbox_watcher import MailboxWatcher
+
+
+class FakeBackend(MailboxBackend):
+    """Mailbox whose UIDs are a list, counting the sessions opened on it."""
+
+    def __init__(self):
+        self.uids = ["a", "b"]
+        self.sessions = 0
+        self.wake = threading.Event()
+
+    @contextmanager
+    def session(self, commit=False):
+        self.sessions += 1
+        yield self
+
+    def listing(self, conn):
+        return dict(enumerate(self.uids, 1))
+
+    def waitForChange(self, timeout, stop):
+        self.wake.wait(timeout)
+        self.wake.clear()
+
+
+def waitFor(condition, timeout=5.0):
+    """Waits until ``condition()`` is true or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_change_notifies_every_subscriber_once():
+    """One check serves every subscriber; the first check only sets the baseline."""
+    backend = FakeBackend()
+    watcher = MailboxWatcher(backend)
+    calls = []
+    watcher._listeners = {"one": lambda: calls.append("one"), "two": lambda: calls.append("two")}
+
+    assert watcher.check() is False
+    assert watcher.check() is False
+    backend.uids.append("c")
+    assert watcher.check() is True
+
+    assert sorted(calls) == ["one", "two"]
+    assert backend.sessions == 3
+    assert watcher.version == 1
+
+
+def test_background_thread_shared_and_stopped():
+    """Subscribers share one thread, which stops after the last one leaves."""
+    backend = FakeBackend()
+    watcher = MailboxWatcher(backend, interval=5)
+    notified = threading.Event()
+    watcher.subscribe("one", notified.set)
+    watcher.subscribe("two", lambda: None)
+    thread = watcher._thread
+
+    assert waitFor(lambda: watcher.stats["checks"] >= 1)
+    backend.uids.append("c")
+    backend.wake.set()
+    assert notified.wait(5)
+    assert watcher._thread is thread
+
+    watcher.unsubscribe("one")
+    assert watcher._thread is thread
+    watcher.unsubscribe("two")
+    backend.wake.set()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_failing_listener_is_unsubscribed():
+    """A listener that raises is dropped and the others are still notified."""
+    backend = FakeBackend()
+    watcher = MailboxWatcher(backend)
+    calls = []
+
+    def broken():
+        raise RuntimeError("client gone")
+
+    watcher._listeners = {"broken": broken, "ok": lambda: calls.append("ok")}
+    watcher.check()
+    backend.uids.remove("a")
+    watcher.check()
+
+    assert calls == ["ok"]
+    assert watcher.subscribers == 1
+
+
+def test_stat_fingerprint_without_uidl():
+    """Without UIDL the POP3 fingerprint falls back to STAT."""
+    from mailbox_backend import POP3Backend
+    import poplib
+
+    class NoUidl:
+        def uidl(self):
+            raise poplib.error_proto(b"-ERR not supported")
+
+        def stat(self):
+            return (2, 300)
+
+    assert POP3Backend(None).fingerprint(NoUidl()) == (2, 300)
@@ -8,7 +8,8 @@ It uses mocking to test functionality without actual email server connections.
 import pytest
 import sys
 import os
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+from contextlib import contextmanager
 import asyncio
 
 # Add parent directory to path so we can import the modules
@@ -17,11 +18,29 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 # Import the MCP tools from the server
 from sse_server import (
     pollEmails,
+    pollNewEmails,
+    listEmailHeaders,
+    searchEmails,
+    queryEmails,
+    getAttachment,
     getEmailsById,
     deleteEmailsById,
     sendTextEmail,
-    sendHtmlEmail
+    sendHtmlEmail,
+    sendBulkEmails,
+    getSendStatus,
+    subscribeResource,
+    unsubscribeResource,
+    inboxResource,
+    statsResource,
+    getCapabilities,
 )
+import sse_server
+from mailbox_backend import MailboxBackend
+from mailbox_watcher import MailboxWatcher
+from send_scheduler import SendScheduler
+from mcp.server.lowlevel.server import NotificationOptions, request_ctx
+from mcp.shared.context import RequestContext
 
 # Import email utility functions that we'll mock
 import email_agent_utils
@@ -39,21 +58,31 @@ SAMPLE_EMAIL = {
 
 SAMPLE_EMAIL_LIST = [SAMPLE_EMAIL]
 
+SAMPLE_EMAIL_PAGE = {
+    'emails': SAMPLE_EMAIL_LIST,
+    'total': 1,
+    'nextOffset': None,
+    'nextCursor': None
+}
+
 
 @pytest.fixture
 def mock_email_utils():
     """Fixture to mock all email utility functions."""
     with patch('email_agent_utils.getEmails') as mock_get_emails, \
+         patch('email_agent_utils.getEmailPage') as mock_get_email_page, \
          patch('email_agent_utils.deleteEmails') as mock_delete_emails, \
          patch('email_agent_utils.sendEmail') as mock_send_email:
         
         # Configure the mocks
         mock_get_emails.return_value = SAMPLE_EMAIL_LIST
+        mock_get_email_page.return_value = SAMPLE_EMAIL_PAGE
         mock_delete_emails.return_value = None
         mock_send_email.return_value = "Email sent successfully"
         
         yield {
             'get_emails': mock_get_emails,
+            'get_email_page': mock_get_email_page,
             'delete_emails': mock_delete_emails,
             'send_email': mock_send_email
         }
@@ -65,15 +94,55 @@ async def test_poll_emails(mock_email_utils):
     # Call the async function
     result = await pollEmails()
     
-    # Verify the mock was called with empty list
-    mock_email_utils['get_emails'].assert_called_once_with([])
+    # Verify the mock was called with the default page settings
+    mock_email_utils['get_email_page'].assert_called_once_with(
+        0, email_agent_utils.POLL_PAGE_SIZE, "", email_agent_utils.POLL_PAGE_MAX_BYTES, False
+    )
     
     # Verify the result
-    assert result == SAMPLE_EMAIL_LIST
-    assert len(result) == 1
-    assert result[0]['id'] == 1
-    assert result[0]['From'] == 'sender@example.com'
-    assert result[0]['Subject'] == 'Test Subject'
+    assert result == SAMPLE_EMAIL_PAGE
+    emails = result['emails']
+    assert len(emails) == 1
+    assert emails[0]['id'] == 1
+    assert emails[0]['From'] == 'sender@example.com'
+    assert emails[0]['Subject'] == 'Test Subject'
+
+
+@pytest.mark.asyncio
+async def test_poll_emails_page(mock_email_utils):
+    """Test the pollEmails MCP tool with paging arguments."""
+    # Call the async function continuing from a cursor with a byte budget
+    await pollEmails(limit=5, cursor='uid-7', maxBytes=4096)
+    
+    # Verify the mock was called with the paging arguments
+    mock_email_utils['get_email_page'].assert_called_once_with(0, 5, 'uid-7', 4096, False)
+
+
+@pytest.mark.asyncio
+async def test_poll_emails_projection(mock_email_utils):
+    """Test the pollEmails MCP tool with field projection and a compact body."""
+    result = await pollEmails(fields=['subject', 'body'], maxBodyChars=7, compact=True)
+    
+    # Only the requested fields are returned, plus the ID
+    assert result['emails'] == [{'id': 1, 'Subject': 'Test Subject', 'body': 'This is', 'truncated': True}]
+    assert result['total'] == 1
+    # The shared page is left untouched
+    assert SAMPLE_EMAIL_PAGE['emails'][0]['body'] == b'This is a test email body'
+
+
+@pytest.mark.asyncio
+async def test_poll_new_emails():
+    """Test the pollNewEmails MCP tool."""
+    page = {'emails': SAMPLE_EMAIL_LIST, 'cursor': 'abc-1'}
+    with patch('email_agent_utils.getNewEmails', return_value=page) as mock_get_new:
+        # Call the async function with a cursor from a previous call
+        result = await pollNewEmails('abc-0')
+    
+    # Verify the cursor was passed through
+    mock_get_new.assert_called_once_with('abc-0', False)
+    
+    # Verify the result
+    assert result == page
 
 
 @pytest.mark.asyncio
@@ -83,7 +152,7 @@ async def test_get_emails_by_id(mock_email_utils):
     result = await getEmailsById([1])
     
     # Verify the mock was called with the correct ID
-    mock_email_utils['get_emails'].assert_called_once_with([1])
+    mock_email_utils['get_emails'].assert_called_once_with([1], False)
     
     # Verify the result
     assert result == SAMPLE_EMAIL_LIST
@@ -91,6 +160,68 @@ async def test_get_emails_by_id(mock_email_utils):
     assert result[0]['id'] == 1
 
 
+@pytest.mark.asyncio
+async def test_list_email_headers():
+    """Test the listEmailHeaders MCP tool."""
+    headers = [{'id': 1, 'Subject': 'Test Subject', 'size': 1024}]
+    with patch('email_agent_utils.getEmailHeaders', return_value=headers) as mock_headers:
+        # Call the async function asking for a two-line preview
+        result = await listEmailHeaders([1], 2)
+    
+    # Verify the mock was called with the correct parameters
+    mock_headers.assert_called_once_with([1], 2)
+    
+    # Verify the result
+    assert result == headers
+
+
+@pytest.mark.asyncio
+async def test_search_emails():
+    """Test the searchEmails MCP tool."""
+    hits = [{'id': 1, 'score': 1.5, 'Subject': 'Test Subject'}]
+    with patch('email_agent_utils.searchEmails', return_value=hits) as mock_search:
+        # Call the async function with a phrase query
+        result = await searchEmails('"test subject"', 5)
+    
+    # Verify the mock was called with the correct parameters
+    mock_search.assert_called_once_with('"test subject"', 5)
+    
+    # Verify the result
+    assert result == hits
+
+
+@pytest.mark.asyncio
+async def test_query_emails():
+    """Test the queryEmails MCP tool."""
+    matches = [{'id': 1, 'From': 'sender@example.com', 'size': 2048}]
+    with patch('email_agent_utils.queryEmails', return_value=matches) as mock_query:
+        # Call the async function filtering by sender and sorting by size
+        result = await queryEmails(fromAddress='sender@example.com', sortBy='size', limit=5)
+    
+    # Verify the mock was called with the filters in order
+    mock_query.assert_called_once_with(
+        'sender@example.com', '', '', '', '', '', 0, 0, 'size', True, 0, 5
+    )
+    
+    # Verify the result
+    assert result == matches
+
+
+@pytest.mark.asyncio
+async def test_get_attachment():
+    """Test the getAttachment MCP tool."""
+    chunk = {'id': 1, 'partIndex': 1, 'encoding': 'base64', 'data': 'AAEC', 'nextOffset': None}
+    with patch('email_agent_utils.getAttachment', return_value=chunk) as mock_attachment:
+        # Call the async function for the second chunk of a part
+        result = await getAttachment(1, 1, 1024, 1024)
+    
+    # Verify the mock was called with the correct parameters
+    mock_attachment.assert_called_once_with(1, 1, 1024, 1024)
+    
+    # Verify the result
+    assert result == chunk
+
+
 @pytest.mark.asyncio
 async def test_delete_emails_by_id(mock_email_utils):
     """Test the deleteEmailsById MCP tool."""
@@ -115,7 +246,7 @@ async def test_send_text_email(mock_email_utils):
     
     # Verify the mock was called with the correct parameters
     mock_email_utils['send_email'].assert_called_once_with(
-        from_address, to_addresses, "text/plain", subject, body
+        from_address, to_addresses, "text/plain", subject, body, []
     )
     
     # Verify the result
@@ -136,7 +267,7 @@ async def test_send_html_email(mock_email_utils):
     
     # Verify the mock was called with the correct parameters
     mock_email_utils['send_email'].assert_called_once_with(
-        from_address, to_addresses, "text/html", subject, body
+        from_address, to_addresses, "text/html", subject, body, []
     )
     
     # Verify the result
@@ -181,5 +312,132 @@ async def test_send_html_email_error_handling(mock_email_utils):
     assert "Error sending HTML email: Test error" in result
 
 
+
+@pytest.mark.asyncio
+async def test_send_bulk_emails():
+    """Test the sendBulkEmails MCP tool."""
+    recipients = ["a@example.com", {"to": "b@example.com", "variables": {"name": "Bob"}}]
+    results = [{'to': 'a@example.com', 'status': 'sent'}, {'to': 'b@example.com', 'status': 'sent'}]
+    with patch('email_agent_utils.sendBulkEmails', return_value=results) as mock_send_bulk:
+        # Call the async function with an HTML template
+        result = await sendBulkEmails("sender@example.com", recipients, "Hi $name", "<p>Hello</p>", html=True)
+    
+    # Verify the template and content type were passed through
+    mock_send_bulk.assert_called_once_with(
+        "sender@example.com", recipients, "text/html", "Hi $name", "<p>Hello</p>"
+    )
+    
+    # Verify the result
+    assert result == results
+
+
+
+@pytest.mark.asyncio
+async def test_send_text_email_queued(mock_email_utils):
+    """Test the sendTextEmail MCP tool in queued mode."""
+    with patch('email_agent_utils.queueEmail', return_value="job-1") as mock_queue:
+        # Call the async function asking for background delivery
+        result = await sendTextEmail("sender@example.com", ["recipient@example.com"], "Subject", "Body", queue=True)
+    
+    # Verify the email was queued instead of sent
+    mock_queue.assert_called_once_with(
+        "sender@example.com", ["recipient@example.com"], "text/plain", "Subject", "Body", []
+    )
+    mock_email_utils['send_email'].assert_not_called()
+    
+    # Verify the result carries the job ID
+    assert result == "Email queued with job ID job-1"
+
+
+@pytest.mark.asyncio
+async def test_get_send_status():
+    """Test the getSendStatus MCP tool."""
+    status = {'id': 'job-1', 'status': 'sent', 'attempts': 1, 'error': None}
+    with patch('email_agent_utils.getSendStatus', return_value=status) as mock_status:
+        # Call the async function with a job ID
+        result = await getSendStatus("job-1")
+    
+    # Verify the job ID was passed through
+    mock_status.assert_called_once_with("job-1")
+    
+    # Verify the result
+    assert result == status
+
+
+
+class ListBackend(MailboxBackend):
+    """Mailbox backend whose UIDs are a plain list."""
+
+    def __init__(self):
+        self.uids = ["a"]
+
+    @contextmanager
+    def session(self, commit=False):
+        yield self
+
+    def listing(self, conn):
+        return dict(enumerate(self.uids, 1))
+
+
+@pytest.mark.asyncio
+async def test_inbox_subscription_notifies_clients():
+    """Subscribed clients get a resource-updated notification when mail arrives."""
+    backend = ListBackend()
+    watcher = MailboxWatcher(backend, interval=60)
+    sessions = [MagicMock(send_resource_updated=AsyncMock()) for _ in range(2)]
+    with patch.object(sse_server, 'watcher', watcher):
+        for number, session in enumerate(sessions):
+            token = request_ctx.set(RequestContext(number, None, session))
+            await subscribeResource("email://inbox")
+            request_ctx.reset(token)
+        for _ in range(100):
+            if watcher.stats["checks"]:
+                break
+            await asyncio.sleep(0.01)
+
+        backend.uids.append("b")
+        watcher.check()
+        await asyncio.sleep(0.05)
+
+        for session in sessions:
+            session.send_resource_updated.assert_awaited_once_with("email://inbox")
+        assert inboxResource()["version"] == 1
+        assert inboxResource()["subscribers"] == 2
+
+        for number, session in enumerate(sessions):
+            token = request_ctx.set(RequestContext(number, None, session))
+            await unsubscribeResource("email://inbox")
+            request_ctx.reset(token)
+        assert watcher.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_subscribe_unknown_resource():
+    """Only the inbox resource can be subscribed to."""
+    with pytest.raises(ValueError):
+        await subscribeResource("email://other")
+
+
+def test_stats_resource_reports_connection_reuse():
+    """The stats resource reports the mailbox, SMTP and send rate counters."""
+    scheduler = SendScheduler(rate=5, burst=5, maxConcurrency=2)
+    scheduler.limiter("smtp.example.com").throttled(1)
+    with patch.object(email_agent_utils, 'sendScheduler', scheduler):
+        stats = statsResource()
+    assert stats["mailbox"] == email_agent_utils.mailboxBackend.stats
+    assert stats["smtp"] == email_agent_utils.smtpPool.stats
+    assert stats["sendRate"]["smtp.example.com"]["throttled"] == 1
+    assert stats["sendRate"]["smtp.example.com"]["rate"] == 2.5
+
+
+def test_capabilities_allow_subscriptions():
+    """The server advertises resource subscriptions in what it sends on initialize."""
+    capabilities = getCapabilities(NotificationOptions(), {})
+    assert capabilities.resources.subscribe is True
+    # FastMCP builds the initialize response through the public options
+    options = sse_server.mcp._mcp_server.create_initialization_options()
+    assert options.capabilities.resources.subscribe is True
+
+
 if __name__ == "__main__":
     pytest.main()
\ No newline at end of file
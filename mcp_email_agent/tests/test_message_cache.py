@@ -0,0 +1,66 @@
+"""
+Pytest tests for the on-disk raw message cache.
+"""
+
+import sys
+import os
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from message_cache import MessageCache
+
+
+def test_round_trip():
+    """A stored message is returned unchanged."""
+    cache = MessageCache(":memory:", 1024)
+    cache.put("a", b"Subject: hi\r\n\r\nbody")
+
+    assert cache.get("a") == b"Subject: hi\r\n\r\nbody"
+    assert cache.get("missing") is None
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+
+
+def test_lru_eviction():
+    """The least recently used message is evicted when over the cap."""
+    cache = MessageCache(":memory:", 25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"y" * 10)
+    cache.get("a")
+    cache.put("c", b"z" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_invalidate():
+    """Invalidated UIDLs are no longer returned."""
+    cache = MessageCache(":memory:", 1024)
+    cache.put("a", b"one")
+    cache.put("b", b"two")
+    cache.invalidate(["a"])
+
+    assert cache.get("a") is None
+    assert cache.get("b") == b"two"
+
+
+def test_survives_reopen(tmp_path):
+    """Messages written by one cache object are visible to the next."""
+    path = str(tmp_path / "cache.sqlite3")
+    first = MessageCache(path, 1024, "inbox")
+    first.put("a", b"persisted")
+    first.close()
+
+    second = MessageCache(path, 1024, "inbox")
+    assert second.get("a") == b"persisted"
+    assert MessageCache(path, 1024, "other").get("a") is None
+
+
+def test_disabled_when_cap_is_zero():
+    """A zero size cap turns the cache into a no-op."""
+    cache = MessageCache(":memory:", 0)
+    cache.put("a", b"one")
+
+    assert cache.get("a") is None
@@ -0,0 +1,139 @@
+"""
+Pytest tests for the streaming outbound message builder.
+
+A fake SMTP connection records what would be written to the server, so no
+SMTP server is needed.
+"""
+
+import tracemalloc
+import pytest
+import sys
+import os
+from email import message_from_bytes, policy
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mime_builder import OutgoingMessage, streamSendmail
+
+
+class FakeSMTP:
+    """SMTP connection that accepts everything and counts the bytes written."""
+
+    def __init__(self, chunking=False, keep=True):
+        self.chunking = chunking
+        self.keep = keep
+        self.written = []
+        self.size = 0
+
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def has_extn(self, name):
+        return self.chunking and name == 'chunking'
+
+    def mail(self, address):
+        return (250, b"OK")
+
+    def rcpt(self, address):
+        return (250, b"OK")
+
+    def docmd(self, command):
+        return (354, b"Go ahead")
+
+    def send(self, data):
+        self.size += len(data)
+        if self.keep:
+            self.written.append(data)
+
+    def getreply(self):
+        return (250, b"OK")
+
+    def rset(self):
+        return (250, b"OK")
+
+
+@pytest.fixture
+def attachment(tmp_path):
+    """Fixture with a small binary file to attach."""
+    path = tmp_path / "report.pdf"
+    path.write_bytes(bytes(range(256)) * 40)
+    return tmp_path
+
+
+def test_message_round_trips(attachment):
+    """The streamed message parses back with its body and attachment intact."""
+    message = OutgoingMessage("a@example.com", ["b@example.com"], "Report", "See attached",
+                              attachments=["report.pdf"], attachmentDir=str(attachment))
+    parsed = message_from_bytes(message.as_bytes(), policy=policy.default)
+
+    assert parsed['Subject'] == "Report"
+    assert parsed.get_body(('plain',)).get_content().strip() == "See attached"
+    [part] = list(parsed.iter_attachments())
+    assert part.get_filename() == "report.pdf"
+    assert part.get_content_type() == "application/pdf"
+    assert part.get_content() == bytes(range(256)) * 40
+
+
+def test_single_part_html():
+    """Without attachments the message is a single HTML part with all headers."""
+    parsed = message_from_bytes(
+        OutgoingMessage("a@example.com", ["b@example.com", "c@example.com"], "Hi", "<p>Hi</p>", "html").as_bytes(),
+        policy=policy.default,
+    )
+    assert parsed.get_content_type() == "text/html"
+    assert parsed['To'] == "b@example.com, c@example.com"
+    assert parsed['Message-ID']
+
+
+def test_missing_attachment(tmp_path):
+    """A missing attachment file is reported before anything is sent."""
+    with pytest.raises(FileNotFoundError):
+        OutgoingMessage("a@example.com", ["b@example.com"], "Hi", "Hi", attachments=["no-such-file"],
+                        attachmentDir=str(tmp_path))
+
+
+def test_attachments_outside_directory_refused(attachment, tmp_path_factory):
+    """Absolute paths, .. and symlinks out of the attachment directory are refused."""
+    outside = tmp_path_factory.mktemp("outside") / ".env"
+    outside.write_text("EMAIL_PASS=secret")
+    (attachment / "link.txt").symlink_to(outside)
+    for path in (str(outside), "../outside0/.env", "sub/../../outside0/.env", "link.txt"):
+        with pytest.raises(PermissionError):
+            OutgoingMessage("a@example.com", ["b@example.com"], "Hi", "Hi", attachments=[path],
+                            attachmentDir=str(attachment))
+    with pytest.raises(PermissionError):
+        OutgoingMessage("a@example.com", ["b@example.com"], "Hi", "Hi", attachments=["report.pdf"])
+
+
+def test_data_is_dot_stuffed_across_chunks():
+    """Lines starting with a dot are escaped even when they start a chunk."""
+    smtp = FakeSMTP()
+    streamSendmail(smtp, "a@example.com", ["b@example.com"], [b"Subject: x\r\n\r\n", b".one\r\n", b"two\r\n.three"])
+    assert b"".join(smtp.written) == b"Subject: x\r\n\r\n..one\r\ntwo\r\n..three\r\n.\r\n"
+
+
+def test_bdat_when_chunking_is_advertised():
+    """With CHUNKING each chunk is sent with BDAT and the last one is marked LAST."""
+    smtp = FakeSMTP(chunking=True)
+    streamSendmail(smtp, "a@example.com", ["b@example.com"], [b"Subject: x\r\n\r\n", b".body\r\n"])
+    assert smtp.written == [b"BDAT 14\r\nSubject: x\r\n\r\n", b"BDAT 7 LAST\r\n.body\r\n"]
+
+
+def test_memory_stays_flat_for_large_attachments(tmp_path):
+    """Streaming a large attachment never holds the encoded message in memory."""
+    path = tmp_path / "large.bin"
+    with open(path, 'wb') as f:
+        for _ in range(16):
+            f.write(os.urandom(1024 * 1024))
+
+    message = OutgoingMessage("a@example.com", ["b@example.com"], "Large", "Attached", attachments=["large.bin"],
+                              attachmentDir=str(tmp_path))
+    tracemalloc.start()
+    for chunking in (True, False):
+        smtp = FakeSMTP(chunking=chunking, keep=False)
+        streamSendmail(smtp, "a@example.com", ["b@example.com"], message.chunks())
+        assert smtp.size > 16 * 1024 * 1024 * 4 // 3
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < 2 * 1024 * 1024
@@ -0,0 +1,83 @@
+"""
+Pytest tests for the durable outbound spool.
+"""
+
+import pytest
+import sys
+import os
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from outbox import Outbox, backoffDelay
+
+
+@pytest.fixture
+def outbox():
+    """Fixture with an in-memory outbox that retries immediately."""
+    outbox = Outbox(":memory:", maxAttempts=3, baseDelay=0, maxDelay=0)
+    yield outbox
+    outbox.close()
+
+
+def test_enqueue_and_claim(outbox):
+    """A queued job is claimed once and reported as sent after completion."""
+    jobId = outbox.enqueue("a@example.com", ["b@example.com"], "body")
+    assert outbox.status(jobId)['status'] == "queued"
+
+    job = outbox.claim()
+    assert job == {'id': jobId, 'fromAddress': "a@example.com", 'toAddresses': ["b@example.com"],
+                   'message': "body", 'attempts': 1}
+    assert outbox.claim() is None
+    assert outbox.status(jobId)['status'] == "sending"
+
+    outbox.complete(jobId)
+    assert outbox.status(jobId)['status'] == "sent"
+    assert outbox.nextDue() is None
+
+
+def test_retry_until_max_attempts(outbox):
+    """Temporary failures are retried until maxAttempts, then the job fails."""
+    jobId = outbox.enqueue("a@example.com", ["b@example.com"], "body")
+    for _ in range(3):
+        job = outbox.claim()
+        outbox.retry(job['id'], "451 Try again later")
+
+    status = outbox.status(jobId)
+    assert status['status'] == "failed"
+    assert status['attempts'] == 3
+    assert status['error'] == "451 Try again later"
+    assert outbox.claim() is None
+
+
+def test_backoff_schedules_next_attempt():
+    """The wait doubles after each failure, up to maxDelay."""
+    assert [backoffDelay(n, 30, 100) for n in (1, 2, 3, 4)] == [30, 60, 100, 100]
+
+    outbox = Outbox(":memory:", baseDelay=60)
+    jobId = outbox.enqueue("a@example.com", ["b@example.com"], "body")
+    outbox.retry(outbox.claim()['id'], "421 Busy")
+    assert outbox.claim() is None
+    assert 55 < outbox.nextDue() <= 60
+    assert outbox.status(jobId)['nextAttempt'] is not None
+    outbox.close()
+
+
+def test_jobs_survive_restart(tmp_path):
+    """Queued and interrupted jobs are delivered after the outbox is reopened."""
+    path = str(tmp_path / "outbox.sqlite3")
+    outbox = Outbox(path)
+    first = outbox.enqueue("a@example.com", ["b@example.com"], "one")
+    second = outbox.enqueue("a@example.com", ["c@example.com"], "two")
+    assert outbox.claim()['id'] == first
+    outbox.close()
+
+    reopened = Outbox(path)
+    claimed = {reopened.claim()['id'], reopened.claim()['id']}
+    assert claimed == {first, second}
+    reopened.close()
+
+
+def test_unknown_job(outbox):
+    """An unknown job ID has no status."""
+    assert outbox.status("missing") is None
@@ -0,0 +1,91 @@
+"""
+Pytest tests for pipelined POP3 commands.
+"""
+
+import poplib
+import pytest
+import sys
+import os
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pop3_pipeline import deleteMany, retrieveMany, supportsPipelining
+
+
+class FakeConnection:
+    """Records pipelined commands and answers them in order when read."""
+
+    def __init__(self, pipelining=True, missing=()):
+        self.pipelining = pipelining
+        self.missing = set(missing)
+        self.log = []
+        self.pending = []
+
+    def capa(self):
+        self.log.append("CAPA")
+        if not self.pipelining:
+            raise poplib.error_proto(b"-ERR unknown command")
+        return {'PIPELINING': [], 'UIDL': []}
+
+    def _putcmd(self, line):
+        self.log.append(line)
+        self.pending.append(int(line.split()[1]))
+
+    def _getresp(self):
+        self.log.append("READ")
+        which = self.pending.pop(0)
+        if which in self.missing:
+            raise poplib.error_proto(b"-ERR no such message")
+        return b"+OK"
+
+    def _getlongresp(self):
+        return self._getresp(), [b"message"], 7
+
+    def retr(self, which):
+        self.log.append(f"retr {which}")
+        return b"+OK", [b"message"], 7
+
+    def dele(self, which):
+        self.log.append(f"dele {which}")
+        return b"+OK"
+
+
+def test_window_limits_commands_in_flight():
+    """No more than ``window`` commands are sent ahead of the responses."""
+    mb = FakeConnection()
+    results = list(retrieveMany(mb, [1, 2, 3, 4, 5], window=2))
+
+    assert [id for id, _ in results] == [1, 2, 3, 4, 5]
+    assert mb.log == ["CAPA", "RETR 1", "RETR 2", "READ", "RETR 3", "READ", "RETR 4", "READ",
+                      "RETR 5", "READ", "READ"]
+
+
+def test_capa_is_checked_once_per_connection():
+    """CAPA is sent on first use and remembered for the connection."""
+    mb = FakeConnection()
+    list(deleteMany(mb, [1]))
+    list(deleteMany(mb, [2]))
+    assert mb.log.count("CAPA") == 1
+
+
+def test_fallback_without_pipelining():
+    """Servers without PIPELINING get one command at a time."""
+    mb = FakeConnection(pipelining=False)
+    assert not supportsPipelining(mb)
+    list(retrieveMany(mb, [1, 2]))
+    list(deleteMany(mb, [1, 2]))
+    assert mb.log == ["CAPA", "retr 1", "retr 2", "dele 1", "dele 2"]
+
+
+def test_error_drains_outstanding_responses():
+    """A rejected command stops new sends, reads what is in flight, then raises."""
+    mb = FakeConnection(missing={2})
+    deleted = []
+    with pytest.raises(poplib.error_proto):
+        for id, _ in deleteMany(mb, [1, 2, 3, 4, 5], window=3):
+            deleted.append(id)
+
+    assert deleted == [1]
+    assert mb.pending == []
+    assert "DELE 5" not in mb.log
@@ -0,0 +1,105 @@
+"""
+Pytest tests for the managed POP3 session.
+
+These tests use mock mailbox objects, so no POP3 server is needed.
+"""
+
+import poplib
+import pytest
+import sys
+import os
+from unittest.mock import MagicMock
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pop3_session import POP3SessionManager
+
+
+@pytest.fixture
+def mailboxes():
+    """Fixture returning a factory that records every mailbox it creates."""
+    created = []
+
+    def connect():
+        mailbox = MagicMock()
+        created.append(mailbox)
+        return mailbox
+
+    return created, connect
+
+
+def test_session_is_reused(mailboxes):
+    """Two consecutive checkouts share one login and probe with NOOP."""
+    created, connect = mailboxes
+    manager = POP3SessionManager(connect)
+
+    with manager.session():
+        pass
+    with manager.session():
+        pass
+
+    assert len(created) == 1
+    created[0].noop.assert_called_once()
+    assert manager.stats["opened"] == 1
+    assert manager.stats["reused"] == 1
+
+
+def test_failed_noop_reconnects(mailboxes):
+    """A session that fails NOOP is closed and replaced."""
+    created, connect = mailboxes
+    manager = POP3SessionManager(connect)
+
+    with manager.session():
+        pass
+    created[0].noop.side_effect = poplib.error_proto("-ERR timeout")
+    with manager.session() as mb:
+        assert mb is created[1]
+
+    created[0].close.assert_called_once()
+    created[0].quit.assert_not_called()
+    assert manager.stats["reconnects"] == 1
+
+
+def test_commit_sends_quit(mailboxes):
+    """commit=True applies deletes with QUIT and the next call logs in again."""
+    created, connect = mailboxes
+    manager = POP3SessionManager(connect)
+
+    with manager.session(commit=True) as mb:
+        mb.dele(1)
+    created[0].quit.assert_called_once()
+
+    with manager.session():
+        pass
+    assert len(created) == 2
+    assert manager.stats["commits"] == 1
+
+
+def test_error_discards_without_quit(mailboxes):
+    """An exception inside the block abandons pending deletes."""
+    created, connect = mailboxes
+    manager = POP3SessionManager(connect)
+
+    with pytest.raises(RuntimeError):
+        with manager.session(commit=True) as mb:
+            mb.dele(1)
+            raise RuntimeError("boom")
+
+    created[0].quit.assert_not_called()
+    created[0].close.assert_called_once()
+    assert manager.stats["discarded"] == 1
+
+
+def test_max_age_refreshes_snapshot(mailboxes):
+    """Sessions older than maxAge are committed so new mail is visible."""
+    created, connect = mailboxes
+    manager = POP3SessionManager(connect, maxAge=0)
+
+    with manager.session():
+        pass
+    with manager.session():
+        pass
+
+    assert len(created) == 2
+    created[0].quit.assert_called_once()
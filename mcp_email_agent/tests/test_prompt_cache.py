@@ -0,0 +1,93 @@
+"""
+Pytest tests for prompt cache breakpoints in the client.
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from anthropic.types import TextBlock
+from prompt_cache import CACHE_CONTROL, PromptCache
+
+TOOLS = [{"name": "pollEmails", "input_schema": {}}, {"name": "getEmailsById", "input_schema": {}}]
+
+
+def breakpoints(params):
+    """Returns where the request carries cache_control, as readable labels."""
+    found = ["system" for block in params.get('system') or [] if "cache_control" in block]
+    found += [f"tool {tool['name']}" for tool in params.get('tools') or [] if "cache_control" in tool]
+    for index, message in enumerate(params['messages']):
+        if isinstance(message['content'], list):
+            found += [f"message {index}" for block in message['content']
+                      if isinstance(block, dict) and "cache_control" in block]
+    return found
+
+
+def test_system_and_last_message_marked():
+    """The system prompt and the newest message get breakpoints; the conversation is not changed."""
+    messages = [{"role": "user", "content": "Check my inbox"}]
+    params = {"system": "Be brief.", "tools": TOOLS, "messages": messages}
+
+    request = PromptCache().prepare(params)
+
+    assert breakpoints(request) == ["system", "message 0"]
+    assert request['system'] == [{"type": "text", "text": "Be brief.", "cache_control": CACHE_CONTROL}]
+    assert request['messages'][0]['content'] == [{"type": "text", "text": "Check my inbox", "cache_control": CACHE_CONTROL}]
+    assert messages == [{"role": "user", "content": "Check my inbox"}]
+    assert "cache_control" not in TOOLS[-1]
+
+
+def test_last_tool_marked_without_system():
+    """Without a system prompt, the tool definitions end the cached prefix."""
+    request = PromptCache().prepare({"tools": TOOLS, "messages": [{"role": "user", "content": "Hi"}]})
+    assert breakpoints(request) == ["tool getEmailsById", "message 0"]
+
+
+def test_breakpoints_follow_the_conversation():
+    """Each request reads the prefix the previous one wrote and writes its own."""
+    cache = PromptCache()
+    messages = [{"role": "user", "content": "Read email 1"}]
+    params = {"system": "Be brief.", "messages": messages}
+    cache.prepare(params)
+
+    messages.append({"role": "assistant", "content": [TextBlock(type="text", text="Reading it.")]})
+    messages.append({"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t1", "content": "Hello"}]})
+    request = cache.prepare(params)
+    assert breakpoints(request) == ["system", "message 0", "message 2"]
+
+    messages.append({"role": "assistant", "content": [TextBlock(type="text", text="It says hello.")]})
+    messages.append({"role": "user", "content": "Thanks"})
+    request = cache.prepare(params)
+    # Only the previous breakpoint is kept, so the request stays within four
+    assert breakpoints(request) == ["system", "message 2", "message 4"]
+
+    # A message replaced by compaction loses its breakpoint
+    messages[4] = dict(messages[4])
+    messages.append({"role": "assistant", "content": "You're welcome."})
+    messages.append({"role": "user", "content": "Bye"})
+    assert breakpoints(cache.prepare(params)) == ["system", "message 6"]
+
+
+def test_assistant_blocks_can_be_marked():
+    """SDK content blocks are converted to dicts when they carry the breakpoint."""
+    request = PromptCache().prepare({"messages": [{"role": "assistant", "content": [TextBlock(type="text", text="Hi")]}]})
+    assert request['messages'][0]['content'] == [{"type": "text", "text": "Hi", "cache_control": CACHE_CONTROL}]
+
+
+def test_usage_reported_per_turn():
+    """Token counts add up per turn and per session; a turn ends with its report."""
+    cache = PromptCache()
+    cache.record(SimpleNamespace(input_tokens=50, cache_creation_input_tokens=3000, cache_read_input_tokens=0,
+                                 output_tokens=40))
+    cache.record(SimpleNamespace(input_tokens=200, cache_creation_input_tokens=100, cache_read_input_tokens=3000,
+                                 output_tokens=60))
+
+    report = cache.report()
+    assert report.startswith("Cache: 3000 input tokens read from cache, 3100 written, 250 uncached (47% hit), "
+                             "100 output tokens")
+    assert report.endswith("1 of 2 requests hit the cache")
+    assert cache.turn == {"cacheRead": 0, "cacheWrite": 0, "uncached": 0, "output": 0}
+    assert cache.stats["cacheRead"] == 3000
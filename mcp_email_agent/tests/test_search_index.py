@@ -0,0 +1,60 @@
+"""
+Pytest tests for the full-text search index.
+"""
+
+import pytest
+import sys
+import os
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from search_index import SearchIndex
+
+
+@pytest.fixture
+def index():
+    """Fixture with three small indexed emails."""
+    index = SearchIndex()
+    index.add("a", ["Lunch on Friday", "alice@example.com", "bob@example.com", "", "Shall we get lunch on Friday?"])
+    index.add("b", ["Budget review", "carol@example.com", "bob@example.com", "", "The budget review moved to Friday lunch time"])
+    index.add("c", ["Re: budget", "bob@example.com", "carol@example.com", "", "Budget budget budget, please reply"])
+    return index
+
+
+def test_ranked_results(index):
+    """The email with the most occurrences of a rare term ranks first."""
+    results = index.search("budget")
+    assert [uidl for uidl, _ in results] == ["c", "b"]
+
+
+def test_phrase_query(index):
+    """A quoted phrase only matches emails where the words are adjacent."""
+    results = index.search('"friday lunch"')
+    assert [uidl for uidl, _ in results] == ["b"]
+
+
+def test_phrase_does_not_cross_fields(index):
+    """A phrase spanning the end of one field and the start of the next does not match."""
+    assert index.search('"friday alice"') == []
+
+
+def test_limit_and_retain(index):
+    """limit caps the results and retain drops deleted emails."""
+    assert len(index.search("friday", limit=1)) == 1
+
+    index.retain({"a", "c"})
+    assert "b" not in index
+    assert [uidl for uidl, _ in index.search("review")] == []
+
+
+def test_common_terms_only_score_rarer_matches():
+    """Terms found in most emails add no results of their own once a rarer term matched."""
+    index = SearchIndex()
+    for i in range(2000):
+        index.add(str(i), [f"Invoice {i}", f"user{i % 500}@example.com", "", "", f"Payment {i % 97} due soon"])
+
+    assert [uidl for uidl, _ in index.search('"invoice 1242"', limit=5)] == ["1242"]
+    assert sorted(uidl for uidl, _ in index.search('user7 payment due', limit=5)) == ["1007", "1507", "507", "7"]
+    # With no rarer term, a common term is matched in full
+    assert len(index.search('payment due', limit=5)) == 5
@@ -0,0 +1,128 @@
+"""
+Pytest tests for adaptive send rate control.
+"""
+
+import smtplib
+import threading
+import time
+import pytest
+import sys
+import os
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from send_scheduler import ProviderLimiter, SendScheduler, SendThrottled, isThrottle, retryHint, throttleDelay
+
+
+def test_throttle_detection():
+    """421, 451 and enhanced 4.7.x codes are throttling; other replies are not."""
+    assert isThrottle(421, b"Service not available")
+    assert isThrottle(451, b"Local error")
+    assert isThrottle(450, b"4.7.28 Our system has detected an unusual rate")
+    assert not isThrottle(450, b"4.2.1 Mailbox busy")
+    assert not isThrottle(550, b"5.7.1 Rejected")
+
+
+def test_retry_hint():
+    """Retry hints in seconds or minutes are recognised."""
+    assert retryHint(b"4.7.0 Too many messages, try again in 5 minutes") == 300
+    assert retryHint(b"Rate limited. Retry after 45 seconds") == 45
+    assert retryHint(b"Try again later") is None
+
+    error = smtplib.SMTPResponseException(421, b"4.7.0 Try again in 2 minutes")
+    assert throttleDelay(error) == 120
+    assert throttleDelay(smtplib.SMTPResponseException(451, b"Temporary failure")) == 0.0
+    assert throttleDelay(smtplib.SMTPResponseException(550, b"No such user")) is None
+    assert throttleDelay(smtplib.SMTPServerDisconnected("gone")) is None
+
+
+def test_throttle_halves_and_success_recovers():
+    """A throttling reply halves rate and concurrency; successes raise them slowly."""
+    limiter = ProviderLimiter(rate=10, burst=5, maxConcurrency=8, cooldown=0.05)
+
+    def refuse():
+        raise smtplib.SMTPResponseException(421, b"4.7.0 Slow down")
+
+    with pytest.raises(smtplib.SMTPResponseException):
+        limiter.send(refuse)
+    assert limiter.rate == 5
+    assert limiter.concurrency == 4
+    assert limiter.stats["throttled"] == 1
+
+    for _ in range(4):
+        limiter.send(lambda: None)
+    assert 5 < limiter.rate <= 10
+    assert 4 < limiter.concurrency < 5
+
+
+def test_unlimited_until_throttled():
+    """Without a rate, sends are not paced until a throttle sets one from the measured rate."""
+    limiter = ProviderLimiter(rate=0, burst=10, maxConcurrency=4, cooldown=0.01)
+    for _ in range(50):
+        limiter.send(lambda: None)
+    assert limiter.delay() == 0
+    assert limiter.rate == 0
+
+    limiter.throttled()
+    assert limiter.maxRate >= 1
+    assert limiter.rate == limiter.maxRate / 2
+    assert limiter.concurrency == 2
+
+    limiter.send(lambda: None)
+    assert limiter.maxRate / 2 < limiter.rate <= limiter.maxRate
+
+
+def test_pause_honours_retry_hint():
+    """After a hinted refusal nothing is sent until the hint has passed."""
+    limiter = ProviderLimiter(rate=100, burst=5, maxConcurrency=2)
+    limiter.throttled(60)
+
+    assert limiter.delay() > 59
+    with pytest.raises(SendThrottled) as raised:
+        limiter.acquire(maxWait=0.1)
+    assert raised.value.retryAfter > 59
+
+
+def test_token_bucket_paces_sends():
+    """Once the burst is used up, sends start at the configured rate."""
+    limiter = ProviderLimiter(rate=50, burst=2, maxConcurrency=4)
+    start = time.monotonic()
+    for _ in range(7):
+        limiter.send(lambda: None)
+    # Two from the burst, then five at 50 per second
+    assert time.monotonic() - start >= 0.09
+
+
+def test_concurrency_limit():
+    """No more messages are in flight than the concurrency limit allows."""
+    limiter = ProviderLimiter(rate=1000, burst=100, maxConcurrency=2)
+    inflight = []
+    peak = []
+    lock = threading.Lock()
+
+    def send():
+        with lock:
+            inflight.append(1)
+            peak.append(len(inflight))
+        time.sleep(0.02)
+        with lock:
+            inflight.pop()
+
+    threads = [threading.Thread(target=limiter.send, args=(send,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+
+
+def test_one_limiter_per_provider():
+    """Each provider gets its own limiter."""
+    scheduler = SendScheduler(rate=5, burst=5, maxConcurrency=2)
+    first = scheduler.limiter("smtp.example.com")
+    assert scheduler.limiter("smtp.example.com") is first
+    assert scheduler.limiter("smtp.example.org") is not first
+    first.throttled(10)
+    assert scheduler.stats["smtp.example.com"]["throttled"] == 1
+    assert scheduler.stats["smtp.example.org"]["throttled"] == 0
@@ -0,0 +1,100 @@
+"""
+Pytest tests for the SMTP connection pool.
+
+These tests use mock SMTP objects, so no SMTP server is needed.
+"""
+
+import smtplib
+import pytest
+import sys
+import os
+from unittest.mock import MagicMock
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from smtp_pool import SMTPConnectionPool
+
+
+@pytest.fixture
+def connections():
+    """Fixture returning a factory that records every connection it creates."""
+    created = []
+
+    def connect():
+        smtp = MagicMock()
+        smtp.rset.return_value = (250, b"OK")
+        smtp.sendmail.return_value = {}
+        created.append(smtp)
+        return smtp
+
+    return created, connect
+
+
+def test_connection_is_reused(connections):
+    """Consecutive sends share one login and are checked with RSET."""
+    created, connect = connections
+    pool = SMTPConnectionPool(connect)
+
+    pool.sendmail("a@example.com", ["b@example.com"], "first")
+    pool.sendmail("a@example.com", ["b@example.com"], "second")
+
+    assert len(created) == 1
+    created[0].rset.assert_called_once()
+    assert created[0].sendmail.call_count == 2
+    assert pool.stats["reused"] == 1
+
+
+def test_dropped_connection_is_replaced(connections):
+    """A connection that fails RSET is closed and a new one is opened."""
+    created, connect = connections
+    pool = SMTPConnectionPool(connect)
+
+    pool.sendmail("a@example.com", ["b@example.com"], "first")
+    created[0].rset.side_effect = smtplib.SMTPServerDisconnected("gone")
+    pool.sendmail("a@example.com", ["b@example.com"], "second")
+
+    assert len(created) == 2
+    created[0].close.assert_called_once()
+    assert pool.stats["reconnects"] == 1
+
+
+def test_max_messages_evicts(connections):
+    """A connection is retired after maxMessages sends."""
+    created, connect = connections
+    pool = SMTPConnectionPool(connect, maxMessages=1)
+
+    pool.sendmail("a@example.com", ["b@example.com"], "first")
+    pool.sendmail("a@example.com", ["b@example.com"], "second")
+
+    assert len(created) == 2
+    created[0].quit.assert_called_once()
+    assert pool.stats["evicted"] == 2
+
+
+def test_idle_timeout_evicts(connections):
+    """A connection idle for longer than idleTimeout is not reused."""
+    created, connect = connections
+    pool = SMTPConnectionPool(connect, idleTimeout=0)
+
+    pool.sendmail("a@example.com", ["b@example.com"], "first")
+    pool.sendmail("a@example.com", ["b@example.com"], "second")
+
+    assert len(created) == 2
+    created[0].rset.assert_not_called()
+
+
+def test_refused_recipient_keeps_connection(connections):
+    """A server-side refusal returns the connection to the pool."""
+    created, connect = connections
+    pool = SMTPConnectionPool(connect)
+
+    pool.sendmail("a@example.com", ["b@example.com"], "first")
+    created[0].sendmail.side_effect = smtplib.SMTPRecipientsRefused({})
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pool.sendmail("a@example.com", ["bad@example.com"], "second")
+    created[0].sendmail.side_effect = None
+    pool.sendmail("a@example.com", ["b@example.com"], "third")
+
+    assert len(created) == 1
+    created[0].close.assert_not_called()
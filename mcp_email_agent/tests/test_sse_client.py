@@ -0,0 +1,212 @@
+"""
+Pytest tests for the MCP client loop in sse_client.py.
+
+A fake model and a fake MCP session stand in for Bedrock and the server.
+"""
+
+import asyncio
+import time
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from anthropic.types import Message
+from prompt_cache import PromptCache
+from sse_client import get_text, get_tool_calls, run_turn, start_tool_call
+
+
+def message(*content, stop_reason="end_turn"):
+    """Builds a model response with the given content blocks."""
+    return Message.model_validate({
+        "id": "msg", "type": "message", "role": "assistant", "model": "test",
+        "content": list(content), "stop_reason": stop_reason, "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5},
+    })
+
+
+def toolUse(id, name, **input):
+    return {"type": "tool_use", "id": id, "name": name, "input": input}
+
+
+class FakeSession:
+    """MCP session whose tools take ``delay`` seconds and echo their input."""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = []
+        self.finished = []
+
+    async def call_tool(self, name, arguments):
+        self.calls.append((name, arguments))
+        await asyncio.sleep(self.delay)
+        if name == "broken":
+            raise RuntimeError("server went away")
+        self.finished.append(name)
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=f"{name} {arguments}")], isError=False)
+
+
+class FakeStream:
+    """Streamed response: text deltas, then each block as it completes."""
+
+    def __init__(self, response, log):
+        self.response = response
+        self.log = log
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for block in self.response.content:
+            if block.type == "text":
+                for word in block.text.split(" "):
+                    yield SimpleNamespace(type="text", text=word + " ")
+            yield SimpleNamespace(type="content_block_stop", content_block=block)
+            self.log.append(("block", getattr(block, "id", "text")))
+            await asyncio.sleep(0)
+
+    async def get_final_message(self):
+        return self.response
+
+
+class FakeChat:
+    """Model that returns the scripted responses in order and records each request."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.log = []
+        self.messages = self
+
+    async def create(self, **kwargs):
+        self.requests.append(dict(kwargs, messages=list(kwargs["messages"])))
+        return self.responses.pop(0)
+
+    def stream(self, **kwargs):
+        self.requests.append(dict(kwargs, messages=list(kwargs["messages"])))
+        return FakeStream(self.responses.pop(0), self.log)
+
+
+def test_every_tool_call_collected():
+    """All tool_use blocks are returned, not just the one after the text."""
+    response = message(
+        {"type": "text", "text": "Checking both."},
+        toolUse("t1", "getEmailsById", ids=[1]),
+        toolUse("t2", "getEmailsById", ids=[2]),
+        stop_reason="tool_use",
+    )
+    assert [call.id for call in get_tool_calls(response)] == ["t1", "t2"]
+    assert get_text(response) == "Checking both."
+    assert get_tool_calls(message({"type": "text", "text": "Done."})) == []
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_run_concurrently():
+    """Tool calls of one turn overlap and their results keep the call order."""
+    session = FakeSession(delay=0.2)
+    calls = [SimpleNamespace(id=f"t{i}", name="pollEmails", input={"offset": i}) for i in range(3)]
+    calls.append(SimpleNamespace(id="t3", name="broken", input={}))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(start_tool_call(session, call) for call in calls))
+    assert time.perf_counter() - start < 0.5
+
+    assert [result["tool_use_id"] for result in results] == ["t0", "t1", "t2", "t3"]
+    assert results[1]["content"] == "pollEmails {'offset': 1}"
+    assert results[1]["is_error"] is False
+    assert results[3]["is_error"] is True
+    assert "server went away" in results[3]["content"]
+
+
+@pytest.mark.asyncio
+async def test_turn_sends_all_results_in_one_message():
+    """Both results go back to the model in one user message, after the tool_use turn."""
+    session = FakeSession(delay=0)
+    chat = FakeChat(
+        message(toolUse("t1", "getEmailsById", ids=[1]), toolUse("t2", "deleteEmailsById", ids=[2]),
+                stop_reason="tool_use"),
+        message({"type": "text", "text": "Read 1 and deleted 2."}),
+    )
+    messages = [{"role": "user", "content": "Read 1 and delete 2"}]
+
+    response = await run_turn(chat, "test", session, messages, [])
+
+    assert get_text(response) == "Read 1 and deleted 2."
+    assert len(chat.requests) == 2
+    assert session.calls == [("getEmailsById", {"ids": [1]}), ("deleteEmailsById", {"ids": [2]})]
+    assert [m["role"] for m in messages] == ["user", "assistant", "user", "assistant"]
+    assert [block["tool_use_id"] for block in messages[2]["content"]] == ["t1", "t2"]
+    assert messages[1]["content"][0].type == "tool_use"
+
+
+@pytest.mark.asyncio
+async def test_streaming_prints_text_and_dispatches_tools_early(capsys):
+    """Text is printed as it streams and a tool starts before the response ends."""
+    session = FakeSession(delay=0)
+    original = session.call_tool
+
+    async def call_tool(name, arguments):
+        chat.log.append(("call", name))
+        return await original(name, arguments)
+
+    session.call_tool = call_tool
+    chat = FakeChat(
+        message({"type": "text", "text": "Looking now."}, toolUse("t1", "getEmailsById", ids=[1]),
+                toolUse("t2", "searchEmails", query="rollout"), stop_reason="tool_use"),
+        message({"type": "text", "text": "Found it."}),
+    )
+    messages = [{"role": "user", "content": "Find the rollout email"}]
+
+    await run_turn(chat, "test", session, messages, [], stream=True)
+
+    # getEmailsById runs while the searchEmails block is still streaming
+    assert chat.log.index(("call", "getEmailsById")) < chat.log.index(("block", "t2"))
+    assert [block["tool_use_id"] for block in messages[2]["content"]] == ["t1", "t2"]
+    out = capsys.readouterr().out
+    assert "LLM: Looking now." in out
+    assert "LLM: Found it." in out
+
+
+@pytest.mark.asyncio
+async def test_turn_uses_prompt_cache():
+    """Requests carry the system prompt and cache breakpoints; the stored conversation does not."""
+    session = FakeSession(delay=0)
+    chat = FakeChat(
+        message(toolUse("t1", "pollEmails"), stop_reason="tool_use"),
+        message({"type": "text", "text": "Nothing new."}),
+    )
+    messages = [{"role": "user", "content": "Anything new?"}]
+    cache = PromptCache()
+
+    await run_turn(chat, "test", session, messages, [], system="Be brief.", cache=cache)
+
+    first, second = chat.requests
+    assert first["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert first["messages"][0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" in second["messages"][-1]["content"][0]
+    assert messages[0] == {"role": "user", "content": "Anything new?"}
+    assert cache.stats["requests"] == 2
+
+
+@pytest.mark.asyncio
+async def test_streamed_tools_cancelled_unless_stop_reason_is_tool_use():
+    """A streamed response cut off by max_tokens runs no tools, as without streaming."""
+    session = FakeSession(delay=0.2)
+    chat = FakeChat(message({"type": "text", "text": "Deleting."}, toolUse("t1", "deleteEmailsById", ids=[1]),
+                            stop_reason="max_tokens"))
+    messages = [{"role": "user", "content": "Delete email 1"}]
+
+    response = await run_turn(chat, "test", session, messages, [], stream=True)
+    await asyncio.sleep(0.3)
+
+    assert response.stop_reason == "max_tokens"
+    assert len(chat.requests) == 1
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    # The call had started, but was cancelled before it finished
+    assert session.finished == []
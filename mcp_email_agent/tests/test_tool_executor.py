@@ -0,0 +1,98 @@
+"""
+Pytest tests for the blocking-I/O tool executor.
+
+These tests use small blocking functions in place of POP3/SMTP calls.
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+import sys
+import os
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tool_executor import ToolExecutor, OperationCancelled, checkCancelled
+
+
+class ConcurrencyProbe:
+    """Blocking callable that records how many copies run at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def __call__(self, delay):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(delay)
+        with self.lock:
+            self.running -= 1
+        return delay
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive():
+    """A blocking call does not stop other coroutines from running."""
+    executor = ToolExecutor(2, {})
+    ticked = threading.Event()
+
+    async def ticker():
+        for _ in range(5):
+            await asyncio.sleep(0)
+        ticked.set()
+
+    # The blocking call only returns True if the ticker ran while it was waiting
+    finished, _ = await asyncio.gather(executor.run("pop3", ticked.wait, 5), ticker())
+    assert finished is True
+
+
+@pytest.mark.asyncio
+async def test_lane_limit_serializes_calls():
+    """A lane limited to 1 never runs two calls at once for the same key."""
+    executor = ToolExecutor(4, {"pop3": 1})
+    probe = ConcurrencyProbe()
+
+    await asyncio.gather(*[executor.run("pop3", probe, 0.02, key="inbox") for _ in range(4)])
+    assert probe.peak == 1
+
+
+@pytest.mark.asyncio
+async def test_unlimited_lane_runs_in_parallel():
+    """Calls in a lane with a higher limit overlap."""
+    executor = ToolExecutor(4, {"smtp": 4})
+    probe = ConcurrencyProbe()
+
+    results = await asyncio.gather(*[executor.run("smtp", probe, 0.05) for _ in range(4)])
+    assert results == [0.05] * 4
+    assert probe.peak > 1
+
+
+@pytest.mark.asyncio
+async def test_cancellation_reaches_worker():
+    """Cancelling the awaiting task makes checkCancelled raise in the worker."""
+    executor = ToolExecutor(1, {})
+    started = threading.Event()
+    outcome = []
+
+    def work():
+        started.set()
+        try:
+            for _ in range(100):
+                checkCancelled()
+                time.sleep(0.01)
+            outcome.append("finished")
+        except OperationCancelled:
+            outcome.append("cancelled")
+
+    task = asyncio.create_task(executor.run("pop3", work))
+    await asyncio.get_running_loop().run_in_executor(None, started.wait)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    executor.shutdown()
+    assert outcome == ["cancelled"]
@@ -0,0 +1,153 @@
+"""
+Pytest tests for the client-side tool result cache.
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sse_client
+from sse_client import SSE_MCP_Client
+from tool_result_cache import ToolResultCache
+
+
+def test_read_only_results_cached_by_arguments():
+    """Results are found by tool name and arguments, whatever their order."""
+    cache = ToolResultCache()
+    cache.put("pollEmails", {"offset": 0, "limit": 5}, "page")
+    assert cache.get("pollEmails", {"limit": 5, "offset": 0}) == "page"
+    assert cache.get("pollEmails", {"limit": 6, "offset": 0}) is None
+    assert cache.stats == {"hits": 1, "misses": 1, "invalidations": 0}
+
+    cache.put("sendTextEmail", {}, "sent")
+    assert cache.get("sendTextEmail", {}) is None
+    assert len(cache) == 1
+
+
+def test_entries_expire_and_are_evicted():
+    """Entries expire after the TTL and the least recently used go first."""
+    with patch("tool_result_cache.time.monotonic", return_value=100.0) as clock:
+        cache = ToolResultCache(ttl=10, maxEntries=2)
+        cache.put("getEmailsById", {"ids": [1]}, "one")
+        cache.put("getEmailsById", {"ids": [2]}, "two")
+        cache.get("getEmailsById", {"ids": [1]})
+        cache.put("getEmailsById", {"ids": [3]}, "three")
+        assert cache.get("getEmailsById", {"ids": [2]}) is None
+        assert cache.get("getEmailsById", {"ids": [1]}) == "one"
+
+        clock.return_value = 111.0
+        assert cache.get("getEmailsById", {"ids": [1]}) is None
+        assert len(cache) == 1
+
+
+def test_mutating_tools_clear_the_cache():
+    """A delete or a send clears the cache; results fetched before it are not stored."""
+    cache = ToolResultCache()
+    cache.put("getEmailsById", {"ids": [3]}, "email 3")
+    generation = cache.generation
+
+    cache.observe("searchEmails")
+    assert cache.get("getEmailsById", {"ids": [3]}) == "email 3"
+    cache.observe("deleteEmailsById")
+    assert cache.get("getEmailsById", {"ids": [3]}) is None
+
+    cache.put("getEmailsById", {"ids": [4]}, "stale", generation)
+    assert cache.get("getEmailsById", {"ids": [4]}) is None
+
+
+class FakeSession:
+    """MCP session counting the calls that reach the server."""
+
+    def __init__(self):
+        self.calls = []
+        self.listed = 0
+
+    async def call_tool(self, name, arguments):
+        self.calls.append(name)
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=f"{name} {len(self.calls)}")],
+                               isError=name == "getAttachment")
+
+    async def list_tools(self):
+        self.listed += 1
+        return SimpleNamespace(tools=[SimpleNamespace(name="pollEmails"),
+                                      SimpleNamespace(name="auditLog", annotations={"readOnlyHint": True})])
+
+
+def client():
+    mcpClient = SSE_MCP_Client()
+    mcpClient.session = FakeSession()
+    mcpClient.server_key = ("http://test/sse", "Email Agent", "1")
+    return mcpClient
+
+
+@pytest.mark.asyncio
+async def test_repeated_reads_skip_the_server():
+    """A repeated read is served from the cache until a delete clears it."""
+    mcpClient = client()
+    first = await mcpClient.call_tool("getEmailsById", {"ids": [3]})
+    again = await mcpClient.call_tool("getEmailsById", {"ids": [3]})
+    assert again is first
+    assert mcpClient.session.calls == ["getEmailsById"]
+
+    await mcpClient.call_tool("deleteEmailsById", {"ids": [1]})
+    await mcpClient.call_tool("getEmailsById", {"ids": [3]})
+    assert mcpClient.session.calls == ["getEmailsById", "deleteEmailsById", "getEmailsById"]
+
+    # Failed calls are not cached
+    await mcpClient.call_tool("getAttachment", {"id": 3, "partIndex": 9})
+    await mcpClient.call_tool("getAttachment", {"id": 3, "partIndex": 9})
+    assert mcpClient.session.calls.count("getAttachment") == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_reads_share_one_call():
+    """The same read asked twice in one turn reaches the server once."""
+    mcpClient = client()
+    results = await asyncio.gather(*(mcpClient.call_tool("pollEmails", {"limit": 5}) for _ in range(3)))
+    assert results[0] is results[1] is results[2]
+    assert mcpClient.session.calls == ["pollEmails"]
+
+
+@pytest.mark.asyncio
+async def test_read_only_hints_honoured():
+    """Tools the server marks read-only are cached like the known ones."""
+    with patch.dict(sse_client._tool_lists, clear=True):
+        mcpClient = client()
+        await mcpClient.get_tools()
+
+    assert "auditLog" in mcpClient.cache.readOnly
+    await mcpClient.call_tool("auditLog", {})
+    await mcpClient.call_tool("auditLog", {})
+    assert mcpClient.session.calls == ["auditLog"]
+
+
+@pytest.mark.asyncio
+async def test_tool_list_cached_by_server():
+    """The tool list is fetched once per server, across calls and connections, until refreshed."""
+    with patch.dict(sse_client._tool_lists, clear=True):
+        first = client()
+        await first.get_tools()
+        await first.get_tools()
+        assert first.session.listed == 1
+
+        second = client()
+        tools = await second.get_tools()
+        assert [tool.name for tool in tools] == ["pollEmails", "auditLog"]
+        assert second.session.listed == 0
+        assert "auditLog" in second.cache.readOnly
+
+        # Another server version does not share the list
+        third = client()
+        third.server_key = ("http://test/sse", "Email Agent", "2")
+        await third.get_tools()
+        assert third.session.listed == 1
+
+        await second.get_tools(refresh=True)
+        assert second.session.listed == 1
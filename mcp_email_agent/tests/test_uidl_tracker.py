@@ -0,0 +1,72 @@
+"""
+Pytest tests for UIDL-based incremental polling.
+
+The mailbox is simulated with a dictionary of message number to UIDL.
+"""
+
+import pytest
+import sys
+import os
+
+# Add parent directory to path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from uidl_tracker import UidlTracker
+
+
+@pytest.fixture
+def fetcher():
+    """Fixture returning a fetch function that records which IDs it retrieved."""
+    fetched = []
+
+    def fetch(id):
+        fetched.append(id)
+        return {'id': id, 'Subject': f'Message {id}'}
+
+    return fetched, fetch
+
+
+def test_known_messages_are_not_refetched(fetcher):
+    """A second sync only fetches messages with new UIDLs."""
+    fetched, fetch = fetcher
+    tracker = UidlTracker()
+
+    tracker.sync({1: 'a', 2: 'b'}, fetch)
+    emails = tracker.sync({1: 'a', 2: 'b', 3: 'c'}, fetch)
+
+    assert fetched == [1, 2, 3]
+    assert [email['id'] for email in emails] == [1, 2, 3]
+
+
+def test_ids_follow_renumbering(fetcher):
+    """After a delete, cached emails are returned under their new number."""
+    fetched, fetch = fetcher
+    tracker = UidlTracker()
+
+    tracker.sync({1: 'a', 2: 'b'}, fetch)
+    emails = tracker.sync({1: 'b'}, fetch)
+
+    assert fetched == [1, 2]
+    assert emails == [{'id': 1, 'Subject': 'Message 2'}]
+
+
+def test_since_cursor_returns_only_new(fetcher):
+    """Messages seen before the cursor are skipped."""
+    fetched, fetch = fetcher
+    tracker = UidlTracker()
+
+    tracker.sync({1: 'a', 2: 'b'}, fetch)
+    cursor = tracker.parseCursor(tracker.formatCursor())
+    listing = {1: 'a', 2: 'b', 3: 'c'}
+
+    assert tracker.since(listing, cursor) == [3]
+    assert tracker.since(listing, 0) == [1, 2, 3]
+
+
+def test_foreign_cursor_means_everything():
+    """A cursor from another server process is treated as the beginning."""
+    tracker = UidlTracker()
+
+    assert tracker.parseCursor("") == 0
+    assert tracker.parseCursor("deadbeef-12") == 0
+    assert tracker.parseCursor(f"{tracker.epoch}-12") == 12
@@ -0,0 +1,98 @@
+"""
+Bounded worker pool for blocking email I/O.
+
+The MCP tools are coroutines, but ``poplib`` and ``smtplib`` block. Running
+them directly on the event loop stalls every other SSE client while one
+mailbox is being read. ``ToolExecutor`` moves each call onto a worker thread
+and limits how many calls of each kind run at once:
+
+- POP3 work is serialized per mailbox, since a POP3 server allows only one
+  session per maildrop.
+- SMTP work runs in parallel, up to the size of the SMTP connection pool.
+
+When the awaiting tool is cancelled (for example because the client
+disconnected), a call that has not started yet is dropped, and a running call
+is told to stop through ``checkCancelled()``.
+"""
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Cancellation flag for the tool call running on the current worker thread
+_cancelEvent = contextvars.ContextVar("cancelEvent", default=None)
+
+
+class OperationCancelled(Exception):
+    """Raised inside a worker when the tool call that started it was cancelled."""
+
+
+def checkCancelled():
+    """Raises OperationCancelled if the current tool call has been cancelled.
+
+    Long-running blocking functions call this between units of work. Outside
+    a ``ToolExecutor`` worker it does nothing.
+    """
+    event = _cancelEvent.get()
+    if event is not None and event.is_set():
+        raise OperationCancelled()
+
+
+class ToolExecutor:
+    """Runs blocking functions on a thread pool with per-lane concurrency limits.
+
+    Args:
+        maxWorkers (int): Number of worker threads.
+        limits (dict): Maximum concurrent calls for each lane name. Lanes not
+            listed are limited only by ``maxWorkers``.
+    """
+
+    def __init__(self, maxWorkers: int, limits: dict):
+        self._executor = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix="email-io")
+        self.maxWorkers = maxWorkers
+        self.limits = dict(limits)
+        self._semaphores = {}
+
+    async def run(self, lane: str, func, *args, key: str = None):
+        """Runs ``func(*args)`` on a worker thread and returns its result.
+
+        Args:
+            lane (str): Concurrency lane, e.g. "pop3" or "smtp".
+            func (callable): Blocking function to run.
+            *args: Positional arguments for ``func``.
+            key (str): Optional sub-key so that each mailbox gets its own limit.
+
+        Returns:
+            Any: Whatever ``func`` returns.
+        """
+        semaphore = self._semaphore(lane, key)
+        await semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        event = threading.Event()
+        context = contextvars.copy_context()
+        context.run(_cancelEvent.set, event)
+        try:
+            future = self._executor.submit(context.run, func, *args)
+        except BaseException:
+            semaphore.release()
+            raise
+        # Release the slot only once the thread is really done with it
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(semaphore.release))
+        try:
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except asyncio.CancelledError:
+            event.set()
+            future.cancel()
+            raise
+
+    def shutdown(self):
+        """Stops accepting work and waits for running calls to finish."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _semaphore(self, lane: str, key: str):
+        """Returns the semaphore guarding ``lane``/``key``, creating it on first use."""
+        name = (lane, key)
+        if name not in self._semaphores:
+            self._semaphores[name] = asyncio.Semaphore(self.limits.get(lane, self.maxWorkers))
+        return self._semaphores[name]
@@ -0,0 +1,120 @@
+"""
+Client-side cache of read-only MCP tool results.
+
+Within a conversation the model often asks for the same data twice, e.g.
+``getEmailsById([3])`` to answer a question and again to draft a reply. A
+read-only tool returns the same result until the mailbox changes, so
+``ToolResultCache`` keeps results by tool name and arguments:
+
+- Only tools in ``readOnly`` are cached, and failed calls never are.
+- Entries expire after ``ttl`` seconds, so mail that arrives is seen soon.
+- At most ``maxEntries`` results are kept; the least recently used go first.
+- A call to a tool that changes the mailbox (``deleteEmailsById``, the send
+  tools) clears the cache, because message IDs shift after a delete.
+
+A result still being fetched when the cache is cleared is not stored.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Tools whose results depend only on the mailbox contents
+READ_ONLY_TOOLS = frozenset({
+    'pollEmails', 'getEmailsById', 'listEmailHeaders', 'searchEmails', 'queryEmails', 'getAttachment',
+})
+
+# Tools that change the mailbox, or may, when sending to your own address
+INVALIDATING_TOOLS = frozenset({'deleteEmailsById', 'sendTextEmail', 'sendHtmlEmail', 'sendBulkEmails'})
+
+
+def cacheKey(name: str, arguments: dict):
+    """Returns the cache key of a tool call; argument order does not matter."""
+    return name, json.dumps(arguments or {}, sort_keys=True, default=str)
+
+
+class ToolResultCache:
+    """Results of read-only tool calls by tool name and arguments.
+
+    Args:
+        ttl (float): Seconds a result stays valid; 0 disables the cache.
+        maxEntries (int): Maximum number of results kept.
+        readOnly (set): Names of the tools whose results may be cached.
+        invalidating (set): Names of the tools that clear the cache.
+    """
+
+    def __init__(self, ttl: float = 60, maxEntries: int = 128, readOnly=READ_ONLY_TOOLS,
+                 invalidating=INVALIDATING_TOOLS):
+        self.ttl = ttl
+        self.maxEntries = maxEntries
+        self.readOnly = set(readOnly)
+        self.invalidating = set(invalidating)
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def cacheable(self, name: str):
+        """Tells whether results of ``name`` may be cached."""
+        return self.ttl > 0 and name in self.readOnly
+
+    def get(self, name: str, arguments: dict):
+        """Returns the cached result of a call, or None.
+
+        Args:
+            name (str): Tool name.
+            arguments (dict): Tool arguments.
+
+        Returns:
+            The result stored by ``put``, or None if there is none or it expired.
+        """
+        if not self.cacheable(name):
+            return None
+        key = cacheKey(name, arguments)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, name: str, arguments: dict, result, generation: int = None):
+        """Stores the result of a successful call.
+
+        Args:
+            name (str): Tool name.
+            arguments (dict): Tool arguments.
+            result: Result to return for the same call later.
+            generation (int): ``generation`` when the call started; the result
+                is dropped if the cache was cleared since.
+        """
+        if not self.cacheable(name):
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            key = cacheKey(name, arguments)
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxEntries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Clears the cache."""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.stats["invalidations"] += 1
+
+    def observe(self, name: str):
+        """Clears the cache if ``name`` changes the mailbox."""
+        if name in self.invalidating:
+            self.invalidate()
+
+    def __len__(self):
+        return len(self._entries)
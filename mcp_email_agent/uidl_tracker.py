@@ -0,0 +1,118 @@
+"""
+UIDL-based tracking of already-fetched emails.
+
+POP3 message numbers change whenever mail is deleted, but the unique-id
+listing (UIDL, RFC 1939 section 7) gives every message a stable identifier.
+``UidlTracker`` keeps each parsed email under its UIDL so that a poll only
+retrieves messages it has not seen before and serves the rest from memory.
+
+Each UIDL is also given a sequence number the first time it is seen. The
+highest sequence number acts as a cursor: a client that remembers it can
+later ask for only the messages that arrived after it. Cursors carry a
+per-process epoch, so a cursor issued before a server restart is treated as
+"from the beginning" rather than silently skipping mail.
+"""
+
+import threading
+import uuid
+
+
+class UidlTracker:
+    """Remembers parsed emails by UIDL and assigns each a first-seen cursor."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._emails = {}
+        self._seen = {}
+        self.cursor = 0
+        self.epoch = uuid.uuid4().hex[:8]
+
+    def sync(self, listing: dict, fetch, ids: list = None):
+        """Brings the tracker up to date with the mailbox and returns emails.
+
+        Messages whose UIDL is already known are served from memory; the rest
+        are passed to ``fetch``. UIDLs no longer in ``listing`` are forgotten.
+
+        Args:
+            listing (dict): Message number to UIDL, as returned by ``listUidls``.
+            fetch (callable): Called with a message number, returns the
+                parsed email dictionary for it.
+            ids (list): Message numbers to return. If None, returns all.
+
+        Returns:
+            list: Email dictionaries with ``id`` set to the current message number.
+        """
+        with self._lock:
+            current = set(listing.values())
+            for uidl in list(self._emails):
+                if uidl not in current:
+                    del self._emails[uidl]
+                    del self._seen[uidl]
+
+        emails = []
+        for id in (sorted(listing) if ids is None else ids):
+            uidl = listing.get(id)
+            email = self._emails.get(uidl)
+            if email is None:
+                email = fetch(id)
+                if uidl is not None:
+                    self._remember(uidl, email)
+            emails.append(dict(email, id=id))
+        return emails
+
+    def unknown(self, listing: dict, ids: list = None):
+        """Returns the message numbers whose emails ``sync`` would have to fetch.
+
+        Args:
+            listing (dict): Message number to UIDL, as returned by ``listUidls``.
+            ids (list): Message numbers to check. If None, checks all.
+        """
+        return [id for id in (sorted(listing) if ids is None else ids)
+                if listing.get(id) is None or listing.get(id) not in self._emails]
+
+    def get(self, uidl: str):
+        """Returns the remembered email for ``uidl``, or None."""
+        return self._emails.get(uidl)
+
+    def formatCursor(self):
+        """Returns the current cursor as an opaque string for clients."""
+        return f"{self.epoch}-{self.cursor}"
+
+    def parseCursor(self, cursor: str):
+        """Turns a client cursor back into a sequence number.
+
+        Empty, malformed or foreign-epoch cursors map to 0, meaning "all mail".
+        """
+        epoch, _, value = (cursor or "").partition("-")
+        if epoch != self.epoch or not value.isdigit():
+            return 0
+        return int(value)
+
+    def since(self, listing: dict, cursor: int):
+        """Returns the message numbers first seen after ``cursor``.
+
+        Args:
+            listing (dict): Message number to UIDL for the current mailbox.
+            cursor (int): A cursor value previously returned to the client.
+
+        Returns:
+            list: Message numbers, in mailbox order.
+        """
+        with self._lock:
+            return [id for id, uidl in sorted(listing.items())
+                    if self._seen.get(uidl, self.cursor + 1) > cursor]
+
+    def forget(self, uidls):
+        """Drops the given UIDLs, e.g. after their messages were deleted."""
+        with self._lock:
+            for uidl in uidls:
+                self._emails.pop(uidl, None)
+                self._seen.pop(uidl, None)
+
+    def _remember(self, uidl: str, email: dict):
+        """Stores a freshly fetched email and gives it the next cursor value."""
+        with self._lock:
+            if uidl not in self._seen:
+                self.cursor += 1
+                self._seen[uidl] = self.cursor
+            self._emails[uidl] = email